@@ -17,7 +17,11 @@ import os
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
 from ui import MainWindow
-from config import WINDOW_TITLE
+from data.server_api import ServerAPI
+from config import (WINDOW_TITLE, API_BASE_URL, FRIDGE_TOKEN_FILE, API_MAX_RETRIES,
+                    API_RETRY_DELAY_SECONDS, SENSOR_DATA_SEND_INTERVAL_SECONDS,
+                    SENSOR_BINARY_UPLOAD, SENSOR_COLUMNAR_UPLOAD,
+                    DATA_SYNC_BATCH_SIZE, DATA_SYNC_MAX_PENDING)
 
 # Force unbuffered output
 os.environ['PYTHONUNBUFFERED'] = '1'
@@ -39,8 +43,21 @@ def main():
     # Nascondi cursore in modalità kiosk (decommenta per produzione)
     # QApplication.setOverrideCursor(Qt.BlankCursor)
     
+    # Client API unico, condiviso dai DataManager di temperatura e potenza
+    server_api = ServerAPI(
+        base_url=API_BASE_URL,
+        token_file=FRIDGE_TOKEN_FILE,
+        max_retries=API_MAX_RETRIES,
+        retry_delay=API_RETRY_DELAY_SECONDS,
+        sensor_send_interval=SENSOR_DATA_SEND_INTERVAL_SECONDS,
+        sensor_batch_size=DATA_SYNC_BATCH_SIZE,
+        sensor_max_pending=DATA_SYNC_MAX_PENDING,
+        sensor_binary_upload=SENSOR_BINARY_UPLOAD,
+        sensor_columnar_upload=SENSOR_COLUMNAR_UPLOAD
+    )
+    
     # Crea e mostra finestra principale
-    window = MainWindow()
+    window = MainWindow(server_api=server_api)
     
     # Modalità fullscreen per Raspberry (decommenta per produzione)
     # window.showFullScreen()
@@ -54,6 +71,7 @@ def main():
     
     # Event loop
     exit_code = app.exec()
+    server_api.close()
     
     print("\n" + "=" * 60)
     print(f"{WINDOW_TITLE} - Shutdown complete")
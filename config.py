@@ -4,42 +4,86 @@ Tutte le costanti e configurazioni dell'applicazione sono qui.
 """
 
 import os
+from dataclasses import dataclass, field
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Carica variabili da .env se esiste
 load_dotenv()
 
+# === IMPOSTAZIONI VALIDATE (hot path) ===
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Impostazioni usate nei percorsi caldi (polling, storico, invio dati).
+    Immutabili e validate una sola volta all'import: un valore errato
+    fa fallire subito l'avvio invece di emergere a runtime.
+    """
+    
+    polling_interval_ms: int = 1000                 # Intervallo polling sensori in millisecondi
+    history_hours: int = 48                         # Ore di storico da mantenere e visualizzare
+    api_base_url: str = 'http://localhost:5000'     # URL del server backend
+    fridge_token_file: str = "fridge_token.json"    # Token frigo salvato localmente
+    token_validation_interval_hours: int = 24       # Validazione token ogni 24h
+    api_max_retries: int = 3                        # Retry per richieste HTTP
+    api_retry_delay_seconds: int = 5
+    api_request_timeout_seconds: int = 10
+    sensor_data_send_interval_seconds: int = 60     # Invio dati sensori al server: ogni minuto
+    data_sync_batch_size: int = 64                  # Punti che fanno scattare l'invio anche prima dell'intervallo
+    data_sync_max_pending: int = 3600               # Punti massimi in attesa se il server non risponde (1h a 1 Hz)
+    
+    # Calcolato da polling_interval_ms e history_hours
+    max_data_points: int = field(init=False)
+    
+    def __post_init__(self):
+        for name in ('polling_interval_ms', 'history_hours', 'api_request_timeout_seconds',
+                     'sensor_data_send_interval_seconds', 'data_sync_batch_size',
+                     'data_sync_max_pending'):
+            if getattr(self, name) <= 0:
+                raise ValueError(f"Invalid setting {name}={getattr(self, name)} (must be > 0)")
+        if self.api_max_retries < 0 or self.api_retry_delay_seconds < 0:
+            raise ValueError("Invalid API retry settings (must be >= 0)")
+        
+        # Formula: ore * secondi_per_ora * millisecondi_per_secondo / intervallo_polling_ms
+        object.__setattr__(self, 'max_data_points',
+                           int(self.history_hours * 3600 * 1000 / self.polling_interval_ms))
+
+
+SETTINGS = Settings(
+    api_base_url=os.getenv('API_BASE_URL', 'http://localhost:5000')
+)
+
+# Costanti a livello modulo (compatibilità con gli import esistenti)
+
 # === CONFIGURAZIONI SENSORI ===
-POLLING_INTERVAL_MS = 1000  # Intervallo polling sensori in millisecondi
+POLLING_INTERVAL_MS = SETTINGS.polling_interval_ms
 
 # Range simulazione sensori mock
 TEMPERATURE_RANGE = (0.0, 10.0)  # °C (temperatura tipica frigo)
 POWER_RANGE = (50.0, 150.0)      # Watt (consumo tipico frigo)
 
 # === CONFIGURAZIONI STORICO DATI ===
-HISTORY_HOURS = 48  # Ore di storico da mantenere e visualizzare
-# Calcola MAX_DATA_POINTS in base al polling interval
-# Formula: ore * secondi_per_ora * millisecondi_per_secondo / intervallo_polling_ms
-MAX_DATA_POINTS = int(HISTORY_HOURS * 3600 * 1000 / POLLING_INTERVAL_MS)
+HISTORY_HOURS = SETTINGS.history_hours
+MAX_DATA_POINTS = SETTINGS.max_data_points
 
 # === CONFIGURAZIONI API SERVER ===
-import os
-API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:5000')  # URL del server backend
-
-# Token frigo salvato localmente
-FRIDGE_TOKEN_FILE = "fridge_token.json"
-
-# Validazione token ogni 24h
-TOKEN_VALIDATION_INTERVAL_HOURS = 24
-
-# Retry e timeout per richieste HTTP
-API_MAX_RETRIES = 3
-API_RETRY_DELAY_SECONDS = 5
-API_REQUEST_TIMEOUT_SECONDS = 10
-
-# Intervallo invio dati sensori al server (in secondi)
-SENSOR_DATA_SEND_INTERVAL_SECONDS = 60  # Ogni minuto
+API_BASE_URL = SETTINGS.api_base_url
+FRIDGE_TOKEN_FILE = SETTINGS.fridge_token_file
+TOKEN_VALIDATION_INTERVAL_HOURS = SETTINGS.token_validation_interval_hours
+API_MAX_RETRIES = SETTINGS.api_max_retries
+API_RETRY_DELAY_SECONDS = SETTINGS.api_retry_delay_seconds
+API_REQUEST_TIMEOUT_SECONDS = SETTINGS.api_request_timeout_seconds
+SENSOR_DATA_SEND_INTERVAL_SECONDS = SETTINGS.sensor_data_send_interval_seconds
+SENSOR_BINARY_UPLOAD = False          # True = invio sensori in msgpack+gzip (solo se il server lo supporta)
+SENSOR_COLUMNAR_UPLOAD = False        # True = invio sensori in JSON colonnare (solo se il server lo supporta)
+
+# Invio a batch dal DataManager
+DATA_SYNC_BATCH_SIZE = SETTINGS.data_sync_batch_size
+DATA_SYNC_MAX_PENDING = SETTINGS.data_sync_max_pending
+
+# Cache locale dello storico (ripristino veloce al riavvio della UI)
+HISTORY_CACHE_DIR = "cache"                 # Directory file .npz dello storico
+HISTORY_CACHE_MAX_AGE_SECONDS = 3600        # Oltre questa età la cache è ignorata e si usa il server
 
 # Endpoint API (legacy - mantenuto per compatibilità con UI esistente)
 API_ENDPOINTS = {
@@ -54,18 +98,23 @@ CAMERA_IMAGE_DIR = "captured_images"  # Directory per salvare immagini catturate
 CAMERA_RESOLUTION = (1280, 720)       # Risoluzione immagini (width, height)
 CAMERA_WARMUP_FRAMES = 5              # Frame da scartare prima di catturare (stabilizzazione)
 CAMERA_MAX_RETRIES = 3                # Retry su errore cattura
+CAMERA_DISCOVERY_CACHE_FILE = "cache/cameras.json"  # Risultato discovery (evita v4l2-ctl ad ogni avvio)
 
 # === CONFIGURAZIONI DOOR SENSOR (Reed Switch) ===
 DOOR_GPIO_PIN = 17                    # Pin GPIO per reed switch (BCM numbering)
+DOOR_GPIO_CHIP = "gpiochip0"          # Chip GPIO per gli eventi di fronte via gpiod (Pi 5: gpiochip4)
 DOOR_DEBOUNCE_TIME_SECONDS = 0.1      # Tempo debouncing (100ms)
 DOOR_USE_PULLUP = True                # True = pull-up, False = pull-down
 DOOR_CLOSE_DELAY_SECONDS = 2.0        # Attesa dopo chiusura porta prima di scattare foto
 DOOR_MOCK_MODE = True                 # True = input manuale via SSH, False = GPIO reale
+DOOR_THREAD_CPU = 3                   # Core dedicato al thread porta (None = nessun pinning)
+DOOR_THREAD_RT_PRIORITY = 10          # Priorità SCHED_FIFO del thread porta (0 = scheduling normale)
 
 # === CONFIGURAZIONI YOLO ===
 YOLO_MODEL_PATH = "yolov8n.pt"        # Path modello YOLO (o "models/custom_food_model.pt")
 YOLO_CONFIDENCE_THRESHOLD = 0.5       # Soglia minima confidence (0-1)
 YOLO_MAX_RETRIES = 2                  # Retry su errore detection
+YOLO_EXPORT_FORMAT = "ncnn"           # Backend esportato dal .pt al primo avvio ("ncnn", "onnx"; None = PyTorch)
 
 # === CONFIGURAZIONI LOGGING ===
 LOG_DIR = "logs"                      # Directory per file di log
@@ -73,7 +122,9 @@ LOG_MAX_FILE_SIZE_MB = 10             # Dimensione massima singolo file log (rot
 LOG_BACKUP_COUNT = 5                  # Numero file di backup da mantenere
 
 # === FILE CONDIVISO SENSORI (per UI) ===
-SHARED_SENSORS_FILE = "/tmp/fridge_sensors.json"  # File condiviso tra daemon e UI
+SHARED_SENSORS_SHM_NAME = "fridge_sensors"        # Segmento shared memory (ultima lettura, aggiornato ogni campione)
+SHARED_SENSORS_FILE = "/tmp/fridge_sensors.json"  # File condiviso tra daemon e UI (fallback/debug)
+SHARED_SENSORS_FILE_INTERVAL_SECONDS = 10         # Intervallo minimo tra due scritture del file JSON
 
 # === CONFIGURAZIONI UI ===
 WINDOW_TITLE = "Smart Fridge Monitor"
@@ -2,6 +2,7 @@
 Package data: gestione dati e comunicazione con server.
 """
 
-from .data_manager import DataManager, DataPoint
+from .data_manager import DataManager, DataPoint, Stats
+from .network_worker import NetworkWorker, get_network_worker, stop_network_worker
 
-__all__ = ['DataManager', 'DataPoint']
\ No newline at end of file
+__all__ = ['DataManager', 'DataPoint', 'Stats', 'NetworkWorker', 'get_network_worker', 'stop_network_worker']
\ No newline at end of file
@@ -7,19 +7,73 @@ Responsabilità:
 - Calcola statistiche (media, min, max)
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+import os
+import time
+from datetime import datetime
+from typing import List, Dict, NamedTuple, Optional, Tuple
 from collections import deque
-import requests
-from config import API_BASE_URL, API_ENDPOINTS, HISTORY_HOURS, MAX_DATA_POINTS
+import numpy as np
+from .server_api import ServerAPI
+from config import SETTINGS
 
+# Numba opzionale: compila JIT la scansione di eviction
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
-class DataPoint:
-    """Rappresenta un singolo punto dati con timestamp."""
+
+# Millisecondi in un'ora (per i cutoff sui timestamp epoch-ms)
+MS_PER_HOUR = 3_600_000
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """Converte un datetime in millisecondi epoch (formato interno dei timestamp)."""
+    return int(timestamp.timestamp() * 1000)
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _evict(ts_arr, head, count, cutoff_ms):
+        """
+        Avanza la testa del buffer oltre i timestamp < cutoff_ms.
+        Scansione lineare compilata: di norma esce dopo 0-1 confronti.
+        
+        Returns:
+            (new_head, new_count)
+        """
+        while count > 0 and ts_arr[head] < cutoff_ms:
+            head += 1
+            count -= 1
+        return head, count
+else:
+    def _evict(ts_arr, head, count, cutoff_ms):
+        """
+        Fallback senza Numba: ricerca binaria sulla finestra valida
+        (evita un loop Python se il buffer contiene molti punti scaduti).
+        
+        Returns:
+            (new_head, new_count)
+        """
+        n = int(np.searchsorted(ts_arr[head:head + count], cutoff_ms, side='left'))
+        return head + n, count - n
+
+
+class DataPoint(NamedTuple):
+    """
+    Rappresenta un singolo punto dati con timestamp.
+    Costruito solo ai bordi dell'API: internamente lo storico è in array NumPy
+    e i timestamp sono interi epoch-ms; il datetime viene creato su richiesta.
+    """
+    
+    ts_ms: int
+    value: float
     
-    def __init__(self, timestamp: datetime, value: float):
-        self.timestamp = timestamp
-        self.value = value
+    @property
+    def timestamp(self) -> datetime:
+        """Timestamp come datetime (costruito al momento)."""
+        return datetime.fromtimestamp(self.ts_ms / 1000)
     
     def to_dict(self) -> dict:
         """Converte in dizionario per serializzazione JSON."""
@@ -32,34 +86,67 @@ class DataPoint:
     def from_dict(cls, data: dict) -> 'DataPoint':
         """Crea DataPoint da dizionario JSON."""
         return cls(
-            timestamp=datetime.fromisoformat(data['timestamp']),
+            ts_ms=to_epoch_ms(datetime.fromisoformat(data['timestamp'])),
             value=float(data['value'])
         )
 
 
+class Stats(NamedTuple):
+    """Statistiche di un periodo (media, minimo, massimo, numero di punti)."""
+    
+    average: float
+    min: float
+    max: float
+    count: int
+
+
+# Statistiche di un periodo senza dati
+EMPTY_STATS = Stats(0.0, 0.0, 0.0, 0)
+
+
 class DataManager:
     """
     Gestisce lo storico dati per temperatura e potenza.
     Mantiene buffer in memoria e sincronizza con server via API.
     """
     
-    def __init__(self, sensor_type: str, api_enabled: bool = False):
+    def __init__(self, sensor_type: str, api_enabled: bool = False,
+                 server_api: Optional[ServerAPI] = None):
         """
         Inizializza il DataManager.
         
         Args:
             sensor_type: Tipo sensore ("temperature" o "power")
             api_enabled: Se True, abilita comunicazione con API server
+            server_api: Client API condiviso tra i DataManager (richiesto se api_enabled)
         """
         self.sensor_type = sensor_type
+        
+        # Un solo ServerAPI per tutti i sensori: stessa sessione HTTP
+        # e invio congiunto di temperatura e potenza
+        self.server_api = server_api
+        if api_enabled and server_api is None:
+            print(f"[DataManager-{sensor_type}] api_enabled without server_api, API disabled")
+            api_enabled = False
         self.api_enabled = api_enabled
         
-        # Buffer circolare per dati (deque è efficiente per append/pop)
-        self._data_buffer: deque[DataPoint] = deque(maxlen=MAX_DATA_POINTS)
+        # Buffer SoA: timestamp e valori in due array NumPy paralleli.
+        # Capacità doppia rispetto a MAX_DATA_POINTS: i dati validi sono sempre
+        # contigui in [_head, _head + _count) e quando si arriva in fondo
+        # all'array vengono compattati all'inizio (costo ammortizzato O(1)).
+        self._capacity = 2 * SETTINGS.max_data_points
+        self._ts = np.empty(self._capacity, dtype=np.int64)  # epoch-ms
+        self._val = np.empty(self._capacity, dtype=np.float32)
+        self._head = 0
+        self._count = 0
         
-        # Timestamp ultimo invio a server (per evitare invii troppo frequenti)
-        self._last_server_sync = None
-        self._sync_interval = timedelta(seconds=60)  # Invia al server ogni 60s
+        # Statistiche incrementali sull'intero buffer (O(1) per lettura):
+        # somma corrente + deque monotone (valore, seq) per min e max.
+        # seq è un indice logico crescente, indipendente dalla compattazione.
+        # _rev cambia ad ogni modifica del buffer e invalida la cache delle statistiche.
+        self._rev = 0
+        self._stats_cache: Dict[Optional[int], Tuple[int, Stats]] = {}
+        self._reset_running_stats()
         
         print(f"[DataManager-{sensor_type}] Initialized")
     
@@ -75,103 +162,242 @@ class DataManager:
             return False
         
         try:
-            # Costruisci URL endpoint
-            endpoint = API_ENDPOINTS[f'{self.sensor_type}_history']
-            url = f"{API_BASE_URL}{endpoint}"
-            
-            # Parametri query: richiedi ultime 48h
-            params = {
-                'hours': HISTORY_HOURS
-            }
+            print(f"[DataManager-{self.sensor_type}] Fetching history...")
+            items = self.server_api.get_sensor_history(self.sensor_type, SETTINGS.history_hours)
+            if items is None:
+                return False
             
-            print(f"[DataManager-{self.sensor_type}] Fetching history from {url}...")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            # Parsing in blocco direttamente negli array (niente DataPoint intermedi)
+            ts = np.fromiter((to_epoch_ms(datetime.fromisoformat(item['timestamp'])) for item in items),
+                             dtype=np.int64, count=len(items))
+            values = np.fromiter((item['value'] for item in items), dtype=np.float32, count=len(items))
+            self._extend(ts, values)
             
-            # Parse JSON response
-            data = response.json()
-            
-            # Converti in DataPoint e aggiungi a buffer
-            for item in data.get('data', []):
-                point = DataPoint.from_dict(item)
-                self._data_buffer.append(point)
-            
-            print(f"[DataManager-{self.sensor_type}] Loaded {len(self._data_buffer)} historical points")
+            print(f"[DataManager-{self.sensor_type}] Loaded {self._count} historical points")
             return True
             
-        except requests.RequestException as e:
-            print(f"[DataManager-{self.sensor_type}] Error loading history: {e}")
-            return False
         except Exception as e:
             print(f"[DataManager-{self.sensor_type}] Unexpected error: {e}")
             return False
     
-    def add_data_point(self, value: float, timestamp: Optional[datetime] = None):
+    def load_cache(self, path: str, max_age_seconds: float) -> bool:
+        """
+        Ripristina lo storico da un file .npz salvato con save_cache.
+        Evita il download dal server al riavvio se la cache è recente.
+        
+        Args:
+            path: Path del file cache
+            max_age_seconds: Età massima del file per considerarlo valido
+        
+        Returns:
+            bool: True se caricamento riuscito, False altrimenti
+        """
+        if not os.path.exists(path):
+            return False
+        
+        if time.time() - os.path.getmtime(path) > max_age_seconds:
+            print(f"[DataManager-{self.sensor_type}] History cache too old, ignoring")
+            return False
+        
+        try:
+            with np.load(path) as cache:
+                ts = cache['ts'].astype(np.int64, copy=False)
+                values = cache['value'].astype(np.float32, copy=False)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[DataManager-{self.sensor_type}] Error loading history cache: {e}")
+            return False
+        
+        self._extend(ts, values)
+        self._remove_old_data()
+        print(f"[DataManager-{self.sensor_type}] Loaded {self._count} points from cache")
+        return True
+    
+    def save_cache(self, path: str) -> bool:
+        """
+        Salva lo storico corrente (array SoA) in un file .npz.
+        Scrittura su file temporaneo + replace: mai un file a metà.
+        
+        Args:
+            path: Path del file cache
+        
+        Returns:
+            bool: True se salvataggio riuscito, False altrimenti
+        """
+        tail = self._head + self._count
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                np.savez(f, ts=self._ts[self._head:tail], value=self._val[self._head:tail])
+            os.replace(temp_path, path)
+            print(f"[DataManager-{self.sensor_type}] Saved {self._count} points to cache")
+            return True
+        except OSError as e:
+            print(f"[DataManager-{self.sensor_type}] Error saving history cache: {e}")
+            return False
+    
+    def add_data_point(self, value: float, timestamp: Optional[datetime] = None,
+                       ts_ms: Optional[int] = None):
         """
         Aggiunge un nuovo punto dati al buffer locale.
         
         Args:
             value: Valore letto dal sensore
             timestamp: Timestamp del dato (default: now)
+            ts_ms: Timestamp epoch-ms già calcolato dal chiamante (nessuna
+                   conversione né lettura dell'orologio; ha la precedenza su timestamp)
         """
-        if timestamp is None:
-            timestamp = datetime.now()
+        # Orologio letto una sola volta per tick e passato ai metodi interni
+        if ts_ms is not None:
+            now_ms = ts_ms
+        else:
+            now_ms = time.time_ns() // 1_000_000
+            ts_ms = now_ms if timestamp is None else to_epoch_ms(timestamp)
         
-        point = DataPoint(timestamp, value)
-        self._data_buffer.append(point)
+        self._append(ts_ms, value)
         
         # Rimuovi dati più vecchi di HISTORY_HOURS
-        self._remove_old_data()
+        self._remove_old_data(now_ms)
         
-        # Invia al server se è passato abbastanza tempo dall'ultimo sync
+        # Accoda per l'invio congiunto (il ServerAPI decide quando spedire)
         if self.api_enabled:
-            self._sync_to_server_if_needed(point)
+            self.server_api.queue_sensor_point(self.sensor_type, ts_ms, value)
     
-    def _remove_old_data(self):
+    def _append(self, ts_ms: int, value: float):
         """
-        Rimuove i dati più vecchi di HISTORY_HOURS dal buffer.
-        Questo assicura che vengano visualizzate solo le ultime 48 ore.
+        Accoda un punto agli array SoA.
+        Se il buffer è pieno scarta il punto più vecchio (come deque(maxlen)).
         """
-        if not self._data_buffer:
+        if self._count == SETTINGS.max_data_points:
+            self._drop_oldest(1)
+        
+        tail = self._head + self._count
+        if tail == self._capacity:
+            # Fine array raggiunta: compatta i dati validi all'inizio
+            self._ts[:self._count] = self._ts[self._head:tail]
+            self._val[:self._count] = self._val[self._head:tail]
+            self._head = 0
+            tail = self._count
+            # Riallinea la somma corrente (evita deriva numerica)
+            self._sum = float(self._val[:self._count].sum(dtype=np.float64))
+        
+        self._ts[tail] = ts_ms
+        self._val[tail] = value
+        self._push_running_stats(float(self._val[tail]), self._first_seq + self._count)
+        self._count += 1
+        self._rev += 1
+    
+    def _drop_oldest(self, n: int):
+        """Scarta gli n punti più vecchi aggiornando le statistiche incrementali."""
+        if n <= 0:
             return
         
-        cutoff_time = datetime.now() - timedelta(hours=HISTORY_HOURS)
+        self._sum -= float(self._val[self._head:self._head + n].sum(dtype=np.float64))
+        self._head += n
+        self._count -= n
+        self._first_seq += n
+        
+        # Rimuovi dalle deque min/max gli elementi usciti dal buffer
+        while self._min_dq and self._min_dq[0][1] < self._first_seq:
+            self._min_dq.popleft()
+        while self._max_dq and self._max_dq[0][1] < self._first_seq:
+            self._max_dq.popleft()
+    
+    def _push_running_stats(self, value: float, seq: int):
+        """Aggiorna somma e deque monotone con un nuovo valore (O(1) ammortizzato)."""
+        self._sum += value
+        
+        while self._min_dq and self._min_dq[-1][0] >= value:
+            self._min_dq.pop()
+        self._min_dq.append((value, seq))
         
-        # Rimuovi i punti troppo vecchi dall'inizio del deque
-        while self._data_buffer and self._data_buffer[0].timestamp < cutoff_time:
-            self._data_buffer.popleft()
+        while self._max_dq and self._max_dq[-1][0] <= value:
+            self._max_dq.pop()
+        self._max_dq.append((value, seq))
     
-    def _sync_to_server_if_needed(self, point: DataPoint):
+    def _reset_running_stats(self):
+        """Azzera le statistiche incrementali."""
+        self._sum = 0.0
+        self._first_seq = 0
+        self._min_dq: deque[Tuple[float, int]] = deque()
+        self._max_dq: deque[Tuple[float, int]] = deque()
+        self._rev += 1
+    
+    def _rebuild_running_stats(self):
+        """Ricalcola da zero le statistiche incrementali sul buffer corrente."""
+        self._reset_running_stats()
+        values = self._val[self._head:self._head + self._count]
+        for seq, value in enumerate(values.tolist()):
+            self._push_running_stats(value, seq)
+    
+    def _extend(self, ts: np.ndarray, values: np.ndarray):
         """
-        Invia il dato al server se è passato l'intervallo di sync.
-        Evita di sovraccaricare il server con troppi POST.
+        Accoda un blocco di punti agli array SoA (es. storico dal server).
+        Mantiene al massimo MAX_DATA_POINTS punti, scartando i più vecchi.
         """
-        now = datetime.now()
+        n = min(len(values), SETTINGS.max_data_points)
+        if not n:
+            return
+        ts, values = ts[-n:], values[-n:]
         
-        # Prima sincronizzazione o intervallo trascorso
-        if (self._last_server_sync is None or 
-            now - self._last_server_sync >= self._sync_interval):
-            
-            self._send_to_server(point)
-            self._last_server_sync = now
+        # Compatta all'inizio i punti esistenti ancora validi, poi copia il blocco
+        keep = min(self._count, SETTINGS.max_data_points - n)
+        tail = self._head + self._count
+        self._ts[:keep] = self._ts[tail - keep:tail]
+        self._val[:keep] = self._val[tail - keep:tail]
+        self._ts[keep:keep + n] = ts
+        self._val[keep:keep + n] = values
+        self._head = 0
+        self._count = keep + n
+        self._rebuild_running_stats()
     
-    def _send_to_server(self, point: DataPoint):
+    def _window_start(self, hours: Optional[int]) -> int:
         """
-        Invia un singolo punto dati al server via POST.
+        Ritorna l'indice del primo punto nelle ultime `hours` ore.
+        Il buffer è ordinato per timestamp, quindi basta una ricerca binaria.
         """
-        try:
-            endpoint = API_ENDPOINTS[f'{self.sensor_type}_post']
-            url = f"{API_BASE_URL}{endpoint}"
-            
-            payload = point.to_dict()
-            
-            response = requests.post(url, json=payload, timeout=5)
-            response.raise_for_status()
-            
-            # print(f"[DataManager-{self.sensor_type}] Data sent to server")
-            
-        except requests.RequestException as e:
-            print(f"[DataManager-{self.sensor_type}] Error sending data: {e}")
+        if hours is None:
+            return self._head
+        
+        cutoff = time.time_ns() // 1_000_000 - hours * MS_PER_HOUR
+        tail = self._head + self._count
+        return self._head + int(np.searchsorted(self._ts[self._head:tail], cutoff, side='left'))
+    
+    def _remove_old_data(self, now_ms: Optional[int] = None):
+        """
+        Rimuove i dati più vecchi di HISTORY_HOURS dal buffer.
+        Questo assicura che vengano visualizzate solo le ultime 48 ore.
+        
+        Args:
+            now_ms: Istante corrente in epoch-ms (se None viene letto l'orologio)
+        """
+        if not self._count:
+            return
+        
+        if now_ms is None:
+            now_ms = time.time_ns() // 1_000_000
+        
+        # Avanza la testa oltre i punti troppo vecchi
+        cutoff = now_ms - SETTINGS.history_hours * MS_PER_HOUR
+        new_head, _ = _evict(self._ts, self._head, self._count, cutoff)
+        self._drop_oldest(new_head - self._head)
+    
+    def get_series(self, hours: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ritorna timestamp e valori del periodo richiesto come array NumPy.
+        Sono viste sul buffer interno (nessuna copia): da usare in sola lettura
+        e prima del prossimo add_data_point.
+        
+        Args:
+            hours: Numero di ore indietro (None = tutti i dati disponibili)
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (timestamp epoch-ms int64, valori float32)
+        """
+        # Buffer ordinato per tempo: ricerca binaria O(log N) + slice
+        start = self._window_start(hours)
+        tail = self._head + self._count
+        return self._ts[start:tail], self._val[start:tail]
     
     def get_data_points(self, hours: Optional[int] = None) -> List[DataPoint]:
         """
@@ -183,41 +409,45 @@ class DataManager:
         Returns:
             List[DataPoint]: Lista di punti dati ordinati cronologicamente
         """
-        if hours is None:
-            return list(self._data_buffer)
-        
-        # Filtra solo dati nelle ultime N ore
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [p for p in self._data_buffer if p.timestamp >= cutoff_time]
+        ts, values = self.get_series(hours)
+        return [DataPoint(t, v) for t, v in zip(ts.tolist(), values.tolist())]
     
-    def get_statistics(self, hours: Optional[int] = None) -> Dict[str, float]:
+    def get_statistics(self, hours: Optional[int] = None) -> Stats:
         """
         Calcola statistiche sui dati del periodo specificato.
+        Il risultato è riusato finché il buffer non cambia (chiamata ad ogni tick UI).
         
         Args:
             hours: Numero di ore indietro (None = tutti i dati)
         
         Returns:
-            Dict con keys: 'average', 'min', 'max', 'count'
+            Stats: (average, min, max, count)
         """
-        data_points = self.get_data_points(hours)
+        cached = self._stats_cache.get(hours)
+        if cached is not None and cached[0] == self._rev:
+            return cached[1]
         
-        if not data_points:
-            return {
-                'average': 0.0,
-                'min': 0.0,
-                'max': 0.0,
-                'count': 0
-            }
+        stats = self._compute_statistics(hours)
+        self._stats_cache[hours] = (self._rev, stats)
+        return stats
+    
+    def _compute_statistics(self, hours: Optional[int]) -> Stats:
+        """Calcola le statistiche del periodo (senza cache)."""
+        start = self._window_start(hours)
         
-        values = [p.value for p in data_points]
+        # Il periodo copre tutto il buffer: statistiche incrementali in O(1)
+        if start == self._head and self._count:
+            return Stats(self._sum / self._count, self._min_dq[0][0],
+                         self._max_dq[0][0], self._count)
         
-        return {
-            'average': sum(values) / len(values),
-            'min': min(values),
-            'max': max(values),
-            'count': len(values)
-        }
+        # Vista contigua sui valori del periodo: un solo passaggio in C
+        values = self._val[start:self._head + self._count]
+        
+        if not values.size:
+            return EMPTY_STATS
+        
+        return Stats(float(values.mean(dtype=np.float64)), float(values.min()),
+                     float(values.max()), int(values.size))
     
     def get_average(self, hours: Optional[int] = None) -> float:
         """
@@ -229,7 +459,7 @@ class DataManager:
         Returns:
             float: Valore medio
         """
-        return self.get_statistics(hours)['average']
+        return self.get_statistics(hours).average
     
     def get_latest_value(self) -> Optional[float]:
         """
@@ -238,11 +468,13 @@ class DataManager:
         Returns:
             Optional[float]: Ultimo valore o None se buffer vuoto
         """
-        if not self._data_buffer:
+        if not self._count:
             return None
-        return self._data_buffer[-1].value
+        return float(self._val[self._head + self._count - 1])
     
     def clear(self):
         """Svuota il buffer dati."""
-        self._data_buffer.clear()
+        self._head = 0
+        self._count = 0
+        self._reset_running_stats()
         print(f"[DataManager-{self.sensor_type}] Buffer cleared")
\ No newline at end of file
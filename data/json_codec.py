@@ -0,0 +1,63 @@
+"""
+Codec JSON per le comunicazioni con il server.
+Usa orjson (parser/encoder in Rust, lavora direttamente su bytes) se installato,
+altrimenti ricade sul modulo json della libreria standard.
+Gli array NumPy sono serializzati come liste (orjson li legge direttamente dal buffer),
+i datetime in formato ISO 8601.
+"""
+
+import json
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Header da usare quando si invia un body già serializzato
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _default(obj: Any) -> Any:
+    """Fallback per json stdlib: converte array/scalari NumPy e datetime in tipi Python."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def loads(data: bytes) -> Any:
+    """
+    Decodifica JSON da bytes (es. response.content).
+
+    Args:
+        data: Body JSON in bytes
+
+    Returns:
+        Any: Oggetto Python decodificato
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serializza un oggetto in JSON (bytes, pronto per requests data=...).
+
+    Args:
+        obj: Oggetto da serializzare
+        indent: True per output indentato di 2 spazi (file leggibili)
+
+    Returns:
+        bytes: Body JSON codificato UTF-8
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, default=_default, indent=2 if indent else None).encode('utf-8')
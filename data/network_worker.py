@@ -0,0 +1,96 @@
+"""
+Worker di rete in background.
+Esegue le chiamate HTTP (invio batch al server) su un thread dedicato,
+così il thread chiamante (loop Qt o ciclo sensori del daemon) non si blocca
+sui timeout di rete.
+"""
+
+import queue
+import threading
+from typing import Callable, Optional
+
+
+class NetworkWorker(threading.Thread):
+    """
+    Thread daemon con coda di job: ogni job è una callable eseguita in ordine.
+    Il produttore fa solo una put() sulla coda e ritorna subito.
+    """
+
+    # Sentinella per terminare il loop
+    _STOP = object()
+
+    def __init__(self, max_queue: int = 256):
+        """
+        Inizializza il worker (non ancora avviato).
+
+        Args:
+            max_queue: Numero massimo di job in coda; oltre vengono scartati
+        """
+        super().__init__(name="NetworkWorker", daemon=True)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+
+    def submit(self, job: Callable, *args) -> bool:
+        """
+        Accoda un job senza bloccare.
+
+        Returns:
+            bool: True se accodato, False se la coda è piena
+        """
+        try:
+            self._queue.put_nowait((job, args))
+            return True
+        except queue.Full:
+            print("[NetworkWorker] Queue full, job dropped")
+            return False
+
+    def run(self):
+        """Loop del worker: esegue i job in ordine finché non riceve lo stop."""
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+
+            job, args = item
+            try:
+                job(*args)
+            except Exception as e:
+                print(f"[NetworkWorker] Job error: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Termina il worker dopo aver eseguito i job già in coda.
+
+        Args:
+            timeout: Secondi massimi di attesa per lo svuotamento della coda
+        """
+        if not self.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self.join(timeout)
+
+
+_worker: Optional[NetworkWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_network_worker() -> NetworkWorker:
+    """
+    Ritorna il worker condiviso, avviandolo al primo utilizzo.
+    Un solo thread per processo: le richieste restano serializzate
+    sulla stessa sessione HTTP.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = NetworkWorker()
+            _worker.start()
+        return _worker
+
+
+def stop_network_worker(timeout: float = 5.0):
+    """Ferma il worker condiviso (se avviato), svuotando la coda."""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop(timeout)
@@ -8,12 +8,51 @@ Responsabilità:
 - Retry automatico su failure
 """
 
+import atexit
+import gzip
+import threading
+import time
+from collections import deque
+import numpy as np
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from logger.logger import get_logger
+from . import json_codec
+from .network_worker import get_network_worker
+
+# msgpack opzionale: invio binario degli array sensori (fallback JSON colonnare)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Header del body binario (msgpack compresso gzip)
+MSGPACK_GZIP_HEADERS = {
+    'Content-Type': 'application/msgpack',
+    'Content-Encoding': 'gzip',
+}
+
+
+# Contenuto dei file token già letti (path assoluto -> dati JSON),
+# condiviso tra istanze per non rileggere il file ad ogni ServerAPI()
+_TOKEN_CACHE: Dict[str, dict] = {}
+
+# Endpoint noti del backend (URL completi precalcolati in ServerAPI.__init__)
+ENDPOINTS = (
+    '/isAuthorized',
+    '/temperature/history',
+    '/power/history',
+    '/setupFrigo.php',
+    '/sensorData.php',
+    '/setProdotti.php',
+    '/reportError.php',
+)
 
 
 class ServerAPI:
@@ -23,7 +62,10 @@ class ServerAPI:
     """
     
     def __init__(self, base_url: str, token_file: str = "fridge_token.json", 
-                 max_retries: int = 3, retry_delay: int = 5):
+                 max_retries: int = 3, retry_delay: int = 5,
+                 sensor_send_interval: int = 60, sensor_batch_size: int = 64,
+                 sensor_max_pending: int = 3600, sensor_binary_upload: bool = False,
+                 sensor_columnar_upload: bool = False):
         """
         Inizializza il client API.
         
@@ -31,21 +73,70 @@ class ServerAPI:
             base_url: URL base del server (es. "https://api.smartfridge.com")
             token_file: Path del file dove salvare il token frigo
             max_retries: Numero massimo di retry su errore
-            retry_delay: Secondi tra un retry e l'altro
+            retry_delay: Secondi base del backoff esponenziale tra i retry
+            sensor_send_interval: Secondi tra due invii dei punti sensori accodati
+            sensor_batch_size: Punti accodati che fanno scattare l'invio in anticipo
+            sensor_max_pending: Punti massimi in attesa per sensore (poi scarta i più vecchi)
+            sensor_binary_upload: True per inviare i sensori in msgpack+gzip
+                (solo se il server lo supporta; richiede msgpack installato)
+            sensor_columnar_upload: True per inviare i sensori in JSON colonnare
+                (solo se il server lo supporta; altrimenti formato per punto)
         """
         self.base_url = base_url.rstrip('/')
+        # URL completi per endpoint (evita di ricostruirli ad ogni chiamata)
+        self._urls: Dict[str, str] = {ep: f"{self.base_url}{ep}" for ep in ENDPOINTS}
         self.token_file = Path(token_file)
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         
         self.logger = get_logger('server_api')
         
+        # Sessione HTTP condivisa: keep-alive e riuso delle connessioni TCP/TLS.
+        # I retry sono gestiti dall'adapter (urllib3.Retry, backoff esponenziale).
+        self.session = requests.Session()
+        adapter = self._make_adapter(max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # URL con numero di retry diverso dal default (adapter dedicato)
+        self._retry_overrides: Dict[str, int] = {}
+        
+        # Timeout (connessione, lettura) in secondi
+        self._timeout = (3, 10)
+        
+        # Pool per inviare in parallelo richieste indipendenti (es. prodotti
+        # ed error report dopo la chiusura porta): una richiesta lenta non
+        # blocca le altre. Dimensionato entro il pool di connessioni della sessione.
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ServerAPI')
+        
         # Token frigo (caricato da file se esiste)
         self.fridge_token: Optional[str] = None
         self.token_last_validated: Optional[datetime] = None
         
+        # True se token/ultima validazione sono cambiati rispetto al file
+        self._token_dirty = False
+        
         self._load_token()
         
+        # Rete di sicurezza: salva eventuali modifiche non ancora scritte
+        atexit.register(self._save_token)
+        
+        # Punti sensori accodati dai DataManager: temperatura e potenza
+        # vengono inviati insieme con un'unica PUT (send_sensor_data)
+        self._sensor_pending: Dict[str, deque] = {
+            'temperature': deque(maxlen=sensor_max_pending),
+            'power': deque(maxlen=sensor_max_pending),
+        }
+        self._sensor_lock = threading.Lock()
+        self._sensor_flush_inflight = False
+        self._last_sensor_flush_ns: Optional[int] = None
+        self._sensor_send_interval_ns = sensor_send_interval * 1_000_000_000
+        self._sensor_batch_size = sensor_batch_size
+        # Formato binario solo se abilitato in config; disattivato al
+        # primo 4xx (il server non lo supporta o rifiuta il body)
+        self._sensor_msgpack = sensor_binary_upload and MSGPACK_AVAILABLE
+        # Stesso criterio per il JSON colonnare (fallback: send_sensor_data)
+        self._sensor_columnar = sensor_columnar_upload
+        
         self.logger.info(f"ServerAPI initialized (base_url: {self.base_url})")
     
     # ============================================================
@@ -54,24 +145,35 @@ class ServerAPI:
     
     def _load_token(self) -> bool:
         """
-        Carica il token frigo dal file locale.
+        Carica il token frigo dal file locale (una sola lettura per processo).
         
         Returns:
             bool: True se token caricato, False se file non esiste
         """
-        if not self.token_file.exists():
-            self.logger.warning(f"Token file not found: {self.token_file}")
-            return False
+        cache_key = str(self.token_file.resolve())
+        data = _TOKEN_CACHE.get(cache_key)
+        
+        if data is None:
+            if not self.token_file.exists():
+                self.logger.warning(f"Token file not found: {self.token_file}")
+                return False
+            
+            try:
+                with open(self.token_file, 'rb') as f:
+                    data = json_codec.loads(f.read())
+            except Exception as e:
+                self.logger.error(f"Error loading token: {e}")
+                return False
+            
+            _TOKEN_CACHE[cache_key] = data
         
         try:
-            with open(self.token_file, 'r') as f:
-                data = json.load(f)
-                self.fridge_token = data.get('token')
-                
-                # Carica timestamp ultima validazione se presente
-                last_validated_str = data.get('last_validated')
-                if last_validated_str:
-                    self.token_last_validated = datetime.fromisoformat(last_validated_str)
+            self.fridge_token = data.get('token')
+            
+            # Carica timestamp ultima validazione se presente
+            last_validated_str = data.get('last_validated')
+            if last_validated_str:
+                self.token_last_validated = datetime.fromisoformat(last_validated_str)
             
             self.logger.info("Token loaded from file")
             return True
@@ -80,15 +182,21 @@ class ServerAPI:
             return False
     
     def _save_token(self):
-        """Salva il token frigo su file locale."""
+        """Salva il token frigo su file locale (solo se modificato)."""
+        if not self._token_dirty:
+            return
+        
         try:
             data = {
                 'token': self.fridge_token,
-                'last_validated': datetime.utcnow().isoformat() if self.token_last_validated else None
+                'last_validated': self.token_last_validated.isoformat() if self.token_last_validated else None
             }
             
-            with open(self.token_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(self.token_file, 'wb') as f:
+                f.write(json_codec.dumps(data, indent=True))
+            
+            _TOKEN_CACHE[str(self.token_file.resolve())] = data
+            self._token_dirty = False
             
             self.logger.info("Token saved to file")
         except Exception as e:
@@ -107,21 +215,26 @@ class ServerAPI:
             return False
         
         try:
-            url = f"{self.base_url}/isAuthorized"
+            url = self._urls['/isAuthorized']
             params = {'tokenFrigo': self.fridge_token}
             
             self.logger.info("Validating token...")
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=self._timeout)
             response.raise_for_status()
             
-            data = response.json()
+            data = json_codec.loads(response.content)
             new_token = data.get('token')
             
-            if new_token and new_token != self.fridge_token:
+            token_renewed = bool(new_token) and new_token != self.fridge_token
+            if token_renewed:
                 self.logger.info("Token renewed by server")
                 self.fridge_token = new_token
             
             self.token_last_validated = datetime.utcnow()
+            self._token_dirty = True
+            
+            # Salvato subito (al più una volta al giorno, vedi should_validate_token):
+            # atexit non scatta se il processo viene terminato da un segnale
             self._save_token()
             
             self.logger.info("Token validated successfully")
@@ -156,14 +269,16 @@ class ServerAPI:
         Returns:
             bool: True se setup riuscito, False altrimenti
         """
+        self.logger.info("Setting up new fridge...")
+        
+        # Nessun retry: un POST ripetuto dopo un timeout registrerebbe il frigo due volte
+        response = self._request('POST', '/setupFrigo.php', 'setup_fridge', max_retries=0)
+        if response is None or not response.ok:
+            self.logger.error("Fridge setup failed")
+            return False
+        
         try:
-            url = f"{self.base_url}/setupFrigo.php"
-            
-            self.logger.info("Setting up new fridge...")
-            response = requests.post(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = json_codec.loads(response.content)
             self.fridge_token = data.get('token')
             
             if not self.fridge_token:
@@ -171,13 +286,14 @@ class ServerAPI:
                 return False
             
             self.token_last_validated = datetime.utcnow()
+            self._token_dirty = True
             self._save_token()
             
             self.logger.info(f"Fridge setup complete (token: {self.fridge_token[:8]}...)")
             return True
             
-        except requests.RequestException as e:
-            self.logger.error(f"Fridge setup failed: {e}")
+        except ValueError as e:
+            self.logger.error(f"Fridge setup failed: invalid response: {e}")
             return False
     
     # ============================================================
@@ -276,14 +392,206 @@ class ServerAPI:
             max_retries=1  # Solo 1 retry per errori
         )
     
+    # ============================================================
+    # SENSOR DATA (DataManager)
+    # ============================================================
+    
+    def get_sensor_history(self, sensor_type: str, hours: int) -> Optional[List[Dict]]:
+        """
+        Scarica lo storico di un sensore.
+        
+        Args:
+            sensor_type: "temperature" o "power"
+            hours: Ore di storico richieste
+        
+        Returns:
+            Optional[List[Dict]]: Lista di {'timestamp', 'value'}, None su errore
+        """
+        try:
+            url = self._urls[f'/{sensor_type}/history']
+            response = self.session.get(url, params={'hours': hours}, timeout=self._timeout)
+            response.raise_for_status()
+            return json_codec.loads(response.content).get('data', [])
+            
+        except requests.RequestException as e:
+            self.logger.error(f"Loading {sensor_type} history failed: {e}")
+            return None
+    
+    def queue_sensor_point(self, sensor_type: str, ts_ms: int, value: float):
+        """
+        Accoda un punto sensore per il prossimo invio congiunto e,
+        se è il momento, avvia l'invio in background.
+        
+        Args:
+            sensor_type: "temperature" o "power"
+            ts_ms: Timestamp del punto in epoch-ms
+            value: Valore letto
+        """
+        now_ns = time.monotonic_ns()
+        
+        # Lo stato dell'invio è letto e aggiornato sotto lock: il flag
+        # viene azzerato dal thread del NetworkWorker (_flush_sensor_data)
+        with self._sensor_lock:
+            queue = self._sensor_pending[sensor_type]
+            queue.append((ts_ms, value))
+            
+            if self._sensor_flush_inflight:
+                return
+            
+            # Prima sincronizzazione, intervallo trascorso o batch pieno
+            # (contato per sensore: la soglia non si dimezza con due sensori)
+            if not (self._last_sensor_flush_ns is None or
+                    now_ns - self._last_sensor_flush_ns >= self._sensor_send_interval_ns or
+                    len(queue) >= self._sensor_batch_size):
+                return
+            
+            self._last_sensor_flush_ns = now_ns
+            self._sensor_flush_inflight = True
+        
+        if not get_network_worker().submit(self._flush_sensor_data):
+            with self._sensor_lock:
+                self._sensor_flush_inflight = False
+    
+    def _flush_sensor_data(self):
+        """
+        Eseguito sul NetworkWorker: invia insieme i punti di temperatura
+        e potenza accodati; in caso di errore li rimette in testa alla coda.
+        """
+        try:
+            with self._sensor_lock:
+                temp = list(self._sensor_pending['temperature'])
+                power = list(self._sensor_pending['power'])
+                self._sensor_pending['temperature'].clear()
+                self._sensor_pending['power'].clear()
+            
+            if not temp and not power:
+                return
+            
+            if not self.send_sensor_arrays(self._to_arrays(temp), self._to_arrays(power)):
+                with self._sensor_lock:
+                    for sensor_type, batch in (('temperature', temp), ('power', power)):
+                        q = self._sensor_pending[sensor_type]
+                        self._sensor_pending[sensor_type] = deque(batch + list(q), maxlen=q.maxlen)
+        finally:
+            with self._sensor_lock:
+                self._sensor_flush_inflight = False
+    
+    @staticmethod
+    def _to_arrays(points: List[Tuple[int, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Converte [(ts_ms, valore), ...] in due array paralleli (int64, float32)."""
+        ts = np.fromiter((t for t, _ in points), dtype=np.int64, count=len(points))
+        values = np.fromiter((v for _, v in points), dtype=np.float32, count=len(points))
+        return ts, values
+    
+    @staticmethod
+    def _to_points(arrays: Tuple[np.ndarray, np.ndarray]) -> List[Tuple[str, float]]:
+        """Converte gli array paralleli nelle tuple (timestamp_iso, valore) di send_sensor_data."""
+        ts, values = arrays
+        return [(datetime.fromtimestamp(t / 1000).isoformat(), v)
+                for t, v in zip(ts.tolist(), values.tolist())]
+    
+    def send_sensor_arrays(self, temperature: Tuple[np.ndarray, np.ndarray],
+                           power: Tuple[np.ndarray, np.ndarray]) -> bool:
+        """
+        Variante colonnare di send_sensor_data: timestamp (epoch-ms) e valori
+        viaggiano come array paralleli, serializzati in un solo passaggio
+        (niente isoformat() né dict per punto).
+        Se abilitato (sensor_binary_upload) e con msgpack installato gli array
+        sono inviati come buffer binari (int64/float32 little-endian) compressi
+        gzip; se abilitato (sensor_columnar_upload) come JSON colonnare.
+        Altrimenti, o alla prima risposta 4xx di un formato, si usa
+        definitivamente il formato per punto di send_sensor_data.
+        
+        Args:
+            temperature: (timestamp int64 epoch-ms, valori float32)
+            power: (timestamp int64 epoch-ms, valori float32)
+        
+        Returns:
+            bool: True se invio riuscito, False altrimenti
+        """
+        if not self.fridge_token:
+            self.logger.error("Cannot send data: no token available")
+            return False
+        
+        if self._sensor_msgpack:
+            response = self._request(
+                'PUT', '/sensorData.php', 'send_sensor_data',
+                data=self._pack_sensor_arrays(temperature, power),
+                headers=MSGPACK_GZIP_HEADERS
+            )
+            if response is None or not 400 <= response.status_code < 500:
+                return response is not None and response.ok
+            self.logger.warning(f"send_sensor_data: msgpack rejected by server "
+                                f"(HTTP {response.status_code}), falling back to JSON")
+            self._sensor_msgpack = False
+        
+        if self._sensor_columnar:
+            payload = {
+                'token': self.fridge_token,
+                'format': 'columnar',
+                'temperature': {'ts': temperature[0], 'value': temperature[1]},
+                'power': {'ts': power[0], 'value': power[1]}
+            }
+            response = self._request(
+                'PUT', '/sensorData.php', 'send_sensor_data',
+                data=json_codec.dumps(payload),
+                headers=json_codec.JSON_HEADERS
+            )
+            if response is None or not 400 <= response.status_code < 500:
+                return response is not None and response.ok
+            self.logger.warning(f"send_sensor_data: columnar JSON rejected by server "
+                                f"(HTTP {response.status_code}), falling back to per-point JSON")
+            self._sensor_columnar = False
+        
+        return self.send_sensor_data(self._to_points(temperature), self._to_points(power))
+    
+    def _pack_sensor_arrays(self, temperature: Tuple[np.ndarray, np.ndarray],
+                            power: Tuple[np.ndarray, np.ndarray]) -> bytes:
+        """
+        Serializza gli array sensori in msgpack (buffer grezzi, 12 byte per punto)
+        e comprime il risultato con gzip.
+        """
+        def columns(ts: np.ndarray, values: np.ndarray) -> Dict[str, bytes]:
+            return {
+                'ts': np.ascontiguousarray(ts, dtype='<i8').tobytes(),
+                'value': np.ascontiguousarray(values, dtype='<f4').tobytes(),
+            }
+        
+        payload = {
+            'token': self.fridge_token,
+            'format': 'columnar-binary',
+            'dtype': {'ts': '<i8', 'value': '<f4'},
+            'temperature': columns(*temperature),
+            'power': columns(*power),
+        }
+        return gzip.compress(msgpack.packb(payload, use_bin_type=True), compresslevel=6)
+    
     # ============================================================
     # HTTP HELPERS
     # ============================================================
     
+    def _make_adapter(self, max_retries: int) -> HTTPAdapter:
+        """
+        Crea un adapter HTTP con pool di connessioni e retry con backoff
+        esponenziale su errori di rete e risposte 502/503/504.
+        
+        Args:
+            max_retries: Numero massimo di retry
+        """
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=self.retry_delay / 2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'POST', 'PUT']),
+            raise_on_status=False
+        )
+        return HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    
     def _send_with_retry(self, method: str, endpoint: str, json_data: Dict,
                         operation_name: str, max_retries: int = None) -> bool:
         """
-        Invia richiesta HTTP con retry automatico su fallimento.
+        Invia richiesta HTTP con retry automatico su fallimento
+        (eseguiti dall'adapter della sessione, vedi _make_adapter).
         
         Args:
             method: Metodo HTTP ('GET', 'POST', 'PUT')
@@ -295,40 +603,56 @@ class ServerAPI:
         Returns:
             bool: True se richiesta riuscita, False dopo tutti i retry
         """
-        if max_retries is None:
-            max_retries = self.max_retries
+        if method == 'GET':
+            kwargs = {'params': json_data}
+        elif method in ('POST', 'PUT'):
+            kwargs = {'data': json_codec.dumps(json_data), 'headers': json_codec.JSON_HEADERS}
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        response = self._request(method, endpoint, operation_name, max_retries, **kwargs)
+        return response is not None and response.ok
+    
+    def _request(self, method: str, endpoint: str, operation_name: str,
+                 max_retries: int = None, **kwargs) -> Optional[requests.Response]:
+        """
+        Esegue la richiesta sulla sessione condivisa (retry nell'adapter).
+        
+        Args:
+            method: Metodo HTTP
+            endpoint: Endpoint API
+            operation_name: Nome operazione per logging
+            max_retries: Override del numero massimo di retry
+            **kwargs: Argomenti per session.request (params, data, headers)
+        
+        Returns:
+            Optional[requests.Response]: Risposta (anche di errore HTTP),
+                None se la richiesta non è arrivata al server
+        """
+        url = self._urls.get(endpoint) or f"{self.base_url}{endpoint}"
         
-        url = f"{self.base_url}{endpoint}"
+        # Override dei retry: adapter dedicato montato sul singolo URL
+        # (requests sceglie il prefisso più lungo)
+        if max_retries is not None and max_retries != self.max_retries:
+            if self._retry_overrides.get(url) != max_retries:
+                self.session.mount(url, self._make_adapter(max_retries))
+                self._retry_overrides[url] = max_retries
         
-        for attempt in range(max_retries + 1):
-            try:
-                self.logger.info(f"{operation_name}: attempt {attempt + 1}/{max_retries + 1}")
-                
-                # Invia richiesta
-                if method == 'GET':
-                    response = requests.get(url, params=json_data, timeout=10)
-                elif method == 'POST':
-                    response = requests.post(url, json=json_data, timeout=10)
-                elif method == 'PUT':
-                    response = requests.put(url, json=json_data, timeout=10)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                response.raise_for_status()
-                
-                self.logger.info(f"{operation_name}: success")
-                return True
-                
-            except requests.RequestException as e:
-                self.logger.warning(f"{operation_name} failed (attempt {attempt + 1}): {e}")
-                
-                # Se non è l'ultimo tentativo, aspetta prima di ritentare
-                if attempt < max_retries:
-                    import time
-                    time.sleep(self.retry_delay)
-        
-        self.logger.error(f"{operation_name}: all retries exhausted")
-        return False
+        try:
+            self.logger.info(f"{operation_name}: sending")
+            
+            # Invia richiesta sulla sessione condivisa (retry nell'adapter)
+            response = self.session.request(method, url, timeout=self._timeout, **kwargs)
+            
+        except requests.RequestException as e:
+            self.logger.error(f"{operation_name}: failed after retries: {e}")
+            return None
+        
+        if response.ok:
+            self.logger.info(f"{operation_name}: success")
+        else:
+            self.logger.error(f"{operation_name}: failed after retries: HTTP {response.status_code}")
+        return response
     
     # ============================================================
     # UTILITY
@@ -350,4 +674,27 @@ class ServerAPI:
         Returns:
             Optional[str]: Token o None se non configurato
         """
-        return self.fridge_token
\ No newline at end of file
+        return self.fridge_token
+    
+    def submit(self, send_fn: Callable[..., bool], *args, **kwargs) -> Future:
+        """
+        Esegue un invio (es. self.send_error_report) su un thread del pool
+        e ritorna subito.
+        
+        Args:
+            send_fn: Metodo di invio da eseguire
+            *args, **kwargs: Argomenti per send_fn
+        
+        Returns:
+            Future: result() restituisce il bool di send_fn
+        """
+        return self._executor.submit(send_fn, *args, **kwargs)
+    
+    def close(self):
+        """
+        Attende gli invii in corso, salva eventuali modifiche pendenti
+        al token e chiude la sessione HTTP.
+        """
+        self._executor.shutdown(wait=True)
+        self._save_token()
+        self.session.close()
\ No newline at end of file
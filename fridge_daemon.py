@@ -10,33 +10,75 @@ ResponsabilitÃ :
 - Gestisce retry ed errori
 """
 
+import asyncio
 import time
 import threading
-import json
+import os
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Tuple
-from collections import deque
+from typing import List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
+# uvloop opzionale: event loop in Cython, fallback sull'asyncio standard
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Import con path corretti per la tua struttura
 from image_recognition.camera_manager import CameraManager
 from sensors.door_sensor import DoorSensor
 from image_recognition.yolo_detector import YOLODetector
 from data.server_api import ServerAPI
 from sensors import TemperatureSensor, PowerSensor
-from data import DataManager
+from sensors.shared_sensors import SharedSensorWriter
+from data import DataManager, json_codec, stop_network_worker
 from logger.logger import get_logger, log_error_for_server
 
 from config import (
     API_BASE_URL, FRIDGE_TOKEN_FILE, API_MAX_RETRIES, API_RETRY_DELAY_SECONDS,
     CAMERA_IMAGE_DIR, CAMERA_RESOLUTION, CAMERA_WARMUP_FRAMES, CAMERA_MAX_RETRIES,
-    DOOR_GPIO_PIN, DOOR_DEBOUNCE_TIME_SECONDS, DOOR_USE_PULLUP, DOOR_CLOSE_DELAY_SECONDS,
-    DOOR_MOCK_MODE,
-    YOLO_MODEL_PATH, YOLO_CONFIDENCE_THRESHOLD, YOLO_MAX_RETRIES,
-    SENSOR_DATA_SEND_INTERVAL_SECONDS, TOKEN_VALIDATION_INTERVAL_HOURS,
-    POLLING_INTERVAL_MS, SHARED_SENSORS_FILE
+    DOOR_GPIO_PIN, DOOR_GPIO_CHIP, DOOR_DEBOUNCE_TIME_SECONDS, DOOR_USE_PULLUP, DOOR_CLOSE_DELAY_SECONDS,
+    DOOR_MOCK_MODE, DOOR_THREAD_CPU, DOOR_THREAD_RT_PRIORITY,
+    YOLO_MODEL_PATH, YOLO_CONFIDENCE_THRESHOLD, YOLO_MAX_RETRIES, YOLO_EXPORT_FORMAT,
+    SENSOR_DATA_SEND_INTERVAL_SECONDS, SENSOR_BINARY_UPLOAD, SENSOR_COLUMNAR_UPLOAD,
+    TOKEN_VALIDATION_INTERVAL_HOURS,
+    DATA_SYNC_BATCH_SIZE, DATA_SYNC_MAX_PENDING,
+    POLLING_INTERVAL_MS, SHARED_SENSORS_FILE, SHARED_SENSORS_FILE_INTERVAL_SECONDS
 )
 
+# Attesa massima in stop() per le chiamate bloccanti in corso (cattura, YOLO, HTTP)
+STOP_TIMEOUT_SECONDS = 10.0
+
+
+def _set_thread_realtime(cpu: Optional[int], priority: int) -> List[str]:
+    """
+    Pinning su un core e SCHED_FIFO per il thread chiamante (su Linux pid 0 =
+    thread corrente). Serve CAP_SYS_NICE: senza permessi si resta sullo
+    scheduling normale.
+    
+    Returns:
+        List[str]: Impostazioni applicate (per il log)
+    """
+    applied = []
+    try:
+        if cpu is not None and cpu in os.sched_getaffinity(0):
+            os.sched_setaffinity(0, {cpu})
+            applied.append(f"cpu {cpu}")
+    except (AttributeError, OSError):
+        pass
+    try:
+        if priority > 0:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            applied.append(f"SCHED_FIFO {priority}")
+    except (AttributeError, OSError):
+        pass
+    return applied
+
 
 class FridgeDaemon:
     """
@@ -57,7 +99,12 @@ class FridgeDaemon:
             base_url=API_BASE_URL,
             token_file=FRIDGE_TOKEN_FILE,
             max_retries=API_MAX_RETRIES,
-            retry_delay=API_RETRY_DELAY_SECONDS
+            retry_delay=API_RETRY_DELAY_SECONDS,
+            sensor_send_interval=SENSOR_DATA_SEND_INTERVAL_SECONDS,
+            sensor_batch_size=DATA_SYNC_BATCH_SIZE,
+            sensor_max_pending=DATA_SYNC_MAX_PENDING,
+            sensor_binary_upload=SENSOR_BINARY_UPLOAD,
+            sensor_columnar_upload=SENSOR_COLUMNAR_UPLOAD
         )
         
         # Camera manager
@@ -69,6 +116,7 @@ class FridgeDaemon:
         # Door sensor
         self.door = DoorSensor(
             gpio_pin=DOOR_GPIO_PIN,
+            gpio_chip=DOOR_GPIO_CHIP,
             debounce_time=DOOR_DEBOUNCE_TIME_SECONDS,
             pull_up=DOOR_USE_PULLUP,
             mock_mode=DOOR_MOCK_MODE
@@ -78,7 +126,8 @@ class FridgeDaemon:
         self.yolo = YOLODetector(
             model_path=YOLO_MODEL_PATH,
             confidence_threshold=YOLO_CONFIDENCE_THRESHOLD,
-            max_retries=YOLO_MAX_RETRIES
+            max_retries=YOLO_MAX_RETRIES,
+            export_format=YOLO_EXPORT_FORMAT
         )
         
         # Sensori temperatura e potenza
@@ -86,22 +135,49 @@ class FridgeDaemon:
         self.power_sensor = PowerSensor()
         
         # Data managers (per ora senza invio automatico al server)
-        self.temp_data = DataManager('temperature', api_enabled=False)
-        self.power_data = DataManager('power', api_enabled=False)
+        self.temp_data = DataManager('temperature', api_enabled=False, server_api=self.api)
+        self.power_data = DataManager('power', api_enabled=False, server_api=self.api)
         
         # === STATO INTERNO ===
         
-        # Buffer per dati da inviare al server ogni minuto
-        self.temp_buffer: deque = deque()  # (timestamp, valore)
-        self.power_buffer: deque = deque()
+        # Buffer SoA per dati da inviare al server ogni minuto: valori float32 e
+        # timestamp epoch-ns preallocati, un solo indice di scrittura per entrambi
+        # i sensori (letti insieme). Inviati come array con send_sensor_arrays.
+        # Crescono se il server non risponde, fino a DATA_SYNC_MAX_PENDING
+        # campioni: oltre si scartano i più vecchi (come la coda del ServerAPI).
+        capacity = max(1, int(np.ceil(SENSOR_DATA_SEND_INTERVAL_SECONDS * 1000 / POLLING_INTERVAL_MS)) + 1)
+        self._max_samples = max(capacity, DATA_SYNC_MAX_PENDING)
+        self._temp_vals = np.empty(capacity, dtype=np.float32)
+        self._temp_ts = np.empty(capacity, dtype=np.int64)
+        self._power_vals = np.empty(capacity, dtype=np.float32)
+        self._power_ts = np.empty(capacity, dtype=np.int64)
+        self._write_idx = 0
+        # Campioni scartati dall'avvio dell'invio in corso (vedi _send_sensor_batch)
+        self._dropped_while_sending = 0
+        self._dropped_since_warning = 0
+        self._last_drop_warning_ns: Optional[int] = None
+        
+        # Ultima lettura per la UI: shared memory a ogni campione, file JSON diradato
+        self._ui_shared = SharedSensorWriter()
+        self._ui_shared.open()
+        self._last_file_save = -SHARED_SENSORS_FILE_INTERVAL_SECONDS  # primo campione scritto subito
         
         # Timestamp ultimo invio dati e ultima validazione token
-        self.last_sensor_send_time = datetime.utcnow()
+        # (orologio monotono: l'intervallo non salta con gli aggiustamenti NTP)
+        self.last_sensor_send_ns = time.monotonic_ns()
         self.last_token_validation = None
+        self._next_token_check_ns = 0
+        
+        # Event loop e pool per il lavoro bloccante (camera, YOLO, HTTP):
+        # creati in run_async()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Chiamate inviate al pool e non ancora attese (usato solo dal thread del loop)
+        self._pending: set = set()
+        self._door_lock: Optional[asyncio.Lock] = None
         
-        # Flag per controllo thread
+        # Flag per controllo task/thread
         self.running = False
-        self._sensor_thread = None
         self._door_thread = None
         
         self.logger.info("Daemon initialization complete")
@@ -175,7 +251,18 @@ class FridgeDaemon:
     # ============================================================
     
     def start(self):
-        """Avvia il daemon (blocking)."""
+        """Avvia il daemon (blocking): esegue run_async() su un nuovo event loop."""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            self.logger.info("Keyboard interrupt received")
+    
+    async def run_async(self):
+        """
+        Orchestrazione su event loop: polling sensori, I/O verso il server e
+        sequenza porta chiusa sono task dello stesso loop; le chiamate bloccanti
+        (camera, YOLO, HTTP) girano in un pool di 2 thread.
+        """
         self.logger.info("Starting daemon...")
         
         if not self.initialize_components():
@@ -183,52 +270,84 @@ class FridgeDaemon:
             return
         
         self.running = True
-        
-        # === THREAD SENSORI (polling temp/power) ===
-        self._sensor_thread = threading.Thread(target=self._sensor_polling_loop, daemon=True)
-        self._sensor_thread.start()
-        self.logger.info("Sensor polling thread started")
-        
-        # === THREAD DOOR MONITOR (con callback) ===
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="daemon-io")
+        self._door_lock = asyncio.Lock()
+        
+        # === TASK SENSORI (polling temp/power) e SERVER (invio dati, token) ===
+        tasks = [
+            asyncio.create_task(self._sensor_polling_loop(), name="sensor-polling"),
+            asyncio.create_task(self._server_io_loop(), name="server-io"),
+        ]
+        self.logger.info("Sensor polling task started")
+        
+        # === THREAD DOOR MONITOR (polling GPIO bloccante, callback girate al loop) ===
         self.door.set_on_door_closed_callback(self._on_door_closed)
         self.door.set_on_door_opened_callback(self._on_door_opened)
         
-        self._door_thread = threading.Thread(target=self.door.monitor_loop, args=(0.5,), daemon=True)
+        self._door_thread = threading.Thread(target=self._door_monitor_thread, daemon=True)
         self._door_thread.start()
         self.logger.info("Door monitor thread started")
         
-        # === MAIN LOOP (gestione token e monitoring) ===
         self.logger.info("Daemon running. Press Ctrl+C to stop.")
         try:
-            while self.running:
-                # Valida token se necessario
-                self._check_token_validation()
-                
-                # Sleep per non consumare CPU
-                time.sleep(10)
-                
-        except KeyboardInterrupt:
-            self.logger.info("Keyboard interrupt received")
+            await asyncio.gather(*tasks)
         finally:
+            for task in tasks:
+                task.cancel()
             self.stop()
     
+    def _door_monitor_thread(self):
+        """
+        Entry point del thread porta: core dedicato e priorità RT bassa, così
+        debouncing e rilevamento non subiscono il jitter di YOLO sugli altri core.
+        Il thread non crea altri thread, quindi le impostazioni non si propagano.
+        """
+        applied = _set_thread_realtime(DOOR_THREAD_CPU, DOOR_THREAD_RT_PRIORITY)
+        if applied:
+            self.logger.info(f"Door monitor scheduling: {', '.join(applied)}")
+        else:
+            self.logger.debug("Door monitor running with default scheduling")
+        self.door.monitor_loop(0.5)
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Esegue una chiamata bloccante nel pool senza fermare l'event loop."""
+        future = self._executor.submit(func, *args, **kwargs)
+        self._pending.add(future)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            self._pending.discard(future)
+    
     def stop(self):
         """Ferma il daemon e libera risorse."""
         self.logger.info("Stopping daemon...")
         self.running = False
         
-        # Aspetta che i thread finiscano
-        if self._sensor_thread:
-            self._sensor_thread.join(timeout=2)
+        # Il thread porta è daemon: attesa breve
         if self._door_thread:
             self._door_thread.join(timeout=2)
         
+        # Le chiamate in coda vengono annullate; quelle in corso (es. cattura o
+        # detection) usano camera e YOLO: attesa limitata prima del cleanup
+        busy = set()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            _, busy = concurrent.futures.wait(self._pending, timeout=STOP_TIMEOUT_SECONDS)
+        
         # Cleanup componenti
-        self.camera.cleanup()
+        if busy:
+            self.logger.warning(f"{len(busy)} blocking call(s) still running after "
+                                f"{STOP_TIMEOUT_SECONDS:.0f}s, skipping camera/YOLO cleanup")
+        else:
+            self.camera.cleanup()
+            self.yolo.cleanup()
         self.door.cleanup()
-        self.yolo.cleanup()
         self.temp_sensor.cleanup()
         self.power_sensor.cleanup()
+        self._ui_shared.close()
+        stop_network_worker()  # svuota gli invii in coda prima di chiudere la sessione
+        self.api.close()
         
         self.logger.info("Daemon stopped")
     
@@ -236,29 +355,29 @@ class FridgeDaemon:
     # SENSOR POLLING
     # ============================================================
     
-    def _sensor_polling_loop(self):
+    async def _sensor_polling_loop(self):
         """
         Loop polling sensori (temperatura e potenza).
         Legge ogni secondo e accumula per invio ogni minuto.
         """
+        interval = POLLING_INTERVAL_MS / 1000.0
         while self.running:
             try:
-                # Leggi temperatura
+                # Leggi temperatura e potenza: un solo timestamp epoch-ns per tick,
+                # nessun datetime né stringa ISO sul percorso per campione
                 temp = self.temp_sensor.read()
-                timestamp = datetime.utcnow()
-                self.temp_buffer.append((timestamp.isoformat(), temp))
-                self.temp_data.add_data_point(temp, timestamp)
-                
-                # Leggi potenza
                 power = self.power_sensor.read()
-                self.power_buffer.append((timestamp.isoformat(), power))
-                self.power_data.add_data_point(power, timestamp)
+                sample_ns = time.time_ns()
+                
+                # Stesso istante epoch-ms per le due serie, calcolato una volta
+                sample_ms = sample_ns // 1_000_000
+                self.temp_data.add_data_point(temp, ts_ms=sample_ms)
+                self.power_data.add_data_point(power, ts_ms=sample_ms)
                 
-                # Salva dati in file condiviso per UI
-                self._save_sensors_to_file(temp, power, timestamp)
+                self._append_sample(temp, power, sample_ns)
                 
-                # Invia al server se è passato 1 minuto
-                self._check_sensor_data_send()
+                # Pubblica ultima lettura per la UI
+                self._publish_sensors(temp, power, sample_ns)
                 
             except Exception as e:
                 self.logger.error(f"Error in sensor polling: {e}")
@@ -266,7 +385,54 @@ class FridgeDaemon:
                 # Continua il loop anche in caso di errore
             
             # Aspetta intervallo polling
-            time.sleep(POLLING_INTERVAL_MS / 1000.0)
+            await asyncio.sleep(interval)
+    
+    def _append_sample(self, temp: float, power: float, timestamp_ns: int):
+        """
+        Scrive una lettura nei buffer SoA (nessuna allocazione per campione).
+        Se l'invio fallisce i buffer si riempiono: raddoppia la capacità fino
+        a _max_samples, poi scarta i campioni più vecchi.
+        """
+        i = self._write_idx
+        if i == self._max_samples:
+            # Scarta un blocco (10%) per non spostare gli array a ogni campione
+            self._drop_oldest(max(1, i // 10))
+            i = self._write_idx
+        elif i == len(self._temp_vals):
+            new_size = min(2 * i, self._max_samples)
+            self._temp_vals = np.resize(self._temp_vals, new_size)
+            self._temp_ts = np.resize(self._temp_ts, new_size)
+            self._power_vals = np.resize(self._power_vals, new_size)
+            self._power_ts = np.resize(self._power_ts, new_size)
+        
+        self._temp_vals[i] = temp
+        self._temp_ts[i] = timestamp_ns
+        self._power_vals[i] = power
+        self._power_ts[i] = timestamp_ns
+        self._write_idx = i + 1
+    
+    @staticmethod
+    def _to_columns(ts_ns: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Copia una porzione dei buffer nel formato di ServerAPI.send_sensor_arrays
+        (timestamp epoch-ms int64, valori float32): copie indipendenti dai buffer,
+        che il polling continua a scrivere durante l'invio.
+        """
+        return ts_ns // 1_000_000, values.copy()
+    
+    def _publish_sensors(self, temperature: float, power: float, timestamp_ns: int):
+        """
+        Pubblica l'ultima lettura per la UI: shared memory a ogni campione
+        (un pack_into, nessuna syscall), file JSON al massimo ogni
+        SHARED_SENSORS_FILE_INTERVAL_SECONDS (fallback e debug, meno usura della SD).
+        """
+        if self._ui_shared.is_open():
+            self._ui_shared.write(temperature, power, timestamp_ns // 1000)
+        
+        now = time.monotonic()
+        if now - self._last_file_save >= SHARED_SENSORS_FILE_INTERVAL_SECONDS:
+            self._last_file_save = now
+            self._save_sensors_to_file(temperature, power, datetime.utcfromtimestamp(timestamp_ns / 1e9))
     
     def _save_sensors_to_file(self, temperature: float, power: float, timestamp: datetime):
         """
@@ -281,14 +447,13 @@ class FridgeDaemon:
             data = {
                 "temperature": round(temperature, 2),
                 "power": round(power, 2),
-                "timestamp": timestamp.isoformat(),
-                "last_update": datetime.now().isoformat()
+                "timestamp": timestamp,
+                "last_update": datetime.now()
             }
             
-            # Scrivi atomicamente usando file temporaneo
+            # Scrivi atomicamente usando file temporaneo (datetime serializzati dal codec)
             temp_file = Path(SHARED_SENSORS_FILE).with_suffix('.tmp')
-            with open(temp_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            temp_file.write_bytes(json_codec.dumps(data, indent=True))
             
             # Rinomina (operazione atomica)
             temp_file.replace(SHARED_SENSORS_FILE)
@@ -296,33 +461,75 @@ class FridgeDaemon:
         except Exception as e:
             self.logger.error(f"Error saving sensors to file: {e}")
     
-    def _check_sensor_data_send(self):
-        """Invia dati sensori al server se Ã¨ passato l'intervallo configurato."""
-        now = datetime.utcnow()
-        elapsed = (now - self.last_sensor_send_time).total_seconds()
+    def _drop_oldest(self, count: int):
+        """Scarta i campioni più vecchi a buffer pieno (warning al massimo una volta al minuto)."""
+        self._consume_samples(count)
+        self._dropped_while_sending += count
+        self._dropped_since_warning += count
+        
+        now_ns = time.monotonic_ns()
+        if (self._last_drop_warning_ns is None or
+                now_ns - self._last_drop_warning_ns >= 60_000_000_000):
+            self.logger.warning(f"Sensor buffer full ({self._max_samples} samples), "
+                                f"dropped {self._dropped_since_warning} oldest reading(s)")
+            self._last_drop_warning_ns = now_ns
+            self._dropped_since_warning = 0
+    
+    def _consume_samples(self, count: int):
+        """
+        Rimuove dai buffer i primi count campioni (già inviati), spostando in
+        testa quelli letti mentre l'invio era in corso.
+        """
+        remaining = self._write_idx - count
+        if remaining > 0:
+            for arr in (self._temp_vals, self._temp_ts, self._power_vals, self._power_ts):
+                arr[:remaining] = arr[count:count + remaining]
+        self._write_idx = max(remaining, 0)
+    
+    def _take_sensor_batch(self) -> Optional[tuple]:
+        """
+        Se è passato l'intervallo di invio, prepara il batch colonnare dei
+        campioni accumulati.
         
-        if elapsed >= SENSOR_DATA_SEND_INTERVAL_SECONDS:
-            self.logger.info("Sending sensor data to server...")
-            
-            # Converti buffer in liste
-            temp_data_list = list(self.temp_buffer)
-            power_data_list = list(self.power_buffer)
-            
-            if temp_data_list or power_data_list:
-                success = self.api.send_sensor_data(temp_data_list, power_data_list)
-                
-                if success:
-                    self.logger.info(f"Sent {len(temp_data_list)} temp and {len(power_data_list)} power readings")
-                    # Svuota buffer dopo invio riuscito
-                    self.temp_buffer.clear()
-                    self.power_buffer.clear()
-                    self.last_sensor_send_time = now
-                else:
-                    self.logger.error("Failed to send sensor data")
-                    # Non svuota buffer, riproverÃ  al prossimo intervallo
-            else:
-                self.logger.debug("No sensor data to send")
-                self.last_sensor_send_time = now
+        Returns:
+            tuple: Argomenti per _send_sensor_batch, None se non c'è nulla da inviare
+        """
+        now_ns = time.monotonic_ns()
+        elapsed = (now_ns - self.last_sensor_send_ns) / 1e9
+        if elapsed < SENSOR_DATA_SEND_INTERVAL_SECONDS:
+            return None
+        
+        self.logger.info("Sending sensor data to server...")
+        n = self._write_idx
+        if not n:
+            self.logger.debug("No sensor data to send")
+            self.last_sensor_send_ns = now_ns
+            return None
+        
+        # Copie colonnari: durante l'invio il polling continua a scrivere dopo l'indice n
+        temperature = self._to_columns(self._temp_ts[:n], self._temp_vals[:n])
+        power = self._to_columns(self._power_ts[:n], self._power_vals[:n])
+        self._dropped_while_sending = 0
+        return temperature, power, n, now_ns
+    
+    async def _send_sensor_batch(self, temperature: Tuple[np.ndarray, np.ndarray],
+                                 power: Tuple[np.ndarray, np.ndarray],
+                                 count: int, now_ns: int):
+        """Invia un batch di letture e, se riuscito, lo toglie dai buffer."""
+        try:
+            success = await self._run_blocking(self.api.send_sensor_arrays, temperature, power)
+        except Exception as e:
+            self.logger.error(f"Error sending sensor data: {e}")
+            success = False
+        
+        if success:
+            self.logger.info(f"Sent {len(temperature[0])} temp and {len(power[0])} power readings")
+            # Svuota buffer dopo invio riuscito (al netto di quelli già scartati)
+            self._consume_samples(max(count - self._dropped_while_sending, 0))
+            self.last_sensor_send_ns = now_ns
+        else:
+            self.logger.error("Failed to send sensor data")
+            # Non svuota buffer, riproverà al prossimo intervallo
     
     # ============================================================
     # DOOR CALLBACKS
@@ -336,19 +543,34 @@ class FridgeDaemon:
     
     def _on_door_closed(self):
         """
-        Callback chiamata quando la porta si chiude.
-        Trigger: cattura foto â†’ detection YOLO â†’ invio prodotti al server.
+        Callback chiamata (dal thread porta) quando la porta si chiude:
+        pianifica la sequenza di cattura come task sull'event loop.
         """
+        if not self.running or self._loop is None or self._loop.is_closed():
+            self.logger.warning("Door closed while daemon is stopping, capture skipped")
+            return
         self.logger.info("Door closed - starting capture sequence")
-        
+        asyncio.run_coroutine_threadsafe(self._door_closed_sequence(), self._loop)
+    
+    async def _door_closed_sequence(self):
+        """
+        Cattura foto → detection YOLO → invio prodotti al server.
+        Una chiusura alla volta; il lavoro bloccante gira nel pool,
+        così il polling sensori non si ferma durante YOLO.
+        """
+        async with self._door_lock:
+            await self._run_door_closed_sequence()
+    
+    async def _run_door_closed_sequence(self):
+        """Corpo della sequenza porta chiusa (eseguito sotto _door_lock)."""
         try:
             # Attendi stabilizzazione dopo chiusura porta
             self.logger.info(f"Waiting {DOOR_CLOSE_DELAY_SECONDS}s for stabilization...")
-            time.sleep(DOOR_CLOSE_DELAY_SECONDS)
+            await asyncio.sleep(DOOR_CLOSE_DELAY_SECONDS)
             
             # === STEP 1: CATTURA FOTO ===
             self.logger.info("Capturing images from cameras...")
-            image_paths = self.camera.capture_images(label="fridge")
+            image_paths = await self._run_blocking(self.camera.capture_images, label="fridge")
             
             if not image_paths:
                 self.logger.error("No images captured!")
@@ -359,14 +581,14 @@ class FridgeDaemon:
                 )
                 # Invia errore al server
                 if self.api.is_configured():
-                    self.api.send_error_report(error_data)
+                    self.api.submit(self.api.send_error_report, error_data)
                 return
             
             self.logger.info(f"Captured {len(image_paths)} image(s)")
             
             # === STEP 2: YOLO DETECTION ===
             self.logger.info("Running YOLO detection...")
-            products = self.yolo.detect_products_from_images(image_paths)
+            products = await self._run_blocking(self.yolo.detect_products_from_images, image_paths)
             
             if not products:
                 self.logger.warning("No products detected")
@@ -381,7 +603,7 @@ class FridgeDaemon:
             # === STEP 4: INVIA AL SERVER ===
             if self.api.is_configured():
                 self.logger.info("Sending products to server...")
-                success = self.api.send_products(products_json['prodotti'])
+                success = await self._run_blocking(self.api.send_products, products_json['prodotti'])
                 
                 if success:
                     self.logger.info("Products sent successfully")
@@ -407,39 +629,80 @@ class FridgeDaemon:
             )
             # Invia errore al server se configurato
             if self.api.is_configured():
-                self.api.send_error_report(error_data)
+                self.api.submit(self.api.send_error_report, error_data)
     
     # ============================================================
     # TOKEN VALIDATION
     # ============================================================
     
-    def _check_token_validation(self):
-        """Valida il token se sono passate 24h."""
+    def _token_validation_due(self) -> bool:
+        """
+        True se il token va validato (prima volta o sono passate 24h).
+        Controllato al massimo ogni 10 s: una validazione fallita non viene
+        ripetuta a ogni giro del loop.
+        """
+        now_ns = time.monotonic_ns()
+        if now_ns < self._next_token_check_ns:
+            return False
+        self._next_token_check_ns = now_ns + 10 * 1_000_000_000
+        
         if not self.api.is_configured():
-            return
+            return False
         
         if not self.last_token_validation:
-            # Prima validazione
-            if self.api.should_validate_token():
-                self.logger.info("Running first token validation...")
-                if self.api.validate_token():
-                    self.last_token_validation = datetime.utcnow()
-            return
+            return self.api.should_validate_token()
         
-        # Verifica se sono passate 24h
         elapsed = datetime.utcnow() - self.last_token_validation
-        if elapsed > timedelta(hours=TOKEN_VALIDATION_INTERVAL_HOURS):
+        return elapsed > timedelta(hours=TOKEN_VALIDATION_INTERVAL_HOURS)
+    
+    async def _validate_token(self):
+        """Valida il token nel pool e aggiorna l'istante dell'ultima validazione."""
+        first = self.last_token_validation is None
+        if first:
+            self.logger.info("Running first token validation...")
+        else:
             self.logger.info("24h elapsed, validating token...")
-            if self.api.validate_token():
-                self.last_token_validation = datetime.utcnow()
+        
+        if await self._run_blocking(self.api.validate_token):
+            self.last_token_validation = datetime.utcnow()
+            if not first:
                 self.logger.info("Token validated successfully")
-            else:
-                self.logger.error("Token validation failed!")
-                # Continua comunque, riproverÃ  piÃ¹ tardi
+        elif not first:
+            self.logger.error("Token validation failed!")
+            # Continua comunque, riproverà più tardi
+    
+    # ============================================================
+    # SERVER I/O
+    # ============================================================
+    
+    async def _server_io_loop(self):
+        """
+        Unico task per le chiamate al server: a ogni giro raccoglie le operazioni
+        scadute (invio batch sensori, validazione token) e le esegue insieme con
+        gather sul pool, su connessioni keep-alive diverse della stessa sessione.
+        Quando coincidono si attende la più lenta invece della somma degli RTT.
+        """
+        interval = POLLING_INTERVAL_MS / 1000.0
+        while self.running:
+            jobs = []
+            batch = self._take_sensor_batch()
+            if batch is not None:
+                jobs.append(self._send_sensor_batch(*batch))
+            if self._token_validation_due():
+                jobs.append(self._validate_token())
+            
+            if jobs:
+                for result in await asyncio.gather(*jobs, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        self.logger.error(f"Error in server I/O: {result}")
+            
+            await asyncio.sleep(interval)
 
 
 def main():
     """Entry point per fridge daemon."""
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     daemon = FridgeDaemon()
     daemon.start()
 
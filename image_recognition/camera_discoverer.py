@@ -5,7 +5,8 @@ Responsabilità:
 - Liberare i dispositivi video da PipeWire (fuser -k)
 - Scansionare i dispositivi disponibili (v4l2-ctl)
 - Determinare formato e risoluzione di ogni camera
-- Restituire oggetti Camera pronti per la cattura
+- Memorizzare il risultato su file (riusato finché i dispositivi non cambiano)
+- Restituire oggetti Camera pronti per la cattura (V4L2 in-process, GStreamer come ripiego)
 
 Uso:
     from image_recognition.camera_discoverer import discover
@@ -14,16 +15,48 @@ Uso:
         cam.capture("captured_images/foto.jpg")
 """
 
+import glob
+import json
 import subprocess
 import re
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
+from config import CAMERA_DISCOVERY_CACHE_FILE
+from image_recognition.v4l2_capture import (
+    JPEG_TAIL_BYTES, V4L2Stream, ensure_huffman_tables, is_complete_jpeg,
+)
 from logger.logger import get_logger
 
+# cv2 serve solo per ricomprimere i frame YUYV: importato al primo uso,
+# così discovery e camere MJPEG non ne pagano il caricamento
+CV2_AVAILABLE = find_spec("cv2") is not None
+
 logger = get_logger('discoverer')
 
 # Nomi dei dispositivi GoPro da cercare nell'output di v4l2-ctl
 TARGET_DEVICE_NAMES = ["GENERAL - UVC", "MMP SDK"]
 
+# Output di v4l2-ctl --list-formats-ext:
+#   [0]: 'MJPG' (Motion-JPEG, compressed)
+#           Size: Discrete 1280x720
+# Una sola scansione: primo formato e prima risoluzione che lo segue,
+# la ricerca si ferma lì senza attraversare l'elenco di tutte le risoluzioni
+_FORMAT_SIZE_RE = re.compile(r"'(\w+)'.*?Size:\s+\w+\s+(\d+)x(\d+)", re.S)
+_FORMAT_RE = re.compile(r"'(\w+)'")
+
+# MJPG preferito se il dispositivo lo offre in qualunque posizione: la camera
+# comprime a bordo (meno banda USB del YUYV a 1280x720) e il frame è già il
+# JPEG da salvare, senza conversione né ricompressione con cv2
+_MJPG_SIZE_RE = re.compile(r"'MJPG'.*?Size:\s+\w+\s+(\d+)x(\d+)", re.S)
+
+# Versione del formato della cache: cambia quando cambia la scelta del formato,
+# così le camere già in cache vengono riscansionate
+_CACHE_VERSION = 2
+
+# Catture fallite consecutive dopo cui la cache della discovery viene invalidata
+CACHE_INVALIDATE_AFTER_FAILURES = 2
+
 
 class Camera:
     """
@@ -48,10 +81,21 @@ class Camera:
         self.width = width
         self.height = height
         self.logger = get_logger('camera')
+        # Stream V4L2 in-process, aperto alla prima cattura e riusato
+        self._stream = None
+        # Frame BGR di destinazione della conversione YUYV, allocato una volta
+        # alla dimensione negoziata e riusato tra le catture
+        self._bgr = None
+        self._consecutive_failures = 0
+        # Comando gst-launch del fallback: dipende solo dal formato, fissato
+        # alla discovery; per ogni cattura si aggiunge solo la location
+        self._pipeline_template = self._build_pipeline_template()
 
     def capture(self, output_path: str) -> bool:
         """
         Cattura un singolo frame e lo salva come immagine.
+        In-process via V4L2 quando il formato lo consente (MJPG sempre,
+        YUY2 se OpenCV è installato), altrimenti con gst-launch-1.0.
 
         Args:
             output_path: percorso del file di output (es. "captured_images/foto.jpg")
@@ -59,6 +103,80 @@ class Camera:
         Returns:
             True se la cattura è riuscita, False altrimenti
         """
+        captured = False
+        if self._supports_direct_capture():
+            captured = self._capture_direct(output_path)
+            if not captured:
+                self.logger.warning(f"Direct capture failed on {self.device_path}, using GStreamer")
+        if not captured:
+            captured = self._capture_gstreamer(output_path)
+
+        # Camera forse sostituita o rinumerata: la prossima discover() riscansiona
+        self._consecutive_failures = 0 if captured else self._consecutive_failures + 1
+        if self._consecutive_failures == CACHE_INVALIDATE_AFTER_FAILURES:
+            invalidate_cache()
+        return captured
+
+    def close(self):
+        """Chiude lo stream V4L2 (se aperto) liberando il dispositivo."""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._bgr = None
+
+    def _supports_direct_capture(self) -> bool:
+        return self.pixel_format == "MJPG" or (self.pixel_format in ("YUY2", "YUYV") and CV2_AVAILABLE)
+
+    def _capture_direct(self, output_path: str) -> bool:
+        """
+        Cattura con V4L2 MMAP: per MJPG il frame del driver è già un JPEG e
+        viene scritto così com'è (nessuna decodifica/ricodifica).
+        """
+        try:
+            if self._stream is None:
+                self._stream = V4L2Stream(self.device_path, self.pixel_format,
+                                          self.width, self.height)
+            self.logger.info(f"Capturing from {self.device_path} ({self.name})")
+            frame = self._stream.read_frame()
+
+            if self.pixel_format == "MJPG":
+                if not is_complete_jpeg(frame, frame[-JPEG_TAIL_BYTES:]):
+                    # Frame troncato: riprova una volta con il successivo
+                    self.logger.warning(f"Truncated MJPEG frame from {self.device_path}, retrying")
+                    frame = self._stream.read_frame()
+                    if not is_complete_jpeg(frame, frame[-JPEG_TAIL_BYTES:]):
+                        raise ValueError("truncated MJPEG frame")
+            # Frame già copiato: camera ferma fino alla prossima cattura (buffer restano mappati)
+            self._stream.stop()
+
+            if self.pixel_format == "MJPG":
+                jpeg = ensure_huffman_tables(frame)
+            else:
+                import cv2
+                import numpy as np
+                shape = (self._stream.height, self._stream.width)
+                yuyv = np.frombuffer(frame, dtype=np.uint8).reshape(*shape, 2)
+                if self._bgr is None or self._bgr.shape[:2] != shape:
+                    self._bgr = np.empty((*shape, 3), dtype=np.uint8)
+                cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUY2, dst=self._bgr)
+                ok, encoded = cv2.imencode(".jpg", self._bgr)
+                if not ok:
+                    # Come gli altri errori: l'except chiude lo stream prima del fallback
+                    raise ValueError("JPEG encoding failed")
+                jpeg = encoded.tobytes()
+
+            Path(output_path).write_bytes(jpeg)
+            self.logger.info(f"Saved: {output_path} ({len(jpeg)} bytes)")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Direct capture error on {self.device_path}: {e}")
+            # Dispositivo da riaprire (e libero per l'eventuale fallback GStreamer)
+            self.close()
+            return False
+
+    def _capture_gstreamer(self, output_path: str) -> bool:
+        """Cattura con un processo gst-launch-1.0 (fallback)."""
         # Costruisci pipeline GStreamer in base al formato
         pipeline = self._build_pipeline(output_path)
 
@@ -75,13 +193,23 @@ class Camera:
 
             # Verifica che il file sia stato creato e non sia vuoto
             path = Path(output_path)
-            if path.exists() and path.stat().st_size > 0:
-                self.logger.info(f"Saved: {output_path} ({path.stat().st_size} bytes)")
-                return True
-            else:
+            if not path.exists() or path.stat().st_size == 0:
                 self.logger.error(f"Output file missing or empty: {output_path}")
                 return False
 
+            # ... e che sia un JPEG completo (SOI/EOI, senza decodificarlo)
+            size = path.stat().st_size
+            with open(path, 'rb') as f:
+                head = f.read(2)
+                f.seek(-min(size, JPEG_TAIL_BYTES), 2)
+                tail = f.read()
+            if not is_complete_jpeg(head, tail):
+                self.logger.error(f"Truncated or invalid JPEG: {output_path}")
+                return False
+
+            self.logger.info(f"Saved: {output_path} ({size} bytes)")
+            return True
+
         except subprocess.TimeoutExpired:
             self.logger.error(f"Capture timeout on {self.device_path}")
             return False
@@ -90,8 +218,13 @@ class Camera:
             return False
 
     def _build_pipeline(self, output_path: str) -> list:
+        """Comando GStreamer completo per salvare il frame in output_path."""
+        return self._pipeline_template + [f"location={output_path}"]
+
+    def _build_pipeline_template(self) -> list:
         """
-        Costruisce il comando GStreamer in base al formato della camera.
+        Costruisce il comando GStreamer in base al formato della camera,
+        senza la location del filesink.
 
         Per MJPG: v4l2src -> jpegdec -> videoconvert -> jpegenc -> filesink
         Per altri formati (YUY2, ecc): v4l2src -> videoconvert -> jpegenc -> filesink
@@ -110,7 +243,7 @@ class Camera:
             pipeline += ["!", "image/jpeg", "!", "jpegdec"]
 
         # Conversione e salvataggio
-        pipeline += ["!", "videoconvert", "!", "jpegenc", "!", "filesink", f"location={output_path}"]
+        pipeline += ["!", "videoconvert", "!", "jpegenc", "!", "filesink"]
 
         return pipeline
 
@@ -118,25 +251,44 @@ class Camera:
         return f"Camera({self.device_path}, {self.name}, {self.pixel_format}, {self.width}x{self.height})"
 
 
-def discover() -> list:
+def discover(use_cache: bool = True) -> list:
     """
     Scansiona il sistema e restituisce le camere USB disponibili.
 
     Sequenza:
         1. Libera tutti i /dev/video* da PipeWire con fuser -k
-        2. Trova i dispositivi target con v4l2-ctl --list-devices
-        3. Legge formato e risoluzione con v4l2-ctl --list-formats-ext
-        4. Restituisce lista di oggetti Camera
+        2. Se i dispositivi video sono gli stessi dell'ultima scansione,
+           ricostruisce le camere dalla cache su file
+        3. Altrimenti trova i dispositivi target con v4l2-ctl --list-devices
+        4. Legge formato e risoluzione con v4l2-ctl --list-formats-ext
+           (un processo per dispositivo, tutti in parallelo)
+        5. Restituisce lista di oggetti Camera (e aggiorna la cache)
+
+    Args:
+        use_cache: False per forzare la scansione completa
 
     Returns:
         List[Camera]: Lista delle camere trovate e configurate
     """
     _release_devices()
+
+    devices_key = _video_devices_key()
+    if use_cache:
+        cameras = _load_cache(devices_key)
+        if cameras:
+            logger.info(f"Discovery from cache: {len(cameras)} camera(s)")
+            return cameras
+
     device_paths = _find_target_devices()
     cameras = []
 
-    for path, name in device_paths:
-        fmt = _get_device_format(path)
+    # I processi v4l2-ctl sono indipendenti: la latenza totale è quella del più lento
+    formats = []
+    if device_paths:
+        with ThreadPoolExecutor(max_workers=len(device_paths)) as executor:
+            formats = list(executor.map(_get_device_format, [path for path, _ in device_paths]))
+
+    for (path, name), fmt in zip(device_paths, formats):
         if fmt is None:
             logger.warning(f"Cannot read format for {path}, skipping")
             continue
@@ -149,10 +301,72 @@ def discover() -> list:
         logger.error("No cameras found")
     else:
         logger.info(f"Discovery complete: {len(cameras)} camera(s)")
+        _save_cache(devices_key, cameras)
 
     return cameras
 
 
+def invalidate_cache():
+    """Elimina la cache della discovery: la prossima discover() riscansiona."""
+    try:
+        Path(CAMERA_DISCOVERY_CACHE_FILE).unlink(missing_ok=True)
+        logger.info("Camera discovery cache invalidated")
+    except OSError as e:
+        logger.warning(f"Cannot remove discovery cache: {e}")
+
+
+def _video_devices_key() -> list:
+    """
+    Identifica l'insieme dei dispositivi video presenti: coppie (path, nome
+    del dispositivo letto da sysfs). Solo letture di file, nessun processo.
+    """
+    key = []
+    for path in sorted(glob.glob("/dev/video*")):
+        name_file = Path("/sys/class/video4linux") / Path(path).name / "name"
+        try:
+            name = name_file.read_text().strip()
+        except OSError:
+            name = ""
+        key.append([path, name])
+    return key
+
+
+def _load_cache(devices_key: list) -> list:
+    """
+    Ricostruisce le camere dalla cache se i dispositivi non sono cambiati.
+
+    Returns:
+        List[Camera]: camere in cache, lista vuota se cache assente o non valida
+    """
+    try:
+        with open(CAMERA_DISCOVERY_CACHE_FILE, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != _CACHE_VERSION or data.get('devices') != devices_key:
+            return []
+        return [Camera(path, name, pixel_format, width, height)
+                for path, name, pixel_format, width, height in data['cameras']]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def _save_cache(devices_key: list, cameras: list):
+    """Salva il risultato della discovery (scrittura atomica con file temporaneo)."""
+    try:
+        cache_file = Path(CAMERA_DISCOVERY_CACHE_FILE)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            'version': _CACHE_VERSION,
+            'devices': devices_key,
+            'cameras': [[c.device_path, c.name, c.pixel_format, c.width, c.height] for c in cameras],
+        }
+        temp_file = cache_file.with_suffix('.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        temp_file.replace(cache_file)
+    except OSError as e:
+        logger.warning(f"Cannot write discovery cache: {e}")
+
+
 def _release_devices():
     """
     Chiude tutti i processi che tengono occupati i dispositivi video.
@@ -161,7 +375,6 @@ def _release_devices():
     logger.info("Releasing video devices from PipeWire...")
     try:
         # Trova tutti i /dev/video* esistenti
-        import glob
         devices = glob.glob("/dev/video*")
         if devices:
             subprocess.run(
@@ -223,6 +436,7 @@ def _find_target_devices() -> list:
 def _get_device_format(device_path: str) -> tuple:
     """
     Legge formato e risoluzione di un dispositivo con v4l2-ctl --list-formats-ext.
+    Se il dispositivo offre MJPG viene scelto quello, altrimenti il primo formato.
 
     Returns:
         Tuple[str, int, int]: (pixel_format, width, height)
@@ -239,24 +453,20 @@ def _get_device_format(device_path: str) -> tuple:
             logger.error(f"v4l2-ctl --list-formats-ext error on {device_path}: {result.stderr}")
             return None
 
-        # Cerca il formato: riga tipo  [0]: 'MJPG' (Motion-JPEG, compressed)
-        fmt_match = re.search(r"'(\w+)'", result.stdout)
-        if not fmt_match:
-            logger.error(f"Cannot parse pixel format from {device_path}")
-            return None
-
-        pixel_format = fmt_match.group(1)
+        mjpg = _MJPG_SIZE_RE.search(result.stdout)
+        if mjpg:
+            return ("MJPG", int(mjpg.group(1)), int(mjpg.group(2)))
 
-        # Cerca la risoluzione: riga tipo  Size: Discrete 1280x720
-        res_match = re.search(r"Size:\s+\w+\s+(\d+)x(\d+)", result.stdout)
-        if not res_match:
-            logger.error(f"Cannot parse resolution from {device_path}")
+        match = _FORMAT_SIZE_RE.search(result.stdout)
+        if not match:
+            if not _FORMAT_RE.search(result.stdout):
+                logger.error(f"Cannot parse pixel format from {device_path}")
+            else:
+                logger.error(f"Cannot parse resolution from {device_path}")
             return None
 
-        width = int(res_match.group(1))
-        height = int(res_match.group(2))
-
-        return (pixel_format, width, height)
+        pixel_format, width, height = match.groups()
+        return (pixel_format, int(width), int(height))
 
     except Exception as e:
         logger.error(f"Error reading format for {device_path}: {e}")
@@ -13,6 +13,7 @@ Uso:
     images = manager.capture_all(label="fridge")
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import List
@@ -44,9 +45,17 @@ class CameraManager:
         Returns:
             Numero di camere trovate
         """
+        # Gli stream aperti vanno chiusi prima: discover() libera i dispositivi
+        # con fuser -k, che terminerebbe anche questo processo
+        self.close_cameras()
         self.cameras = discover()
         return len(self.cameras)
 
+    def close_cameras(self):
+        """Chiude gli stream V4L2 aperti dalle catture precedenti."""
+        for camera in self.cameras:
+            camera.close()
+
     def capture_all(self, label: str = "fridge") -> List[str]:
         """
         Cattura un'immagine da ogni camera disponibile.
@@ -62,12 +71,16 @@ class CameraManager:
             return []
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        captured = []
 
-        for camera in self.cameras:
-            image_path = self._capture_with_retry(camera, label, timestamp)
-            if image_path:
-                captured.append(image_path)
+        # Una cattura per thread: ogni camera ha il suo device e il tempo è
+        # speso in attesa dei frame (DQBUF/gst-launch), quindi il tempo totale
+        # è quello della camera più lenta invece della somma
+        with ThreadPoolExecutor(max_workers=len(self.cameras)) as executor:
+            results = executor.map(
+                lambda camera: self._capture_with_retry(camera, label, timestamp),
+                self.cameras,
+            )
+            captured = [image_path for image_path in results if image_path]
 
         self.logger.info(f"Catturate {len(captured)}/{len(self.cameras)} immagini")
         return captured
@@ -124,9 +137,6 @@ class CameraManager:
         return len(self.cameras) > 0
     
     def cleanup(self):
-        """
-        Cleanup dummy - GStreamer gestisce automaticamente le risorse.
-        Mantenuto per compatibilità con il daemon.
-        """
-        self.logger.info("Camera cleanup (no-op, GStreamer auto-cleanup)")
-        pass
\ No newline at end of file
+        """Chiude gli stream delle camere (chiamato dal daemon allo stop)."""
+        self.close_cameras()
+        self.logger.info("Camera cleanup complete")
\ No newline at end of file
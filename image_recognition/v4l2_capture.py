@@ -0,0 +1,428 @@
+"""
+v4l2_capture.py
+
+Cattura in-process da dispositivi V4L2 (ioctl + buffer MMAP), senza lanciare
+gst-launch-1.0 ad ogni foto.
+
+Responsabilità:
+- Configurare formato e risoluzione (VIDIOC_S_FMT)
+- Allocare e mappare i buffer del driver (VIDIOC_REQBUFS / QUERYBUF + mmap)
+- Avviare lo stream solo durante la cattura (STREAMON/STREAMOFF, buffer sempre mappati)
+- Restituire un frame fresco (DQBUF/QBUF), scartando quelli rimasti in coda
+- Rendere il frame MJPG un JPEG valido (tabelle di Huffman standard se mancanti)
+
+Uso:
+    from image_recognition.v4l2_capture import V4L2Stream
+    stream = V4L2Stream("/dev/video0", "MJPG", 1280, 720)
+    stream.open()
+    jpeg = stream.read_frame()   # avvia lo stream se fermo
+    stream.stop()                # camera ferma tra le catture, buffer ancora mappati
+    stream.close()
+"""
+
+import ctypes
+import errno
+import fcntl
+import mmap
+import os
+import select
+
+# ============================================================
+# COSTANTI E STRUTTURE V4L2 (linux/videodev2.h)
+# ============================================================
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_ANY = 0
+
+
+def _fourcc(code: str) -> int:
+    """Codice FourCC V4L2 (es. 'MJPG') come intero little-endian."""
+    a, b, c, d = code.encode('ascii')
+    return a | (b << 8) | (c << 16) | (d << 24)
+
+
+# Nomi riportati da v4l2-ctl -> FourCC del driver (YUY2 e YUYV sono lo stesso formato)
+PIXEL_FORMATS = {
+    'MJPG': _fourcc('MJPG'),
+    'YUYV': _fourcc('YUYV'),
+    'YUY2': _fourcc('YUYV'),
+}
+
+
+class _PixFormat(ctypes.Structure):
+    _fields_ = [
+        ('width', ctypes.c_uint32),
+        ('height', ctypes.c_uint32),
+        ('pixelformat', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('bytesperline', ctypes.c_uint32),
+        ('sizeimage', ctypes.c_uint32),
+        ('colorspace', ctypes.c_uint32),
+        ('priv', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('ycbcr_enc', ctypes.c_uint32),
+        ('quantization', ctypes.c_uint32),
+        ('xfer_func', ctypes.c_uint32),
+    ]
+
+
+class _FormatUnion(ctypes.Union):
+    # Il puntatore replica l'allineamento dell'union del kernel (contiene v4l2_window)
+    _fields_ = [
+        ('pix', _PixFormat),
+        ('raw_data', ctypes.c_uint8 * 200),
+        ('_align', ctypes.c_void_p),
+    ]
+
+
+class _Format(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('fmt', _FormatUnion),
+    ]
+
+
+class _RequestBuffers(ctypes.Structure):
+    _fields_ = [
+        ('count', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('capabilities', ctypes.c_uint32),
+        ('flags', ctypes.c_uint8),
+        ('reserved', ctypes.c_uint8 * 3),
+    ]
+
+
+class _Timeval(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_long),
+        ('tv_usec', ctypes.c_long),
+    ]
+
+
+class _Timecode(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('frames', ctypes.c_uint8),
+        ('seconds', ctypes.c_uint8),
+        ('minutes', ctypes.c_uint8),
+        ('hours', ctypes.c_uint8),
+        ('userbits', ctypes.c_uint8 * 4),
+    ]
+
+
+class _BufferM(ctypes.Union):
+    _fields_ = [
+        ('offset', ctypes.c_uint32),
+        ('userptr', ctypes.c_ulong),
+        ('planes', ctypes.c_void_p),
+        ('fd', ctypes.c_int32),
+    ]
+
+
+class _Buffer(ctypes.Structure):
+    _fields_ = [
+        ('index', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('bytesused', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('timestamp', _Timeval),
+        ('timecode', _Timecode),
+        ('sequence', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('m', _BufferM),
+        ('length', ctypes.c_uint32),
+        ('reserved2', ctypes.c_uint32),
+        ('request_fd', ctypes.c_int32),
+    ]
+
+
+def _iowr(nr: int, size: int) -> int:
+    """_IOWR('V', nr, size)"""
+    return (3 << 30) | (size << 16) | (ord('V') << 8) | nr
+
+
+def _iow(nr: int, size: int) -> int:
+    """_IOW('V', nr, size)"""
+    return (1 << 30) | (size << 16) | (ord('V') << 8) | nr
+
+
+VIDIOC_S_FMT = _iowr(5, ctypes.sizeof(_Format))
+VIDIOC_REQBUFS = _iowr(8, ctypes.sizeof(_RequestBuffers))
+VIDIOC_QUERYBUF = _iowr(9, ctypes.sizeof(_Buffer))
+VIDIOC_QBUF = _iowr(15, ctypes.sizeof(_Buffer))
+VIDIOC_DQBUF = _iowr(17, ctypes.sizeof(_Buffer))
+VIDIOC_STREAMON = _iow(18, ctypes.sizeof(ctypes.c_int))
+VIDIOC_STREAMOFF = _iow(19, ctypes.sizeof(ctypes.c_int))
+
+# ============================================================
+# TABELLE DI HUFFMAN STANDARD (JPEG Annex K)
+# Molte webcam UVC inviano MJPEG senza segmento DHT: i decoder JPEG
+# (libjpeg, Pillow) lo richiedono, quindi va inserito prima di salvare.
+# ============================================================
+
+def _range(first: int, last: int) -> list:
+    return list(range(first, last + 1))
+
+
+_DC_BITS = ([0, 1, 5, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+            [0, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0])
+_DC_VALS = list(range(12))
+
+_AC_LUMA_BITS = [0, 2, 1, 3, 3, 2, 4, 3, 5, 5, 4, 4, 0, 0, 1, 0x7d]
+_AC_LUMA_VALS = [
+    0x01, 0x02, 0x03, 0x00, 0x04, 0x11, 0x05, 0x12, 0x21, 0x31, 0x41, 0x06, 0x13, 0x51, 0x61, 0x07,
+    0x22, 0x71, 0x14, 0x32, 0x81, 0x91, 0xa1, 0x08, 0x23, 0x42, 0xb1, 0xc1, 0x15, 0x52, 0xd1, 0xf0,
+    0x24, 0x33, 0x62, 0x72, 0x82, 0x09, 0x0a, 0x16, 0x17, 0x18, 0x19, 0x1a, 0x25, 0x26, 0x27, 0x28,
+    0x29, 0x2a, 0x34, 0x35, 0x36, 0x37, 0x38, 0x39, 0x3a,
+] + (_range(0x43, 0x4a) + _range(0x53, 0x5a) + _range(0x63, 0x6a) + _range(0x73, 0x7a)
+     + _range(0x83, 0x8a) + _range(0x92, 0x9a) + _range(0xa2, 0xaa) + _range(0xb2, 0xba)
+     + _range(0xc2, 0xca) + _range(0xd2, 0xda) + _range(0xe1, 0xea) + _range(0xf1, 0xfa))
+
+_AC_CHROMA_BITS = [0, 2, 1, 2, 4, 4, 3, 4, 7, 5, 4, 4, 0, 1, 2, 0x77]
+_AC_CHROMA_VALS = [
+    0x00, 0x01, 0x02, 0x03, 0x11, 0x04, 0x05, 0x21, 0x31, 0x06, 0x12, 0x41, 0x51, 0x07, 0x61, 0x71,
+    0x13, 0x22, 0x32, 0x81, 0x08, 0x14, 0x42, 0x91, 0xa1, 0xb1, 0xc1, 0x09, 0x23, 0x33, 0x52, 0xf0,
+    0x15, 0x62, 0x72, 0xd1, 0x0a, 0x16, 0x24, 0x34, 0xe1, 0x25, 0xf1, 0x17, 0x18, 0x19, 0x1a, 0x26,
+    0x27, 0x28, 0x29, 0x2a, 0x35, 0x36, 0x37, 0x38, 0x39, 0x3a,
+] + (_range(0x43, 0x4a) + _range(0x53, 0x5a) + _range(0x63, 0x6a) + _range(0x73, 0x7a)
+     + _range(0x82, 0x8a) + _range(0x92, 0x9a) + _range(0xa2, 0xaa) + _range(0xb2, 0xba)
+     + _range(0xc2, 0xca) + _range(0xd2, 0xda) + _range(0xe2, 0xea) + _range(0xf2, 0xfa))
+
+
+def _build_dht() -> bytes:
+    """Segmento DHT con le quattro tabelle standard (DC/AC, luminanza/crominanza)."""
+    tables = [
+        (0x00, _DC_BITS[0], _DC_VALS),
+        (0x10, _AC_LUMA_BITS, _AC_LUMA_VALS),
+        (0x01, _DC_BITS[1], _DC_VALS),
+        (0x11, _AC_CHROMA_BITS, _AC_CHROMA_VALS),
+    ]
+    body = b''.join(bytes([table_id] + bits + vals) for table_id, bits, vals in tables)
+    return b'\xff\xc4' + (len(body) + 2).to_bytes(2, 'big') + body
+
+
+_STANDARD_DHT = _build_dht()
+
+
+def ensure_huffman_tables(jpeg: bytes) -> bytes:
+    """
+    Inserisce le tabelle di Huffman standard dopo SOI se il frame MJPEG non ne
+    contiene (nessun marker DHT prima dell'inizio dei dati, SOS).
+
+    Args:
+        jpeg: Frame MJPEG così come esce dal driver
+
+    Returns:
+        bytes: JPEG decodificabile
+    """
+    sos = jpeg.find(b'\xff\xda')
+    header = jpeg if sos < 0 else jpeg[:sos]
+    if b'\xff\xc4' in header:
+        return jpeg
+    return jpeg[:2] + _STANDARD_DHT + jpeg[2:]
+
+
+# Byte di coda esaminati cercando EOI: alcune camere UVC riempiono
+# il buffer con zeri dopo la fine dell'immagine
+JPEG_TAIL_BYTES = 32
+
+
+def is_complete_jpeg(head: bytes, tail: bytes) -> bool:
+    """
+    Controllo senza decodifica: SOI (FF D8) in testa ed EOI (FF D9) in coda.
+    Scarta i frame troncati da una camera bloccata prima che arrivino a YOLO.
+
+    Args:
+        head: Primi byte dell'immagine (almeno 2)
+        tail: Ultimi JPEG_TAIL_BYTES byte dell'immagine
+
+    Returns:
+        bool: True se i marker di inizio e fine sono presenti
+    """
+    return head[:2] == b'\xff\xd8' and tail.rstrip(b'\x00').endswith(b'\xff\xd9')
+
+
+# ============================================================
+# STREAM
+# ============================================================
+
+class V4L2Stream:
+    """
+    Stream di cattura V4L2 con buffer MMAP.
+    Aperto una volta e riusato tra le catture: negoziazione del formato e
+    mappatura dei buffer si pagano solo all'apertura. Lo stream resta attivo
+    solo durante la cattura (stop() dopo ogni foto): tra una chiusura porta e
+    l'altra la camera non invia frame e non occupa banda USB.
+    """
+
+    def __init__(self, device_path: str, pixel_format: str, width: int, height: int,
+                 buffer_count: int = 1):
+        """
+        Args:
+            device_path: es. "/dev/video7"
+            pixel_format: formato video come riportato da v4l2-ctl (es. "MJPG", "YUY2")
+            width: larghezza in pixel
+            height: altezza in pixel
+            buffer_count: buffer da richiedere al driver (il driver può alzarlo).
+                Le catture sono singole: non serve il double buffering.
+        """
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pixel_format}")
+
+        self.device_path = device_path
+        self.pixel_format = pixel_format
+        self.width = width
+        self.height = height
+        self.buffer_count = buffer_count
+        self._fd = None
+        self._buffers = []
+        self._streaming = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._fd is not None
+
+    @property
+    def is_streaming(self) -> bool:
+        return self._streaming
+
+    def open(self):
+        """
+        Apre il dispositivo, imposta il formato e mappa i buffer (lo stream
+        viene avviato da start() o dalla prima read_frame()).
+
+        Raises:
+            OSError: se il dispositivo o il driver rifiutano una delle operazioni
+        """
+        if self._fd is not None:
+            return
+
+        self._fd = os.open(self.device_path, os.O_RDWR | os.O_NONBLOCK)
+        try:
+            fmt = _Format()
+            fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+            fmt.fmt.pix.width = self.width
+            fmt.fmt.pix.height = self.height
+            fmt.fmt.pix.pixelformat = PIXEL_FORMATS[self.pixel_format]
+            fmt.fmt.pix.field = V4L2_FIELD_ANY
+            fcntl.ioctl(self._fd, VIDIOC_S_FMT, fmt)
+
+            # Il driver può adattare i valori richiesti
+            if fmt.fmt.pix.pixelformat != PIXEL_FORMATS[self.pixel_format]:
+                raise OSError(errno.EINVAL, f"Driver rejected {self.pixel_format} on {self.device_path}")
+            self.width = fmt.fmt.pix.width
+            self.height = fmt.fmt.pix.height
+
+            req = _RequestBuffers()
+            req.count = self.buffer_count
+            req.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+            req.memory = V4L2_MEMORY_MMAP
+            fcntl.ioctl(self._fd, VIDIOC_REQBUFS, req)
+
+            for index in range(req.count):
+                buf = self._new_buffer(index)
+                fcntl.ioctl(self._fd, VIDIOC_QUERYBUF, buf)
+                self._buffers.append(mmap.mmap(self._fd, buf.length, mmap.MAP_SHARED,
+                                               mmap.PROT_READ | mmap.PROT_WRITE,
+                                               offset=buf.m.offset))
+        except BaseException:
+            self.close()
+            raise
+
+    def start(self):
+        """
+        Mette in coda tutti i buffer e avvia lo stream (VIDIOC_STREAMON).
+
+        Raises:
+            OSError: se il driver rifiuta l'operazione
+        """
+        self.open()
+        if self._streaming:
+            return
+        for index in range(len(self._buffers)):
+            fcntl.ioctl(self._fd, VIDIOC_QBUF, self._new_buffer(index))
+        fcntl.ioctl(self._fd, VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        self._streaming = True
+
+    def stop(self):
+        """
+        Ferma lo stream (VIDIOC_STREAMOFF): il driver rilascia tutti i buffer,
+        che restano mappati per il prossimo start().
+        """
+        if not self._streaming:
+            return
+        self._streaming = False
+        try:
+            fcntl.ioctl(self._fd, VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        except OSError:
+            pass
+
+    def read_frame(self, timeout: float = 5.0) -> bytes:
+        """
+        Restituisce il contenuto di un frame catturato dopo la chiamata.
+        Avvia lo stream se fermo; se era già attivo, i frame già pronti in
+        coda (vecchi) vengono scartati e rimessi in coda.
+
+        Args:
+            timeout: secondi massimi di attesa per un frame
+
+        Returns:
+            bytes: frame grezzo (JPEG per MJPG, pixel YUYV per YUY2)
+
+        Raises:
+            OSError: errore del driver
+            TimeoutError: nessun frame entro il timeout
+        """
+        if self._streaming:
+            # Scarta i frame accumulati dall'ultima lettura: solo DQBUF/QBUF,
+            # nessuna copia né decodifica (come grab() di OpenCV)
+            while True:
+                buf = self._dequeue()
+                if buf is None:
+                    break
+                fcntl.ioctl(self._fd, VIDIOC_QBUF, buf)
+        else:
+            self.start()
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            raise TimeoutError(f"No frame from {self.device_path} within {timeout}s")
+
+        buf = self._dequeue()
+        if buf is None:
+            raise TimeoutError(f"No frame from {self.device_path}")
+        try:
+            return self._buffers[buf.index][:buf.bytesused]
+        finally:
+            fcntl.ioctl(self._fd, VIDIOC_QBUF, buf)
+
+    def close(self):
+        """Ferma lo stream e rilascia buffer e file descriptor."""
+        if self._fd is None:
+            return
+        self.stop()
+        for mapped in self._buffers:
+            mapped.close()
+        self._buffers = []
+        os.close(self._fd)
+        self._fd = None
+
+    def _new_buffer(self, index: int = 0) -> _Buffer:
+        buf = _Buffer()
+        buf.index = index
+        buf.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        buf.memory = V4L2_MEMORY_MMAP
+        return buf
+
+    def _dequeue(self):
+        """DQBUF non bloccante: il buffer pronto, None se nessuno."""
+        buf = self._new_buffer()
+        try:
+            fcntl.ioctl(self._fd, VIDIOC_DQBUF, buf)
+        except BlockingIOError:
+            return None
+        return buf
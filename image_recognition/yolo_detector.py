@@ -8,16 +8,43 @@ Responsabilità:
 - Generazione JSON output
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union, TYPE_CHECKING
 from collections import Counter
+from operator import itemgetter
+import numpy as np
 from logger.logger import get_logger, log_error_for_server
 
-try:
+if TYPE_CHECKING:
     from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
+
+# ultralytics/torch/cv2 vengono importati solo quando servono (initialize,
+# _load_image): importarli all'avvio costa 1-3 s e centinaia di MB di RSS
+# anche se il daemon non arriva mai a caricare il modello (es. nessuna camera).
+# Qui si verifica solo che i pacchetti siano installati.
+YOLO_AVAILABLE = find_spec("ultralytics") is not None
+TORCH_AVAILABLE = find_spec("torch") is not None
+
+# cv2 + Pillow opzionali: decodifica JPEG già ridotta (vedi _load_image)
+REDUCED_DECODE_AVAILABLE = find_spec("cv2") is not None and find_spec("PIL") is not None
+
+# Lato lungo dell'input del modello (letterbox di ultralytics)
+MODEL_INPUT_SIZE = 640
+
+# Fattori di riduzione di cv2.imread (cv2.IMREAD_REDUCED_COLOR_<n>): il JPEG
+# viene decodificato già scalato (IDCT ridotta), senza decodificare a piena
+# risoluzione e poi ridimensionare
+_REDUCED_READ_FACTORS = (8, 4, 2)
+
+# Chiave di aggregazione dei prodotti e chiave di ordinamento dell'output
+_product_key = itemgetter('nomeProdotto', 'marchio', 'taglia')
+_product_name = itemgetter('nomeProdotto')
+
+# Backend esportabili dal .pt e nome del file/cartella generato da ultralytics
+# (es. yolov8n.pt -> yolov8n_ncnn_model/, yolov8n.onnx)
+_EXPORT_SUFFIXES = {"ncnn": "_ncnn_model", "onnx": ".onnx"}
 
 
 class YOLODetector:
@@ -28,7 +55,8 @@ class YOLODetector:
     
     def __init__(self, model_path: str = "yolov8n.pt",
                  confidence_threshold: float = 0.5,
-                 max_retries: int = 2):
+                 max_retries: int = 2,
+                 export_format: Optional[str] = None):
         """
         Inizializza il detector YOLO.
         
@@ -36,15 +64,25 @@ class YOLODetector:
             model_path: Path del modello YOLO (.pt file)
             confidence_threshold: Soglia minima di confidence per detection (0-1)
             max_retries: Numero massimo di retry su errore detection
+            export_format: Backend di inferenza ("ncnn", "onnx") esportato una
+                           volta dal .pt e riusato agli avvii successivi; None = PyTorch
         """
+        if export_format is not None and export_format not in _EXPORT_SUFFIXES:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        
         self.model_path = Path(model_path)
         self.confidence_threshold = confidence_threshold
         self.max_retries = max_retries
+        self.export_format = export_format
         
         self.logger = get_logger('yolo')
         
-        self.model: Optional[YOLO] = None
+        self.model: Optional['YOLO'] = None
         self._is_initialized = False
+        # FP16 solo su GPU (su CPU half non è supportato / più lento)
+        self._half = False
+        # False per i backend esportati a batch fisso 1 (NCNN): un'immagine per chiamata
+        self._batched = True
         
         if not YOLO_AVAILABLE:
             self.logger.error("ultralytics YOLO not available - install with: pip install ultralytics")
@@ -73,17 +111,21 @@ class YOLODetector:
                 self.model_path = Path("yolov8n.pt")
             
             # Carica modello
-            self.model = YOLO(str(self.model_path))
+            self.model = self._load_model()
+            if TORCH_AVAILABLE and self.export_format is None:
+                # torch è già in memoria (dipendenza di ultralytics)
+                import torch
+                self._half = torch.cuda.is_available()
             
             # Test che il modello funzioni
             self.logger.info("Testing model...")
             # Crea immagine dummy per test
-            import numpy as np
             dummy_image = np.zeros((640, 640, 3), dtype=np.uint8)
-            _ = self.model(dummy_image, verbose=False)
+            _ = self.model(dummy_image, verbose=False, half=self._half)
             
             self._is_initialized = True
-            self.logger.info("Model loaded and tested successfully")
+            self.logger.info(f"Model loaded and tested successfully "
+                             f"(backend: {self.export_format or 'pytorch'}, fp16: {self._half})")
             return True
             
         except Exception as e:
@@ -96,6 +138,37 @@ class YOLODetector:
             )
             return False
     
+    def _load_model(self) -> 'YOLO':
+        """
+        Carica il modello: il .pt con PyTorch, oppure il backend esportato
+        (NCNN/ONNX, kernel NEON su ARM) generandolo dal .pt se manca.
+        Se l'export o il caricamento falliscono si ricade su PyTorch.
+        """
+        # Import differito: il costo di ultralytics/torch si paga solo qui
+        from ultralytics import YOLO
+        
+        if self.export_format is None or self.model_path.suffix != ".pt":
+            return YOLO(str(self.model_path))
+        
+        exported = self.model_path.with_name(self.model_path.stem + _EXPORT_SUFFIXES[self.export_format])
+        try:
+            if not exported.exists():
+                self.logger.info(f"Exporting {self.model_path} to {self.export_format} (one-time)...")
+                # ONNX con batch dinamico per l'inferenza batch delle camere
+                exported = Path(YOLO(str(self.model_path)).export(
+                    format=self.export_format,
+                    imgsz=MODEL_INPUT_SIZE,
+                    dynamic=self.export_format == "onnx",
+                ))
+            model = YOLO(str(exported), task="detect")
+            self._batched = self.export_format == "onnx"
+            self.logger.info(f"Using exported model {exported}")
+            return model
+        except Exception as e:
+            self.logger.warning(f"{self.export_format} export unavailable, using PyTorch model: {e}")
+            self.export_format = None
+            return YOLO(str(self.model_path))
+    
     def detect_products_from_images(self, image_paths: List[str]) -> List[Dict]:
         """
         Rileva prodotti da una lista di immagini (dalle multiple camere).
@@ -118,12 +191,15 @@ class YOLODetector:
         
         self.logger.info(f"Starting detection on {len(image_paths)} image(s)...")
         
-        # Aggrega tutti i prodotti rilevati da tutte le immagini
-        all_detected_products = []
-        
-        for img_path in image_paths:
-            products = self._detect_from_single_image(img_path)
-            all_detected_products.extend(products)
+        # Tutte le camere in un solo forward pass; se il batch fallisce
+        # si ricade sull'inferenza per singola immagine (un file corrotto
+        # non fa perdere le detection delle altre camere)
+        all_detected_products = self._detect_batch(image_paths)
+        if all_detected_products is None:
+            all_detected_products = []
+            for img_path in image_paths:
+                products = self._detect_from_single_image(img_path)
+                all_detected_products.extend(products)
         
         # Conta quantità aggregate
         aggregated = self._aggregate_products(all_detected_products)
@@ -131,6 +207,99 @@ class YOLODetector:
         self.logger.info(f"Detection complete: {len(aggregated)} unique product(s) found")
         return aggregated
     
+    def _detect_batch(self, image_paths: List[str]) -> Optional[List[Dict]]:
+        """
+        Rileva prodotti da tutte le immagini con una sola chiamata al modello
+        (batch = numero di immagini: un forward pass e un NMS per tutte).
+        
+        Args:
+            image_paths: Path delle immagini
+        
+        Returns:
+            Optional[List[Dict]]: Prodotti rilevati, None se il batch fallisce
+        """
+        for attempt in range(self.max_retries):
+            try:
+                self.logger.info(f"Batch detection on {len(image_paths)} image(s) "
+                                 f"(attempt {attempt + 1}/{self.max_retries})")
+                
+                # Decodifica JPEG delle camere in parallelo (cv2.imread rilascia il GIL)
+                with ThreadPoolExecutor(max_workers=len(image_paths)) as executor:
+                    images = list(executor.map(self._load_image, image_paths))
+                
+                if self._batched:
+                    results = self.model(
+                        images,
+                        conf=self.confidence_threshold,
+                        batch=len(image_paths),
+                        half=self._half,
+                        verbose=False
+                    )
+                else:
+                    results = [self.model(image, conf=self.confidence_threshold, verbose=False)[0]
+                               for image in images]
+                
+                products = []
+                for result in results:
+                    products.extend(self._products_from_result(result))
+                return products
+                
+            except Exception as e:
+                self.logger.warning(f"Batch detection failed (attempt {attempt + 1}): {e}")
+        
+        return None
+    
+    def _load_image(self, image_path: str) -> Union[str, np.ndarray]:
+        """
+        Prepara un'immagine per YOLO. Se il lato lungo è almeno il doppio
+        dell'input del modello, il JPEG viene decodificato direttamente a
+        1/2, 1/4 o 1/8 (il letterbox successivo riduce comunque a 640): su CPU
+        decodifica e resize costano una frazione.
+        
+        Args:
+            image_path: Path dell'immagine
+        
+        Returns:
+            Array BGR decodificato, oppure il path (YOLO lo legge da sé)
+        """
+        if not REDUCED_DECODE_AVAILABLE:
+            return image_path
+        
+        try:
+            import cv2
+            from PIL import Image
+            # Legge solo l'header per le dimensioni
+            with Image.open(image_path) as img:
+                long_side = max(img.size)
+        except Exception:
+            return image_path
+        
+        for factor in _REDUCED_READ_FACTORS:
+            if long_side // factor >= MODEL_INPUT_SIZE:
+                flag = getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}")
+                image = cv2.imread(str(image_path), flag)
+                return image if image is not None else image_path
+        return image_path
+    
+    def _products_from_result(self, result) -> List[Dict]:
+        """
+        Converte le detection di un risultato YOLO in prodotti
+        (classi e confidence lette in blocco dai tensori, non box per box).
+        
+        Args:
+            result: Risultato ultralytics di una immagine
+        
+        Returns:
+            List[Dict]: Un prodotto per detection
+        """
+        boxes = result.boxes
+        # NOTA: Per ora usiamo class_name come nomeProdotto
+        # Quando avrai un modello custom, qui potrai estrarre marchio/taglia
+        return [
+            self._parse_product_info(result.names[int(class_id)], confidence)
+            for class_id, confidence in zip(boxes.cls.tolist(), boxes.conf.tolist())
+        ]
+    
     def _detect_from_single_image(self, image_path: str) -> List[Dict]:
         """
         Rileva prodotti da una singola immagine con retry.
@@ -149,26 +318,14 @@ class YOLODetector:
                 results = self.model(
                     image_path,
                     conf=self.confidence_threshold,
+                    half=self._half,
                     verbose=False
                 )
                 
                 # Estrai prodotti dalle detection
                 products = []
-                
                 for result in results:
-                    boxes = result.boxes
-                    
-                    for box in boxes:
-                        # Estrai informazioni detection
-                        class_id = int(box.cls[0])
-                        confidence = float(box.conf[0])
-                        class_name = result.names[class_id]
-                        
-                        # Crea dizionario prodotto
-                        # NOTA: Per ora usiamo class_name come nomeProdotto
-                        # Quando avrai un modello custom, qui potrai estrarre marchio/taglia
-                        product = self._parse_product_info(class_name, confidence)
-                        products.append(product)
+                    products.extend(self._products_from_result(result))
                 
                 self.logger.debug(f"Found {len(products)} product(s) in {Path(image_path).name}")
                 return products
@@ -242,39 +399,16 @@ class YOLODetector:
         if not products:
             return []
         
-        # Crea chiave univoca per ogni prodotto: (nome, marchio, taglia)
-        # Usa Counter per contare occorrenze
-        product_keys = []
-        product_map = {}  # key → dizionario prodotto
-        
-        for product in products:
-            key = (
-                product['nomeProdotto'],
-                product['marchio'],
-                product['taglia']
-            )
-            product_keys.append(key)
-            
-            # Salva template del prodotto (senza quantità)
-            if key not in product_map:
-                product_map[key] = {
-                    'nomeProdotto': product['nomeProdotto'],
-                    'marchio': product['marchio'],
-                    'taglia': product['taglia']
-                }
-        
-        # Conta occorrenze
-        counts = Counter(product_keys)
-        
-        # Crea lista aggregata
-        aggregated = []
-        for key, count in counts.items():
-            product = product_map[key].copy()
-            product['quantita'] = count
-            aggregated.append(product)
+        # Un solo passaggio: conteggio per chiave (nome, marchio, taglia)
+        # estratta in C da itemgetter; i dict aggregati nascono dalle chiavi
+        counts = Counter(map(_product_key, products))
+        aggregated = [
+            {'nomeProdotto': name, 'marchio': brand, 'taglia': size, 'quantita': count}
+            for (name, brand, size), count in counts.items()
+        ]
         
         # Ordina per nome prodotto (opzionale, per output consistente)
-        aggregated.sort(key=lambda p: p['nomeProdotto'])
+        aggregated.sort(key=_product_name)
         
         self.logger.debug(f"Aggregated {len(products)} detections into {len(aggregated)} unique products")
         return aggregated
@@ -315,6 +449,7 @@ class YOLODetector:
         try:
             return {
                 'model_path': str(self.model_path),
+                'backend': self.export_format or 'pytorch',
                 'num_classes': len(self.model.names),
                 'class_names': list(self.model.names.values())[:10],  # Prime 10 classi
                 'confidence_threshold': self.confidence_threshold
@@ -2,6 +2,7 @@
 DoorSensor: gestisce il reed switch per rilevare apertura/chiusura porta frigo.
 Responsabilità:
 - Lettura stato GPIO reed switch
+- Eventi di fronte a interrupt (gpiod) o polling come fallback
 - Debouncing per evitare falsi positivi
 - Callback su eventi apertura/chiusura
 - Mock mode con input manuale per testing remoto
@@ -21,6 +22,13 @@ try:
 except (ImportError, RuntimeError):
     GPIO_AVAILABLE = False
 
+try:
+    import gpiod
+    # Serve l'API 1.x (Chip/get_line/event_wait, python3-libgpiod di Raspberry Pi OS)
+    GPIOD_AVAILABLE = hasattr(gpiod, 'LINE_REQ_EV_BOTH_EDGES')
+except ImportError:
+    GPIOD_AVAILABLE = False
+
 
 class DoorState(Enum):
     """Stati possibili della porta."""
@@ -40,6 +48,7 @@ class DoorSensor:
     """
     
     def __init__(self, gpio_pin: int = 17, 
+                 gpio_chip: str = "gpiochip0",
                  debounce_time: float = 0.1,
                  pull_up: bool = True,
                  mock_mode: bool = False):
@@ -48,11 +57,13 @@ class DoorSensor:
         
         Args:
             gpio_pin: Pin GPIO a cui è collegato il reed switch (default: GPIO17)
+            gpio_chip: Chip GPIO (chardev) per gli eventi di fronte via gpiod
             debounce_time: Tempo di debouncing in secondi (default: 0.1s = 100ms)
             pull_up: Se True usa pull-up interno (GPIO HIGH quando aperto)
             mock_mode: Se True, usa input manuale invece di GPIO (per testing remoto via SSH)
         """
         self.gpio_pin = gpio_pin
+        self.gpio_chip = gpio_chip
         self.debounce_time = debounce_time
         self.pull_up = pull_up
         self.mock_mode = mock_mode or not GPIO_AVAILABLE
@@ -69,6 +80,12 @@ class DoorSensor:
         
         self._is_initialized = False
         
+        # Linea gpiod con eventi di fronte (None = polling)
+        self._edge_chip = None
+        self._edge_line = None
+        # True se il pin è stato configurato con RPi.GPIO (solo senza gpiod)
+        self._gpio_configured = False
+        
         if self.mock_mode:
             self.logger.warning("DoorSensor running in MOCK mode (manual input via SSH)")
         elif not GPIO_AVAILABLE:
@@ -91,34 +108,67 @@ class DoorSensor:
             return True
         
         try:
-            # Setup GPIO mode
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setwarnings(False)
-            
-            # Configura pin come input con pull-up/down
-            if self.pull_up:
-                GPIO.setup(self.gpio_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            else:
-                GPIO.setup(self.gpio_pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+            # Eventi di fronte dal kernel, se gpiod è disponibile: la linea resta
+            # solo a gpiod (RPi.GPIO su rpi-lgpio la richiederebbe allo stesso
+            # chardev e la seconda richiesta fallirebbe con EBUSY)
+            if not self._request_edge_line():
+                # Setup GPIO mode
+                GPIO.setmode(GPIO.BCM)
+                GPIO.setwarnings(False)
+                
+                # Configura pin come input con pull-up/down
+                if self.pull_up:
+                    GPIO.setup(self.gpio_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+                else:
+                    GPIO.setup(self.gpio_pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+                self._gpio_configured = True
             
             # Leggi stato iniziale
             self._update_state()
             
             self._is_initialized = True
-            self.logger.info(f"GPIO initialized - initial state: {self._current_state.value}")
+            self.logger.info(f"GPIO initialized - initial state: {self._current_state.value} "
+                             f"({'edge events' if self._edge_line else 'polling'})")
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to initialize GPIO: {e}")
             return False
     
+    def _request_edge_line(self) -> bool:
+        """
+        Richiede la linea al chardev GPIO con eventi su entrambi i fronti:
+        il monitor loop resta bloccato in epoll finché la porta non si muove.
+        
+        Returns:
+            bool: True se la linea è stata ottenuta, False per il polling con RPi.GPIO
+        """
+        if not GPIOD_AVAILABLE:
+            return False
+        
+        try:
+            chip = gpiod.Chip(self.gpio_chip)
+            line = chip.get_line(self.gpio_pin)
+            bias = (gpiod.LINE_REQ_FLAG_BIAS_PULL_UP if self.pull_up
+                    else gpiod.LINE_REQ_FLAG_BIAS_PULL_DOWN)
+            line.request(consumer='smart-fridge-door', type=gpiod.LINE_REQ_EV_BOTH_EDGES, flags=bias)
+            self._edge_chip = chip
+            self._edge_line = line
+            return True
+        except Exception as e:
+            self.logger.warning(f"gpiod edge events unavailable, using polling: {e}")
+            return False
+    
     def _update_state(self):
         """Aggiorna lo stato corrente leggendo il GPIO."""
         if self.mock_mode:
             return
         
-        # Leggi GPIO
-        gpio_value = GPIO.input(self.gpio_pin)
+        # Leggi GPIO (dalla linea gpiod se è lei a possedere il pin)
+        if self._edge_line is not None:
+            gpio_value = self._edge_line.get_value()
+        else:
+            gpio_value = GPIO.input(self.gpio_pin)
         
         # Con pull-up: LOW = porta chiusa, HIGH = porta aperta
         # Con pull-down: HIGH = porta chiusa, LOW = porta aperta
@@ -193,10 +243,10 @@ class DoorSensor:
         BLOCKING - da usare in thread separato.
         
         In MOCK mode: aspetta input ENTER dall'utente per simulare chiusura porta.
-        In HARDWARE mode: polling GPIO continuo.
+        In HARDWARE mode: eventi di fronte via gpiod, altrimenti polling GPIO continuo.
         
         Args:
-            check_interval: Intervallo tra controlli in secondi (solo hardware mode)
+            check_interval: Intervallo tra controlli in secondi (solo polling hardware)
         """
         if not self._is_initialized:
             self.logger.error("Sensor not initialized, call initialize() first")
@@ -204,6 +254,8 @@ class DoorSensor:
         
         if self.mock_mode:
             self._mock_monitor_loop()
+        elif self._edge_line is not None:
+            self._edge_monitor_loop()
         else:
             self._hardware_monitor_loop(check_interval)
     
@@ -249,6 +301,43 @@ class DoorSensor:
         except KeyboardInterrupt:
             self.logger.info("\nMock monitor loop interrupted by user (Ctrl+C)")
     
+    def _edge_monitor_loop(self):
+        """Loop HARDWARE a interrupt: attende i fronti sul chardev, con debouncing e callback."""
+        self.logger.info("Starting edge-triggered door monitor loop (gpiod)...")
+        
+        line = self._edge_line
+        previous_state = self.get_state()
+        
+        try:
+            # Il timeout serve solo ad accorgersi di cleanup()
+            while self._is_initialized:
+                if not line.event_wait(sec=1):
+                    continue
+                
+                # Scarta i fronti del rimbalzo: conta lo stato dopo il debouncing
+                line.event_read_multiple()
+                time.sleep(self.debounce_time)
+                confirmed_state = self.get_state()
+                
+                if confirmed_state == previous_state:
+                    continue
+                
+                if confirmed_state == DoorState.CLOSED and self._on_door_closed:
+                    self.logger.info("Door closed - triggering callback")
+                    self._on_door_closed()
+                elif confirmed_state == DoorState.OPEN and self._on_door_opened:
+                    self.logger.info("Door opened - triggering callback")
+                    self._on_door_opened()
+                
+                previous_state = confirmed_state
+                
+        except KeyboardInterrupt:
+            self.logger.info("Edge monitor loop interrupted by user")
+        except Exception as e:
+            # Linea rilasciata da cleanup() mentre il loop era in attesa
+            if self._is_initialized:
+                self.logger.error(f"Edge monitor loop error: {e}")
+    
     def _hardware_monitor_loop(self, check_interval: float):
         """Loop HARDWARE: polling GPIO con debouncing e callback."""
         self.logger.info("Starting hardware door monitor loop...")
@@ -283,14 +372,26 @@ class DoorSensor:
     
     def cleanup(self):
         """Libera risorse GPIO."""
-        if not self.mock_mode and GPIO_AVAILABLE and self._is_initialized:
+        was_initialized = self._is_initialized
+        # Ferma il loop a eventi (esce al prossimo timeout di event_wait)
+        self._is_initialized = False
+        
+        if self._edge_line is not None:
+            try:
+                self._edge_line.release()
+                self._edge_chip.close()
+            except Exception as e:
+                self.logger.error(f"Error releasing gpiod line: {e}")
+            self._edge_line = None
+            self._edge_chip = None
+        
+        if self._gpio_configured and was_initialized:
+            self._gpio_configured = False
             try:
                 GPIO.cleanup(self.gpio_pin)
                 self.logger.info("GPIO cleanup complete")
             except Exception as e:
                 self.logger.error(f"Error during GPIO cleanup: {e}")
-        
-        self._is_initialized = False
     
     # ============================================================
     # FUNZIONI MOCK AGGIUNTIVE (per testing programmatico)
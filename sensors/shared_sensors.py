@@ -1,30 +1,156 @@
 """
-Shared Sensors: wrapper per leggere dati sensori dal file condiviso.
+Shared Sensors: wrapper per leggere dati sensori condivisi dal daemon.
 Il daemon scrive i dati, la UI li legge.
+
+Canale principale: segmento di shared memory di 32 byte con l'ultima lettura
+(niente syscall né scritture su SD a ogni campione). Il file JSON resta come
+fallback, scritto dal daemon a intervalli più lunghi.
 """
 
-import json
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-from typing import Tuple
-from config import SHARED_SENSORS_FILE
+from typing import Optional, Tuple
+from config import SHARED_SENSORS_FILE, SHARED_SENSORS_SHM_NAME
+from data import json_codec
+
+
+# Layout del segmento: sequenza (seqlock), temperatura, potenza, timestamp epoch-µs
+SHM_FORMAT = '<Qddq'
+SHM_SIZE = struct.calcsize(SHM_FORMAT)
+_SEQ_FORMAT = '<Q'
+_DATA_OFFSET = struct.calcsize(_SEQ_FORMAT)
+_DATA_FORMAT = '<ddq'
+
+# Tentativi di lettura se il daemon sta scrivendo nello stesso istante
+_READ_RETRIES = 3
+
+
+def _open_shm(create: bool) -> SharedMemory:
+    """
+    Apre (o crea) il segmento condiviso senza affidarlo al resource_tracker:
+    il segmento deve sopravvivere alla chiusura di daemon e UI, altrimenti
+    il primo processo che esce lo rimuove anche per l'altro.
+    """
+    try:
+        return SharedMemory(name=SHARED_SENSORS_SHM_NAME, create=create,
+                            size=SHM_SIZE if create else 0, track=False)
+    except TypeError:
+        # Python < 3.13: niente parametro track, si deregistra a mano
+        shm = SharedMemory(name=SHARED_SENSORS_SHM_NAME, create=create,
+                           size=SHM_SIZE if create else 0)
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+class SharedSensorWriter:
+    """
+    Lato daemon: pubblica l'ultima lettura nel segmento condiviso.
+    Il segmento non viene mai rimosso: al riavvio del daemon viene riusato,
+    così la UI già aperta continua a leggere dalla stessa mappatura.
+    """
+    
+    def __init__(self):
+        self._shm: Optional[SharedMemory] = None
+        self._seq = 0
+    
+    def open(self) -> bool:
+        """
+        Crea il segmento (o si aggancia a quello lasciato da un'esecuzione precedente).
+        
+        Returns:
+            bool: True se il segmento è utilizzabile
+        """
+        try:
+            try:
+                self._shm = _open_shm(create=True)
+            except FileExistsError:
+                self._shm = _open_shm(create=False)
+                if self._shm.size < SHM_SIZE:
+                    raise ValueError(f"segment too small ({self._shm.size} bytes)")
+                self._seq = struct.unpack_from(_SEQ_FORMAT, self._shm.buf, 0)[0] & ~1
+            return True
+        except Exception as e:
+            print(f"[SharedSensorWriter] Shared memory unavailable: {e}")
+            self.close()
+            return False
+    
+    def write(self, temperature: float, power: float, timestamp_us: int):
+        """
+        Scrive una lettura. Seqlock: sequenza dispari durante la scrittura,
+        il lettore scarta gli snapshot a metà.
+        """
+        buf = self._shm.buf
+        self._seq += 1
+        struct.pack_into(_SEQ_FORMAT, buf, 0, self._seq)
+        struct.pack_into(_DATA_FORMAT, buf, _DATA_OFFSET, temperature, power, timestamp_us)
+        self._seq += 1
+        struct.pack_into(_SEQ_FORMAT, buf, 0, self._seq)
+    
+    def is_open(self) -> bool:
+        return self._shm is not None
+    
+    def close(self):
+        """Chiude la mappatura (il segmento resta per la UI e il prossimo avvio)."""
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except Exception:
+                pass
+            self._shm = None
 
 
 class SharedSensorReader:
-    """Legge i dati dei sensori dal file condiviso scritto dal daemon."""
+    """Legge i dati dei sensori condivisi dal daemon (shared memory, poi file)."""
     
     def __init__(self):
         self.file_path = Path(SHARED_SENSORS_FILE)
         self._last_temperature = 5.0
         self._last_power = 100.0
+        self._shm: Optional[SharedMemory] = None
+    
+    def _read_shm(self) -> Optional[Tuple[float, float]]:
+        """
+        Legge l'ultima lettura dal segmento condiviso.
+        
+        Returns:
+            (temperatura, potenza) oppure None se il segmento non c'è o è vuoto
+        """
+        if self._shm is None:
+            try:
+                self._shm = _open_shm(create=False)
+            except Exception:
+                # Daemon non ancora avviato: si riprova alla prossima lettura
+                return None
+        
+        buf = self._shm.buf
+        for _ in range(_READ_RETRIES):
+            seq = struct.unpack_from(_SEQ_FORMAT, buf, 0)[0]
+            if seq == 0:
+                return None
+            if seq & 1:
+                continue
+            temp, power, _ = struct.unpack_from(_DATA_FORMAT, buf, _DATA_OFFSET)
+            if struct.unpack_from(_SEQ_FORMAT, buf, 0)[0] == seq:
+                return temp, power
+        return None
     
     def read_sensors(self) -> Tuple[float, float]:
-        """Legge temperatura e potenza dal file."""
+        """Legge temperatura e potenza (shared memory, altrimenti file)."""
+        values = self._read_shm()
+        if values is not None:
+            self._last_temperature, self._last_power = values
+            return values
+        
         try:
             if not self.file_path.exists():
                 return self._last_temperature, self._last_power
             
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
+            data = json_codec.loads(self.file_path.read_bytes())
             
             temp = data.get('temperature', self._last_temperature)
             power = data.get('power', self._last_power)
@@ -37,6 +163,15 @@ class SharedSensorReader:
         except Exception:
             return self._last_temperature, self._last_power
     
+    def close(self):
+        """Chiude la mappatura del segmento condiviso."""
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except Exception:
+                pass
+            self._shm = None
+    
     def get_temperature(self) -> float:
         """Legge solo temperatura."""
         temp, _ = self.read_sensors()
@@ -49,7 +184,7 @@ class SharedSensorReader:
 
 
 class SharedTemperatureSensor:
-    """Wrapper che simula TemperatureSensor ma legge dal file condiviso."""
+    """Wrapper che simula TemperatureSensor ma legge i dati condivisi dal daemon."""
     
     def __init__(self):
         self.reader = SharedSensorReader()
@@ -63,11 +198,11 @@ class SharedTemperatureSensor:
         return self.reader.get_temperature()
     
     def cleanup(self):
-        pass
+        self.reader.close()
 
 
 class SharedPowerSensor:
-    """Wrapper che simula PowerSensor ma legge dal file condiviso."""
+    """Wrapper che simula PowerSensor ma legge i dati condivisi dal daemon."""
     
     def __init__(self):
         self.reader = SharedSensorReader()
@@ -81,4 +216,4 @@ class SharedPowerSensor:
         return self.reader.get_power()
     
     def cleanup(self):
-        pass
\ No newline at end of file
+        self.reader.close()
\ No newline at end of file
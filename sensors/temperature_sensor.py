@@ -2,19 +2,54 @@
 Sensore di temperatura.
 """
 
-import board
-import adafruit_bmp280
+import glob
+import os
+from pathlib import Path
+from typing import Optional
+
 from .abstract_sensor import AbstractSensor
 
+try:
+    import board
+    import adafruit_bmp280
+    ADAFRUIT_BMP280_AVAILABLE = True
+except (ImportError, NotImplementedError):
+    ADAFRUIT_BMP280_AVAILABLE = False
+
+
+# Driver kernel IIO del BMP280 (dtoverlay=i2c-sensor,bmp280): la temperatura
+# è esposta in sysfs in millesimi di °C
+_IIO_DEVICE_NAMES = ("bmp280",)
+_IIO_TEMP_ATTR = "in_temp_input"
+
+
+def _find_iio_temperature_file() -> Optional[str]:
+    """Cerca il file sysfs della temperatura del BMP280 (None se il driver kernel non è caricato)."""
+    for name_file in glob.glob("/sys/bus/iio/devices/iio:device*/name"):
+        try:
+            if Path(name_file).read_text().strip() in _IIO_DEVICE_NAMES:
+                temp_file = Path(name_file).with_name(_IIO_TEMP_ATTR)
+                if temp_file.exists():
+                    return str(temp_file)
+        except OSError:
+            continue
+    return None
+
 
 class TemperatureSensor(AbstractSensor):
     """
     Sensore di temperatura del frigo.
+    Se il BMP280 è gestito dal driver kernel IIO legge il file sysfs con un
+    descrittore aperto una volta (una pread per lettura); altrimenti usa la
+    libreria Adafruit via I2C.
     """
     
     def __init__(self):
         super().__init__(name="Temperature", unit="°C")
         self._is_initialized = False
+        self.sensor = None
+        # Descrittore del file sysfs IIO (None = lettura via Adafruit)
+        self._fd: Optional[int] = None
 
 
     def initialize(self) -> bool:
@@ -22,6 +57,21 @@ class TemperatureSensor(AbstractSensor):
         Inizializza il sensore.
         qui andrebbe il setup GPIO/I2C.
         """
+        temp_file = _find_iio_temperature_file()
+        if temp_file:
+            try:
+                self._fd = os.open(temp_file, os.O_RDONLY)
+                self._is_initialized = True
+                print(f"[TemperatureSensor] Using kernel IIO driver: {temp_file}")
+                return True
+            except OSError as e:
+                print(f"[TemperatureSensor] Cannot open {temp_file}: {e}")
+        
+        if not ADAFRUIT_BMP280_AVAILABLE:
+            print("[TemperatureSensor] Errore inizializzazione: adafruit-circuitpython-bmp280 non disponibile")
+            self._is_initialized = False
+            return False
+        
         try:
             i2c = board.I2C()
             # Il sensore BMP280 può essere all'indirizzo 0x76 o 0x77
@@ -45,7 +95,11 @@ class TemperatureSensor(AbstractSensor):
         if not self._is_initialized:
             raise RuntimeError(f"{self.name} sensor not initialized. Call initialize() first.")
         
-        temp = self.sensor.temperature
+        if self._fd is not None:
+            # Lettura da offset 0: sysfs rigenera il valore, nessun open/close
+            temp = int(os.pread(self._fd, 16, 0)) / 1000.0
+        else:
+            temp = self.sensor.temperature
         print(f"[TemperatureSensor] Read: {temp:.2f}°C")
         return temp
 
@@ -57,5 +111,8 @@ class TemperatureSensor(AbstractSensor):
         Cleanup risorse del sensore.
         qui andrebbe il cleanup GPIO se necessario.
         """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
         self.sensor = None
         self._is_initialized = False
\ No newline at end of file
@@ -6,7 +6,7 @@ from flask import Blueprint, request
 from utils.logger import get_logger
 from utils.errors import error_response, ErrorCode
 from utils.request_auth import require_fridge_token_from_query, require_fridge_token_from_json, parse_optional_timestamp
-from database import FridgeDatabase
+from database import FridgeDatabase, DOOR_EVENT_DUPLICATE
 from datetime import datetime
 
 logger = get_logger('fridges_api')
@@ -14,7 +14,7 @@ logger = get_logger('fridges_api')
 # Blueprint per route fridges
 fridges_bp = Blueprint('fridges', __name__)
 
-# Istanza FridgeDatabase
+# Istanza FridgeDatabase (schema e indici: vedi migrate.py)
 db = FridgeDatabase(use_pool=True)
 
 
@@ -218,6 +218,50 @@ def get_measurements_history():
         return error_response(ErrorCode.INTERNAL_ERROR)
 
 
+@fridges_bp.route('/measurements/stats', methods=['GET'])
+def get_measurement_stats():
+    """
+    Recupera statistiche temperatura e consumo in una sola richiesta
+    (una sola query sul database)
+    
+    Query params:
+        fridge_token: Token JWT frigo
+        hours: Numero ore storico (default: vedi config)
+    
+    Response:
+        Success (200): {
+            "success": true,
+            "stats": {
+                "temperature": {"count": 100, "average": 4.2, "min": 3.8, "max": 5.1},
+                "power": {"count": 100, "average": 118.5, "min": 80.0, "max": 150.0}
+            }
+        }
+    """
+    try:
+        # Verifica e estrae fridge_id dal token
+        result = require_fridge_token_from_query()
+        if isinstance(result, tuple):
+            return result
+        fridge_id = result
+        
+        from config import APIDefaults
+        hours = request.args.get('hours', APIDefaults.TEMPERATURE_STATS_HOURS, type=int)
+        
+        # Recupera statistiche
+        stats = db.get_measurement_statistics(fridge_id, hours)
+        
+        logger.info(f"Measurement stats for fridge {fridge_id}: {stats}")
+        
+        return {
+            "success": True,
+            "stats": stats
+        }, 200
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in get_measurement_stats: {e}")
+        return error_response(ErrorCode.INTERNAL_ERROR)
+
+
 @fridges_bp.route('/measurements/temperature/stats', methods=['GET'])
 def get_temperature_stats():
     """
@@ -482,6 +526,10 @@ def door_event():
             "success": true,
             "alert_id": 789
         }
+        Duplicate (200): {
+            "success": true,
+            "duplicate": true
+        }
     """
     try:
         # Verifica e estrae fridge_id dal token
@@ -502,10 +550,18 @@ def door_event():
         # Inserisci evento
         alert_id = db.insert_door_event(fridge_id, is_open)
         
-        if not alert_id:
+        if alert_id is None:
             logger.error(f"Failed to insert door event for fridge {fridge_id}")
             return error_response(ErrorCode.DATABASE_ERROR, "Impossibile inserire evento porta")
         
+        if alert_id == DOOR_EVENT_DUPLICATE:
+            # Stesso stato dell'ultimo evento: niente da registrare, il client non deve riprovare
+            logger.debug(f"Duplicate door event for fridge {fridge_id} ignored")
+            return {
+                "success": True,
+                "duplicate": True
+            }, 200
+        
         logger.info(f"Door event for fridge {fridge_id}: {'open' if is_open else 'closed'}")
         
         return {
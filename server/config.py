@@ -45,6 +45,28 @@ class Config:
     if not DB_PASSWORD:
         raise ValueError("DB_PASSWORD must be set in .env file!")
     
+    # Compressione zlib del protocollo MySQL (link WAN verso il DB remoto)
+    DB_COMPRESS = os.getenv('DB_COMPRESS', 'True').lower() == 'true'
+    # Autocommit delle connessioni (le scritture multi-statement usano
+    # transazioni esplicite): disattivarlo solo per debug
+    DB_AUTOCOMMIT = os.getenv('DB_AUTOCOMMIT', 'True').lower() == 'true'
+    
+    # Pool connessioni: loop sensori + dashboard bastano poche connessioni;
+    # quelle inattive oltre il timeout vengono chiuse (0 = mai)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', min(os.cpu_count() or 1, 4)))
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    # Reset sessione (COM_RESET_CONNECTION) alla restituzione al pool: un round-trip
+    # in più per checkout e prepared statement da ripreparare; di default disattivo
+    DB_POOL_RESET_SESSION = os.getenv('DB_POOL_RESET_SESSION', 'False').lower() == 'true'
+    # Pool asincrono (AsyncFridgeDatabase): le connessioni non occupano thread,
+    # il massimo può superare quello del pool sincrono
+    DB_ASYNC_POOL_MIN_SIZE = int(os.getenv('DB_ASYNC_POOL_MIN_SIZE', 2))
+    DB_ASYNC_POOL_MAX_SIZE = int(os.getenv('DB_ASYNC_POOL_MAX_SIZE', 20))
+    
+    # Scritture asincrone misurazioni: dimensione batch e attesa massima per riempirlo
+    DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_FLUSH_INTERVAL = float(os.getenv('DB_WRITE_FLUSH_INTERVAL', 0.5))
+    
     # Rate Limiting
     RATE_LIMIT_REGISTER_PER_HOUR = int(os.getenv('RATE_LIMIT_REGISTER_PER_HOUR', 10))
     RATE_LIMIT_RENEW_PER_HOUR = int(os.getenv('RATE_LIMIT_RENEW_PER_HOUR', 20))
@@ -56,6 +78,10 @@ class Config:
     LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     
+    # Cache letture database (statistiche/alert per dashboard), 0 = disabilitata.
+    # Per processo: scritture di altri worker e alert dei trigger visibili entro il TTL
+    DB_READ_CACHE_TTL_SECONDS = float(os.getenv('DB_READ_CACHE_TTL_SECONDS', 5))
+    
     # User Authentication & Validation
     MIN_PASSWORD_LENGTH = int(os.getenv('MIN_PASSWORD_LENGTH', 6))
     MAX_PASSWORD_LENGTH = int(os.getenv('MAX_PASSWORD_LENGTH', 128))
@@ -122,11 +148,12 @@ class DatabaseConfig:
     PASSWORD = Config.DB_PASSWORD
     
     POOL_NAME = os.getenv('DB_POOL_NAME', "smart_fridge_pool")
-    POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    POOL_SIZE = Config.DB_POOL_SIZE
     CONNECTION_TIMEOUT = int(os.getenv('DB_CONNECTION_TIMEOUT', 10))
     CHARSET = os.getenv('DB_CHARSET', 'utf8mb4')
-    AUTOCOMMIT = os.getenv('DB_AUTOCOMMIT', 'False').lower() == 'true'
-    RAISE_ON_WARNINGS = os.getenv('DB_RAISE_ON_WARNINGS', 'True').lower() == 'true'
+    AUTOCOMMIT = Config.DB_AUTOCOMMIT
+    RAISE_ON_WARNINGS = os.getenv('DB_RAISE_ON_WARNINGS', 'False').lower() == 'true'
+    COMPRESS = Config.DB_COMPRESS
     
     @classmethod
     def get_config(cls) -> dict:
@@ -141,5 +168,6 @@ class DatabaseConfig:
             'use_unicode': True,                
             'autocommit': cls.AUTOCOMMIT,
             'raise_on_warnings': cls.RAISE_ON_WARNINGS,
-            'connection_timeout': cls.CONNECTION_TIMEOUT
+            'connection_timeout': cls.CONNECTION_TIMEOUT,
+            'compress': cls.COMPRESS
         }
\ No newline at end of file
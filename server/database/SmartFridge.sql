@@ -138,6 +138,55 @@ CREATE TRIGGER `cleanup_old_measurements` AFTER INSERT ON `Measurements` FOR EAC
 END
 $$
 DELIMITER ;
+DELIMITER $$
+CREATE TRIGGER `rollup_hourly_measurements` AFTER INSERT ON `Measurements` FOR EACH ROW BEGIN
+-- Aggiorna il bucket orario nella stessa transazione dell'INSERT
+    INSERT INTO Measurements_Hourly (fridge_ID, hour_bucket, sample_count,
+                                     sum_t, min_t, max_t, sum_p, min_p, max_p)
+    VALUES (NEW.fridge_ID, DATE_FORMAT(NEW.timestamp, '%Y-%m-%d %H:00:00'), 1,
+            NEW.temperature, NEW.temperature, NEW.temperature,
+            NEW.power, NEW.power, NEW.power)
+    ON DUPLICATE KEY UPDATE
+        sample_count = sample_count + 1,
+        sum_t = sum_t + NEW.temperature,
+        min_t = LEAST(min_t, NEW.temperature),
+        max_t = GREATEST(max_t, NEW.temperature),
+        sum_p = sum_p + NEW.power,
+        min_p = LEAST(min_p, NEW.power),
+        max_p = GREATEST(max_p, NEW.power);
+END
+$$
+DELIMITER ;
+
+-- --------------------------------------------------------
+
+--
+-- Struttura della tabella `Measurements_Hourly`
+-- (rollup orario di Measurements, mantenuto dal trigger `rollup_hourly_measurements`)
+--
+
+CREATE TABLE `Measurements_Hourly` (
+  `fridge_ID` int UNSIGNED NOT NULL,
+  `hour_bucket` datetime NOT NULL COMMENT 'inizio ora',
+  `sample_count` int UNSIGNED NOT NULL DEFAULT '0',
+  `sum_t` decimal(12,1) NOT NULL DEFAULT '0.0',
+  `min_t` decimal(3,1) NOT NULL,
+  `max_t` decimal(3,1) NOT NULL,
+  `sum_p` decimal(14,2) NOT NULL DEFAULT '0.00',
+  `min_p` decimal(7,2) NOT NULL,
+  `max_p` decimal(7,2) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+--
+-- Popolamento iniziale del rollup dalle misurazioni esistenti
+--
+
+INSERT INTO `Measurements_Hourly` (fridge_ID, hour_bucket, sample_count, sum_t, min_t, max_t, sum_p, min_p, max_p)
+SELECT fridge_ID, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00'), COUNT(*),
+       SUM(temperature), MIN(temperature), MAX(temperature),
+       SUM(power), MIN(power), MAX(power)
+FROM `Measurements`
+GROUP BY fridge_ID, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00');
 
 -- --------------------------------------------------------
 
@@ -169,6 +218,48 @@ CREATE TABLE `ProductsFridge` (
 
 -- --------------------------------------------------------
 
+--
+-- Struttura della tabella `CurrentProducts`
+-- (prodotti presenti per frigo con i dati del prodotto già uniti, mantenuta dal
+-- trigger `update_product_quantity`: get_current_products legge una sola tabella)
+--
+
+CREATE TABLE `CurrentProducts` (
+  `fridge_ID` int UNSIGNED NOT NULL,
+  `product_ID` int UNSIGNED NOT NULL,
+  `fridge_product_ID` int UNSIGNED NOT NULL COMMENT 'ProductsFridge.ID',
+  `name` varchar(50) NOT NULL,
+  `brand` varchar(50) DEFAULT NULL,
+  `category` enum('meat','fish','dairy','vegetables','bread','other') CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT 'other',
+  `quantity` int UNSIGNED NOT NULL,
+  `added_in` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+--
+-- Popolamento iniziale dai prodotti presenti
+--
+
+INSERT INTO `CurrentProducts` (fridge_ID, product_ID, fridge_product_ID, name, brand, category, quantity, added_in)
+SELECT pf.fridge_ID, pf.product_ID, pf.ID, p.name, p.brand, p.category, pf.quantity, pf.added_in
+FROM `ProductsFridge` pf
+JOIN `Products` p ON pf.product_ID = p.ID
+WHERE pf.removed_in IS NULL;
+
+--
+-- Trigger `Products`
+--
+DELIMITER $$
+CREATE TRIGGER `sync_current_products` AFTER UPDATE ON `Products` FOR EACH ROW BEGIN
+-- Propaga nome/marca/categoria alle righe denormalizzate
+    UPDATE CurrentProducts
+    SET name = NEW.name, brand = NEW.brand, category = NEW.category
+    WHERE product_ID = NEW.ID;
+END
+$$
+DELIMITER ;
+
+-- --------------------------------------------------------
+
 --
 -- Struttura della tabella `ProductsMovements`
 --
@@ -186,11 +277,32 @@ CREATE TABLE `ProductsMovements` (
 --
 DELIMITER $$
 CREATE TRIGGER `update_product_quantity` AFTER INSERT ON `ProductsMovements` FOR EACH ROW BEGIN
+ DECLARE v_id INT UNSIGNED;
+ DECLARE v_quantity INT UNSIGNED;
+ DECLARE v_added_in TIMESTAMP;
+ DECLARE v_removed_in TIMESTAMP;
  INSERT INTO ProductsFridge (fridge_ID, product_ID, quantity, added_in)
     VALUES (NEW.fridge_ID, NEW.product_ID, NEW.quantity, NEW.timestamp)
     ON DUPLICATE KEY UPDATE 
         quantity = quantity + NEW.quantity,
         removed_in = IF(quantity + NEW.quantity = 0, NEW.timestamp, NULL);
+-- Allinea CurrentProducts allo stato risultante della riga ProductsFridge
+ SELECT ID, quantity, added_in, removed_in
+    INTO v_id, v_quantity, v_added_in, v_removed_in
+    FROM ProductsFridge
+    WHERE fridge_ID = NEW.fridge_ID AND product_ID = NEW.product_ID;
+ IF v_removed_in IS NULL THEN
+    INSERT INTO CurrentProducts (fridge_ID, product_ID, fridge_product_ID, name, brand, category, quantity, added_in)
+        SELECT NEW.fridge_ID, p.ID, v_id, p.name, p.brand, p.category, v_quantity, v_added_in
+        FROM Products p
+        WHERE p.ID = NEW.product_ID
+    ON DUPLICATE KEY UPDATE
+        quantity = v_quantity,
+        added_in = v_added_in;
+ ELSE
+    DELETE FROM CurrentProducts
+    WHERE fridge_ID = NEW.fridge_ID AND product_ID = NEW.product_ID;
+ END IF;
 END
 $$
 DELIMITER ;
@@ -218,6 +330,7 @@ ALTER TABLE `Alerts`
   ADD PRIMARY KEY (`ID`),
   ADD KEY `idx_timestamp` (`timestamp` DESC),
   ADD KEY `idx_category` (`fridge_ID`,`category`,`timestamp` DESC),
+  ADD KEY `idx_fridge_ts` (`fridge_ID`,`timestamp` DESC),
   ADD KEY `fk_alerts_fridge` (`fridge_ID`);
 
 --
@@ -232,16 +345,32 @@ ALTER TABLE `Fridges`
 --
 ALTER TABLE `Measurements`
   ADD PRIMARY KEY (`ID`),
-  ADD KEY `idx_measurements_time` (`fridge_ID`,`timestamp` DESC),
+  ADD KEY `idx_meas_covering` (`fridge_ID`,`timestamp` DESC,`temperature`,`power`),
   ADD KEY `idx_timestamp` (`timestamp` DESC),
   ADD KEY `idx_power` (`fridge_ID`,`power` DESC);
 
+--
+-- Indici per le tabelle `CurrentProducts`
+--
+ALTER TABLE `CurrentProducts`
+  ADD PRIMARY KEY (`fridge_ID`,`product_ID`),
+  ADD KEY `idx_fridge_added` (`fridge_ID`,`added_in` DESC),
+  ADD KEY `fk_currentproducts_product` (`product_ID`);
+
+--
+-- Indici per le tabelle `Measurements_Hourly`
+--
+ALTER TABLE `Measurements_Hourly`
+  ADD PRIMARY KEY (`fridge_ID`,`hour_bucket`);
+
 --
 -- Indici per le tabelle `Products`
 --
 ALTER TABLE `Products`
   ADD PRIMARY KEY (`ID`),
   ADD KEY `idx_product_name` (`name`);
+ALTER TABLE `Products`
+  ADD FULLTEXT KEY `ft_name` (`name`);
 
 --
 -- Indici per le tabelle `ProductsFridge`
@@ -336,6 +465,19 @@ ALTER TABLE `Fridges`
 ALTER TABLE `Measurements`
   ADD CONSTRAINT `fk_measurements_fridge` FOREIGN KEY (`fridge_ID`) REFERENCES `Fridges` (`ID`) ON DELETE CASCADE ON UPDATE CASCADE;
 
+--
+-- Limiti per la tabella `CurrentProducts`
+--
+ALTER TABLE `CurrentProducts`
+  ADD CONSTRAINT `fk_currentproducts_fridge` FOREIGN KEY (`fridge_ID`) REFERENCES `Fridges` (`ID`) ON DELETE CASCADE ON UPDATE CASCADE,
+  ADD CONSTRAINT `fk_currentproducts_product` FOREIGN KEY (`product_ID`) REFERENCES `Products` (`ID`) ON DELETE CASCADE ON UPDATE CASCADE;
+
+--
+-- Limiti per la tabella `Measurements_Hourly`
+--
+ALTER TABLE `Measurements_Hourly`
+  ADD CONSTRAINT `fk_measurements_hourly_fridge` FOREIGN KEY (`fridge_ID`) REFERENCES `Fridges` (`ID`) ON DELETE CASCADE ON UPDATE CASCADE;
+
 --
 -- Limiti per la tabella `ProductsFridge`
 --
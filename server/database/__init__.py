@@ -6,9 +6,10 @@ Questo permette di gestire richieste concorrenti da frigo diversi.
 """
 
 from .connection import DatabaseConfig, DatabaseConnection
-from .fridge_db import FridgeDatabase
+from .fridge_db import FridgeDatabase, FridgeHandle, DOOR_EVENT_DUPLICATE
 from .user_db import UserDatabase
 from .debug_db import DebugDatabase
+from .async_fridge_db import AsyncFridgeDatabase, ASYNCMY_AVAILABLE, AIOMYSQL_AVAILABLE
 
 # Backward compatibility
 DatabaseManager = FridgeDatabase
@@ -18,8 +19,13 @@ __all__ = [
     'DatabaseConfig',
     'DatabaseConnection', 
     'FridgeDatabase',
+    'FridgeHandle',
+    'DOOR_EVENT_DUPLICATE',
     'UserDatabase',
     'DebugDatabase',
+    'AsyncFridgeDatabase',
+    'ASYNCMY_AVAILABLE',
+    'AIOMYSQL_AVAILABLE',
     # Backward compatibility
     'DatabaseManager',
     'AuthQueries'
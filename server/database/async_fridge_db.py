@@ -0,0 +1,259 @@
+"""
+Async Fridge Database Operations
+Variante asincrona (asyncmy, driver Cython; in alternativa aiomysql) delle operazioni
+più usate di FridgeDatabase:
+le query di richieste diverse sovrappongono le attese di rete sullo stesso event loop
+(throughput ~ pool_size/RTT invece di 1/RTT per thread).
+
+Classe stateless come FridgeDatabase: il fridge_id viene passato come parametro.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+from .fridge_db import (
+    _SQL_CRITICAL_ALERTS,
+    _SQL_INSERT_ALERT_NOW,
+    _SQL_INSERT_ALERT_TS,
+    _SQL_INSERT_MEASUREMENT_NOW,
+    _SQL_INSERT_MEASUREMENT_TS,
+    _SQL_MEASUREMENT_STATS,
+    _SQL_RECENT_ALERTS,
+    _SQL_RECENT_ALERTS_BY_CATEGORY,
+    _stats_from_row,
+)
+from utils.logger import get_logger
+
+try:
+    import asyncmy as async_driver
+    from asyncmy.cursors import DictCursor
+    from asyncmy.errors import MySQLError
+    ASYNCMY_AVAILABLE = True
+except ImportError:
+    ASYNCMY_AVAILABLE = False
+
+AIOMYSQL_AVAILABLE = False
+if not ASYNCMY_AVAILABLE:
+    try:
+        # Stessa API di pool/cursori di asyncmy (pure-Python, basato su PyMySQL)
+        import aiomysql as async_driver
+        from aiomysql import DictCursor
+        from pymysql.err import MySQLError
+        AIOMYSQL_AVAILABLE = True
+    except ImportError:
+        MySQLError = Exception
+
+logger = get_logger('database.async')
+
+
+class AsyncFridgeDatabase:
+    """
+    Operazioni database frigo su pool asyncmy.
+
+    Usage:
+        db = AsyncFridgeDatabase()
+        await db.connect()
+        stats, alerts = await asyncio.gather(
+            db.get_measurement_statistics(fridge_id),
+            db.get_recent_alerts(fridge_id),
+        )
+        await db.close()
+    """
+
+    def __init__(self, min_size: int = Config.DB_ASYNC_POOL_MIN_SIZE,
+                 pool_size: int = Config.DB_ASYNC_POOL_MAX_SIZE):
+        """
+        Args:
+            min_size: Connessioni aperte alla creazione del pool
+            pool_size: Connessioni massime del pool (query concorrenti)
+        """
+        if not (ASYNCMY_AVAILABLE or AIOMYSQL_AVAILABLE):
+            raise ImportError("Nessun driver MySQL asincrono: pip install asyncmy (o aiomysql)")
+        self.min_size = max(1, min(min_size, pool_size))
+        self.pool_size = pool_size
+        self._pool = None
+
+    async def connect(self):
+        """Crea il pool di connessioni (da chiamare una volta, dentro l'event loop)."""
+        if self._pool is not None:
+            return
+        self._pool = await async_driver.create_pool(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            db=Config.DB_NAME,
+            charset='utf8mb4',
+            # Come il pool sincrono: niente COMMIT dopo gli INSERT singoli,
+            # niente ROLLBACK per chiudere le letture
+            autocommit=True,
+            connect_timeout=10,
+            minsize=self.min_size,
+            maxsize=self.pool_size,
+        )
+        logger.info(f"Async connection pool initialized "
+                    f"(size {self.min_size}-{self.pool_size}, {async_driver.__name__})")
+
+    async def close(self):
+        """Chiude il pool attendendo il rilascio delle connessioni."""
+        if self._pool is None:
+            return
+        self._pool.close()
+        await self._pool.wait_closed()
+        self._pool = None
+
+    # ========================================
+    # MEASUREMENTS
+    # ========================================
+
+    async def insert_measurement(self, fridge_id: int, temperature: float, power: float,
+                                 timestamp: Optional[datetime] = None) -> Optional[int]:
+        """
+        Inserisce misurazione (temperatura + potenza)
+
+        Returns:
+            int: ID della misurazione inserita, None se errore
+        """
+        if timestamp is None:
+            query, params = _SQL_INSERT_MEASUREMENT_NOW, (fridge_id, temperature, power)
+        else:
+            query, params = _SQL_INSERT_MEASUREMENT_TS, (fridge_id, timestamp, temperature, power)
+
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    return cursor.lastrowid
+        except MySQLError as e:
+            logger.error(f"Error inserting measurement: {e}")
+            return None
+
+    async def get_measurements_history(self, fridge_id: int, hours: int = 48) -> List[Dict]:
+        """
+        Recupera storico misurazioni
+
+        Returns:
+            List[Dict]: Lista di misurazioni con 'timestamp', 'temperature', 'power'
+        """
+        query = """
+            SELECT timestamp, temperature, power
+            FROM Measurements
+            WHERE fridge_ID = %s
+              AND timestamp >= NOW() - INTERVAL %s HOUR
+            ORDER BY timestamp ASC
+        """
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor(DictCursor) as cursor:
+                    await cursor.execute(query, (fridge_id, hours))
+                    rows = await cursor.fetchall()
+                return list(rows)
+        except MySQLError as e:
+            logger.error(f"Error fetching measurements: {e}")
+            return []
+
+    async def get_measurement_statistics(self, fridge_id: int, hours: int = 48) -> Dict[str, Dict]:
+        """
+        Statistiche di temperatura e consumo (stessa query di FridgeDatabase)
+
+        Returns:
+            Dict: {'temperature': {count, average, min, max}, 'power': {count, average, min, max}}
+        """
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(_SQL_MEASUREMENT_STATS,
+                                         (fridge_id, hours, fridge_id, hours, hours))
+                    row = await cursor.fetchone()
+                return _stats_from_row(row)
+        except MySQLError as e:
+            logger.error(f"Error getting measurement stats: {e}")
+            return _stats_from_row(None)
+
+    # ========================================
+    # ALERTS
+    # ========================================
+
+    async def insert_alert(self, fridge_id: int, category: str, message: str,
+                           timestamp: Optional[datetime] = None) -> Optional[int]:
+        """
+        Inserisce allarme
+
+        Returns:
+            int: ID dell'allarme inserito, None se errore
+        """
+        if timestamp is None:
+            query, params = _SQL_INSERT_ALERT_NOW, (fridge_id, category, message)
+        else:
+            query, params = _SQL_INSERT_ALERT_TS, (fridge_id, timestamp, category, message)
+
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    return cursor.lastrowid
+        except MySQLError as e:
+            logger.error(f"Error inserting alert: {e}")
+            return None
+
+    async def get_recent_alerts(self, fridge_id: int, hours: int = 24,
+                                category: Optional[str] = None) -> List[Dict]:
+        """
+        Recupera allarmi recenti, opzionalmente filtrati per categoria
+
+        Returns:
+            List[Dict]: Lista allarmi
+        """
+        if category:
+            query, params = _SQL_RECENT_ALERTS_BY_CATEGORY, (fridge_id, category, hours)
+        else:
+            query, params = _SQL_RECENT_ALERTS, (fridge_id, hours)
+
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor(DictCursor) as cursor:
+                    await cursor.execute(query, params)
+                    rows = await cursor.fetchall()
+                return list(rows)
+        except MySQLError as e:
+            logger.error(f"Error fetching alerts: {e}")
+            return []
+
+    async def get_critical_alerts(self, fridge_id: int, hours: int = 24) -> List[Dict]:
+        """
+        Recupera alert critici (stessa query di FridgeDatabase)
+        
+        Returns:
+            List[Dict]: Alert critici
+        """
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.cursor(DictCursor) as cursor:
+                    await cursor.execute(_SQL_CRITICAL_ALERTS, (fridge_id, hours))
+                    rows = await cursor.fetchall()
+                return list(rows)
+        except MySQLError as e:
+            logger.error(f"Error fetching critical alerts: {e}")
+            return []
+    
+    # ========================================
+    # DASHBOARD
+    # ========================================
+
+    async def get_dashboard(self, fridge_id: int, stats_hours: int = 48,
+                            alerts_hours: int = 24, critical_hours: int = 2) -> Dict:
+        """
+        Statistiche, allarmi recenti e critici in parallelo: le query viaggiano su
+        connessioni diverse del pool, la latenza totale è quella della più lenta.
+
+        Returns:
+            Dict: {'stats': ..., 'alerts': [...], 'critical_alerts': [...]}
+        """
+        stats, alerts, critical = await asyncio.gather(
+            self.get_measurement_statistics(fridge_id, stats_hours),
+            self.get_recent_alerts(fridge_id, alerts_hours),
+            self.get_critical_alerts(fridge_id, critical_hours),
+        )
+        return {'stats': stats, 'alerts': alerts, 'critical_alerts': critical}
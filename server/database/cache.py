@@ -0,0 +1,86 @@
+"""
+Cache TTL in-process per le letture del database
+Le query statistiche vengono interrogate dalle dashboard ogni pochi secondi,
+mentre i dati cambiano solo ad ogni nuova misurazione.
+La cache è per processo: un risultato può restare vecchio fino al TTL
+(vedi ttl_cache), quindi il TTL va tenuto di pochi secondi.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, Callable
+from mysql.connector import Error
+from utils.logger import get_logger
+
+logger = get_logger('database.cache')
+
+# Entry oltre le quali si ripuliscono quelle scadute
+_MAX_ENTRIES = 1024
+
+
+def _copy(value: Any) -> Any:
+    """Copia liste e dict (anche annidati) del risultato: i chiamanti possono modificarlo."""
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+def ttl_cache(seconds: float, fallback: Callable[[], Any], error_message: str) -> Callable:
+    """
+    Decoratore per metodi del tipo method(self, fridge_id, ...)
+    Memorizza il risultato per `seconds` secondi. La chiave include la
+    versione dati del frigo (self.get_data_version): una scrittura fatta da
+    questo processo invalida subito le entry precedenti. Le scritture di altri
+    worker e le righe inserite dai trigger (es. Alerts) non cambiano la
+    versione: diventano visibili solo alla scadenza del TTL.
+    
+    Il metodo decorato lascia propagare gli errori del database: vengono
+    loggati, il chiamante riceve fallback() e niente finisce in cache.
+    Ogni chiamata riceve una copia del risultato in cache.
+    
+    Args:
+        seconds: Durata di validità del risultato
+        fallback: Funzione che produce il risultato da ritornare su errore
+        error_message: Prefisso del messaggio di log su errore
+    """
+    def decorator(method: Callable) -> Callable:
+        cache = {}
+        lock = threading.Lock()
+        
+        def call(self, fridge_id, *args, **kwargs):
+            try:
+                return method(self, fridge_id, *args, **kwargs), True
+            except Error as e:
+                logger.error(f"{error_message}: {e}")
+                return fallback(), False
+        
+        @functools.wraps(method)
+        def wrapper(self, fridge_id, *args, **kwargs):
+            if seconds <= 0:
+                return call(self, fridge_id, *args, **kwargs)[0]
+            
+            key = (id(self), fridge_id, self.get_data_version(fridge_id),
+                   args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and hit[1] > now:
+                return _copy(hit[0])
+            
+            value, ok = call(self, fridge_id, *args, **kwargs)
+            if not ok:
+                return value
+            
+            with lock:
+                if len(cache) >= _MAX_ENTRIES:
+                    for stale in [k for k, (_, expiry) in cache.items() if expiry <= now]:
+                        del cache[stale]
+                cache[key] = (value, now + seconds)
+            return _copy(value)
+        
+        return wrapper
+    return decorator
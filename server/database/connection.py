@@ -3,10 +3,18 @@ Database Connection Manager
 Gestisce connessioni e pool per MySQL
 """
 
+import math
+import queue
+import socket
+import threading
+import time
 import mysql.connector
-from mysql.connector import Error, pooling
+from mysql.connector import Error, errorcode, pooling
 from contextlib import contextmanager
 from config import Config
+from utils.logger import get_logger
+
+logger = get_logger('database.connection')
 
 
 class DatabaseConfig:
@@ -18,10 +26,29 @@ class DatabaseConfig:
     DATABASE = Config.DB_NAME
     USER = Config.DB_USER
     PASSWORD = Config.DB_PASSWORD
+    # Protocollo compresso: le letture di storico viaggiano su WAN
+    COMPRESS = Config.DB_COMPRESS
     
     # Pool connessioni
     POOL_NAME = "smart_fridge_pool"
-    POOL_SIZE = 5
+    # mysql.connector apre tutte le connessioni alla creazione del pool e ne
+    # accetta al massimo CNX_POOL_MAXSIZE (32)
+    POOL_SIZE = max(1, min(Config.DB_POOL_SIZE, pooling.CNX_POOL_MAXSIZE))
+    # Secondi di inattività dopo cui una connessione del pool viene chiusa (0 = mai)
+    IDLE_TIMEOUT = Config.DB_POOL_IDLE_TIMEOUT
+    # Di default niente COM_RESET_CONNECTION alla restituzione al pool: risparmia
+    # un round-trip per checkout e mantiene vivi i prepared statement.
+    # Le transazioni rimaste aperte vengono chiuse con rollback in get_connection.
+    POOL_RESET_SESSION = Config.DB_POOL_RESET_SESSION
+    # Keepalive TCP: evita che i middlebox chiudano le connessioni inattive del pool
+    TCP_KEEPIDLE_SECONDS = 30
+    # Usa l'estensione C del connector (decode del protocollo in C) se installata;
+    # senza estensione mysql.connector ricade sull'implementazione pure-Python
+    USE_PURE = not getattr(mysql.connector, 'HAVE_CEXT', False)
+    # Autocommit: ogni INSERT singolo si conferma da solo, senza il round-trip del
+    # COMMIT, e le letture non lasciano transazioni aperte da chiudere al rilascio.
+    # Le scritture multi-statement aprono una transazione esplicita (begin/transaction)
+    AUTOCOMMIT = Config.DB_AUTOCOMMIT
     
     @classmethod
     def get_config(cls) -> dict:
@@ -34,9 +61,13 @@ class DatabaseConfig:
             'password': cls.PASSWORD,
             'charset': 'utf8mb4',
             'use_unicode': True,
-            'autocommit': False,
-            'raise_on_warnings': True,
-            'connection_timeout': 10
+            'autocommit': cls.AUTOCOMMIT,
+            # I warning non sollevano eccezioni: evita il round-trip SHOW WARNINGS
+            # dopo ogni statement che ne produce (consultabili con cursor.fetchwarnings())
+            'raise_on_warnings': False,
+            'connection_timeout': 10,
+            'use_pure': cls.USE_PURE,
+            'compress': cls.COMPRESS
         }
 
 
@@ -52,6 +83,8 @@ class DatabaseConnection:
         """
         self.use_pool = use_pool
         self._pool = None
+        # Transazione esplicita attiva per thread (vedi transaction())
+        self._local = threading.local()
         
         if use_pool:
             self._init_connection_pool()
@@ -62,12 +95,82 @@ class DatabaseConnection:
             self._pool = mysql.connector.pooling.MySQLConnectionPool(
                 pool_name=DatabaseConfig.POOL_NAME,
                 pool_size=DatabaseConfig.POOL_SIZE,
+                pool_reset_session=DatabaseConfig.POOL_RESET_SESSION,
                 **DatabaseConfig.get_config()
             )
-            print(f"[DatabaseConnection] Connection pool initialized")
+            driver = "pure-Python" if DatabaseConfig.USE_PURE else "C extension"
+            logger.info(f"Connection pool initialized "
+                  f"(size {DatabaseConfig.POOL_SIZE}, {driver})")
+            if DatabaseConfig.USE_PURE:
+                logger.warning("mysql.connector C extension not available: "
+                               "reinstall mysql-connector-python from the official wheel "
+                               "for faster row decoding")
         except Error as e:
-            print(f"[DatabaseConnection] Error creating connection pool: {e}")
+            logger.error(f"Error creating connection pool: {e}")
             self._pool = None
+            return
+        
+        if DatabaseConfig.IDLE_TIMEOUT > 0:
+            threading.Thread(target=self._idle_reaper_loop, name="DBIdleReaper",
+                             daemon=True).start()
+    
+    def _idle_reaper_loop(self):
+        """
+        Chiude periodicamente le connessioni del pool inattive da più di
+        IDLE_TIMEOUT secondi, liberando thread e memoria lato server.
+        Intervallo adattivo: max(1, IDLE_TIMEOUT / 2).
+        """
+        interval = max(1.0, DatabaseConfig.IDLE_TIMEOUT / 2)
+        while True:
+            time.sleep(interval)
+            try:
+                self._reap_idle_connections()
+            except Exception as e:
+                logger.error(f"Idle reaper error: {e}")
+    
+    def _reap_idle_connections(self):
+        """
+        Disconnette le connessioni libere inattive. Tornano poi nella coda del pool:
+        get_connection() del pool le riconnette al prossimo utilizzo.
+        """
+        now = time.monotonic()
+        stale = []
+        # Stesso lock usato dal pool in get_connection/add_connection: sotto lock
+        # solo lo smistamento, le connessioni attive tornano subito in coda
+        with pooling.CONNECTION_POOL_LOCK:
+            idle = []
+            while True:
+                try:
+                    idle.append(self._pool._cnx_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for cnx in idle:
+                # Le connessioni già chiuse sono marcate con _last_used = inf
+                # fino al prossimo utilizzo
+                last_used = getattr(cnx, '_last_used', None)
+                if last_used is None:
+                    cnx._last_used = now
+                elif now - last_used > DatabaseConfig.IDLE_TIMEOUT:
+                    stale.append(cnx)
+                    continue
+                self._pool._cnx_queue.put_nowait(cnx)
+        
+        if not stale:
+            return
+        
+        # Disconnessione (I/O di rete) fuori dal lock: non blocca le richieste
+        for cnx in stale:
+            self._drop_prepared_cache(cnx)
+            try:
+                cnx.disconnect()
+            except Error:
+                pass
+            cnx._last_used = math.inf
+        
+        with pooling.CONNECTION_POOL_LOCK:
+            for cnx in stale:
+                self._pool._cnx_queue.put_nowait(cnx)
+        logger.info(f"Closed {len(stale)} idle connection(s)")
     
     @contextmanager
     def get_connection(self):
@@ -78,23 +181,281 @@ class DatabaseConnection:
         Yields:
             mysql.connector.connection: Connessione attiva
         """
+        # Dentro transaction(): riusa la sua connessione, commit/rollback/chiusura
+        # restano a carico della transazione
+        tx_connection = getattr(self._local, 'connection', None)
+        if tx_connection is not None:
+            yield tx_connection
+            return
+        
+        # Thread scrittore con connessione dedicata (vedi writer_connection())
+        pinned = getattr(self._local, 'pinned', None)
+        if pinned is not None:
+            try:
+                yield pinned
+            except Error as e:
+                logger.error(f"Database error: {e}")
+                self._recover_pinned(pinned)
+                raise
+            return
+        
         connection = None
         try:
             if self.use_pool and self._pool:
                 connection = self._pool.get_connection()
+                # Dopo un reset di sessione i prepared statement non esistono più
+                if DatabaseConfig.POOL_RESET_SESSION:
+                    self._drop_prepared_cache(connection)
             else:
                 connection = mysql.connector.connect(**DatabaseConfig.get_config())
             
+            self._tune_socket(connection)
             yield connection
             
         except Error as e:
-            print(f"[DatabaseConnection] Database error: {e}")
+            logger.error(f"Database error: {e}")
             if connection:
                 connection.rollback()
             raise
         finally:
-            if connection and connection.is_connected():
+            # Niente is_connected() ad ogni chiamata: con il pool close() restituisce
+            # solo la connessione (il pool la riconnette al checkout se serve)
+            if connection is not None:
+                try:
+                    # Senza reset di sessione una transazione aperta (anche solo di
+                    # lettura) tornerebbe nel pool con il suo snapshot
+                    if not DatabaseConfig.POOL_RESET_SESSION and connection.in_transaction:
+                        connection.rollback()
+                    self._raw_connection(connection)._last_used = time.monotonic()
+                    connection.close()
+                except Error:
+                    pass
+    
+    @contextmanager
+    def writer_connection(self):
+        """
+        Connessione dedicata per un thread scrittore a lunga vita (es. flusher):
+        per tutta la durata del blocco get_connection() su questo thread la
+        riusa senza checkout/rilascio dal pool. La connessione è esterna al pool,
+        quindi non sottrae slot alle richieste; se cade viene riconnessa.
+        I commit restano quelli dei singoli metodi.
+        """
+        if getattr(self._local, 'pinned', None) is not None:
+            yield self
+            return
+        
+        try:
+            connection = mysql.connector.connect(**DatabaseConfig.get_config())
+            self._tune_socket(connection)
+        except Error as e:
+            # Senza connessione dedicata si torna al pool
+            logger.error(f"Writer connection unavailable, using pool: {e}")
+            yield self
+            return
+        
+        self._local.pinned = connection
+        try:
+            yield self
+        finally:
+            self._local.pinned = None
+            try:
                 connection.close()
+            except Error:
+                pass
+    
+    def _recover_pinned(self, connection):
+        """Dopo un errore: rollback, oppure riconnessione se la connessione è caduta."""
+        try:
+            if connection.is_connected():
+                connection.rollback()
+            else:
+                self._drop_prepared_cache(connection)
+                connection.reconnect(attempts=2, delay=1)
+        except Error as e:
+            logger.error(f"Writer connection recovery failed: {e}")
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group commit: tutte le operazioni del blocco (sullo stesso thread) usano
+        una sola connessione e un solo COMMIT finale, invece di un commit per riga.
+        Rollback se il blocco solleva un'eccezione. Le transazioni annidate
+        confluiscono in quella esterna.
+        
+        Esempio:
+            with db.transaction():
+                for t, p in rows:
+                    db.insert_measurement(fridge_id, t, p)
+        
+        Yields:
+            self: Il database stesso, per comodità (with db.transaction() as tx)
+        """
+        if getattr(self._local, 'connection', None) is not None:
+            yield self
+            return
+        
+        with self.get_connection() as conn:
+            self._local.connection = conn
+            self._local.after_commit = []
+            try:
+                if not conn.in_transaction:
+                    conn.start_transaction()
+                yield self
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                for callback, args in self._local.after_commit:
+                    callback(*args)
+            finally:
+                self._local.connection = None
+                self._local.after_commit = []
+    
+    def begin(self, connection):
+        """
+        Apre una transazione esplicita per scritture multi-statement da confermare
+        con commit() (con autocommit ogni statement sarebbe confermato da solo).
+        Non fa nulla dentro transaction() o se una transazione è già aperta.
+        """
+        if getattr(self._local, 'connection', None) is None and not connection.in_transaction:
+            connection.start_transaction()
+    
+    def commit(self, connection):
+        """
+        Commit della connessione, rimandato a fine blocco se dentro transaction().
+        Con autocommit e nessuna transazione aperta non c'è nulla da confermare:
+        niente COMMIT (e niente round-trip).
+        """
+        if getattr(self._local, 'connection', None) is None and connection.in_transaction:
+            connection.commit()
+    
+    def after_commit(self, callback, *args):
+        """Esegue callback(*args) dopo il commit effettivo (subito se fuori da transaction())."""
+        if getattr(self._local, 'connection', None) is None:
+            callback(*args)
+        else:
+            self._local.after_commit.append((callback, args))
+    
+    def _tune_socket(self, connection):
+        """
+        Imposta TCP_NODELAY (niente attese di Nagle sui piccoli INSERT) e
+        keepalive sul socket della connessione, una volta per socket.
+        Disponibile solo con il driver pure-Python (l'estensione C non espone il socket).
+        """
+        raw = self._raw_connection(connection)
+        sock = getattr(getattr(raw, '_socket', None), 'sock', None)
+        if sock is None or getattr(raw, '_tuned_sock', None) is sock:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,
+                                DatabaseConfig.TCP_KEEPIDLE_SECONDS)
+            raw._tuned_sock = sock
+        except OSError as e:
+            logger.warning(f"Socket tuning failed: {e}")
+    
+    # ========================================
+    # PREPARED STATEMENTS
+    # ========================================
+    
+    @staticmethod
+    def _raw_connection(connection):
+        """Connessione reale sotto l'eventuale wrapper del pool."""
+        # Solo il wrapper del pool: nell'estensione C _cnx è l'handle nativo
+        if isinstance(connection, pooling.PooledMySQLConnection):
+            return connection._cnx
+        return connection
+    
+    def _drop_prepared_cache(self, connection):
+        """Dimentica i cursori (preparati e condiviso) associati alla connessione."""
+        raw = self._raw_connection(connection)
+        raw._prepared_cache = {}
+        raw._shared_cursor = None
+    
+    def shared_cursor(self, connection):
+        """
+        Cursore semplice riusato per la vita della connessione (query con SQL
+        variabile, es. INSERT multi-riga): evita di creare e chiudere un
+        cursore ad ogni chiamata. Dopo un errore va scartato con discard_shared_cursor.
+        """
+        raw = self._raw_connection(connection)
+        cursor = getattr(raw, '_shared_cursor', None)
+        if cursor is None:
+            cursor = raw._shared_cursor = connection.cursor()
+        return cursor
+    
+    def discard_shared_cursor(self, connection):
+        """Scarta il cursore condiviso (ricreato al prossimo utilizzo)."""
+        self._raw_connection(connection)._shared_cursor = None
+    
+    def _prepared_cursor(self, connection, query: str):
+        """
+        Ritorna un cursore preparato per la query, riusato tra le chiamate.
+        La cache (SQL -> cursore) vive sulla connessione reale, quindi
+        segue la connessione nel pool.
+        """
+        raw = self._raw_connection(connection)
+        cache = getattr(raw, '_prepared_cache', None)
+        if cache is None:
+            cache = raw._prepared_cache = {}
+        
+        cursor = cache.get(query)
+        if cursor is None:
+            cursor = connection.cursor(prepared=True)
+            cache[query] = cursor
+        return cursor
+    
+    def execute_prepared(self, connection, query: str, params: tuple,
+                         idempotent: bool = False):
+        """
+        Esegue la query su un cursore preparato (parse/plan una sola volta
+        per connessione). Se il server non riconosce più lo statement
+        (es. connessione resettata) svuota la cache e riprova una volta.
+        
+        Una connessione persa durante l'esecuzione (CR_SERVER_LOST/GONE) è
+        ambigua: con autocommit l'INSERT può essere già stato applicato e
+        perso solo l'OK. In quel caso si riprova solo se idempotent=True
+        (SELECT), altrimenti l'errore risale al chiamante.
+        
+        Args:
+            idempotent: True se rieseguire la query non ha effetti (letture)
+        
+        Returns:
+            Cursore preparato dopo l'esecuzione (lastrowid, fetch*)
+        """
+        cursor = self._prepared_cursor(connection, query)
+        try:
+            cursor.execute(query, params)
+        except Error as e:
+            connection_lost = e.errno in (errorcode.CR_SERVER_LOST, errorcode.CR_SERVER_GONE_ERROR)
+            if e.errno != errorcode.ER_UNKNOWN_STMT_HANDLER and not (connection_lost and idempotent):
+                if connection_lost:
+                    self._drop_prepared_cache(connection)
+                else:
+                    # Cursore in stato incerto: non riusarlo
+                    self._raw_connection(connection)._prepared_cache.pop(query, None)
+                raise
+            self._drop_prepared_cache(connection)
+            if not connection.is_connected():
+                connection.reconnect()
+            cursor = self._prepared_cursor(connection, query)
+            cursor.execute(query, params)
+        return cursor
+    
+    def fetch_prepared(self, connection, query: str, params: tuple) -> list:
+        """
+        Esegue una SELECT su cursore preparato e ritorna le righe come dict
+        (stesso formato dei cursori dictionary=True).
+        
+        Returns:
+            List[Dict]: Righe del risultato
+        """
+        cursor = self.execute_prepared(connection, query, params, idempotent=True)
+        columns = cursor.column_names
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
     def test_connection(self) -> bool:
         """
@@ -109,8 +470,8 @@ class DatabaseConnection:
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
                 cursor.close()
-                print("[DatabaseConnection] Connection test successful")
+                logger.info("Connection test successful")
                 return True
         except Error as e:
-            print(f"[DatabaseConnection] Connection test failed: {e}")
+            logger.error(f"Connection test failed: {e}")
             return False
@@ -200,7 +200,7 @@ class DebugDatabase(DatabaseConnection):
             List[int]: Lista ID prodotti inseriti, None se errore
         """
         if len(products) != len(categories) and categories is not None:
-            print(f"[FridgeDatabase] Products and categories length mismatch")
+            logger.warning("Products and categories length mismatch")
             return None
         
         try:
@@ -230,17 +230,17 @@ class DebugDatabase(DatabaseConnection):
                 count = cursor.rowcount
                 product_ids = list(range(first_id, first_id + count))
                 
-                conn.commit()
+                self.commit(conn)
                 cursor.close()
                 
-                print(f"[FridgeDatabase] Batch inserted {count} products with IDs: {product_ids}")
+                logger.info(f"Batch inserted {count} products with IDs: {product_ids}")
                 return product_ids
                 
         except Error as e:
             # Gestisci errori trigger validazione
             if e.sqlstate == '45000':
-                print(f"[FridgeDatabase] Validation error in batch: {e.msg}")
+                logger.warning(f"Validation error in batch: {e.msg}")
                 return None
             else:
-                print(f"[FridgeDatabase] Database error in batch: {e}")
+                logger.error(f"Database error in batch: {e}")
                 return None
\ No newline at end of file
@@ -3,10 +3,307 @@ Fridge Database Operations
 Gestisce operazioni database lato frigo (measurements, alerts, products)
 """
 
-from mysql.connector import Error
+import atexit
+import functools
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+import mysql.connector
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from mysql.connector import Error, errorcode
 from datetime import datetime
-from typing import List, Dict, Optional
-from .connection import DatabaseConnection
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import Config
+from .cache import ttl_cache
+from .connection import DatabaseConfig, DatabaseConnection
+from utils.logger import get_logger
+
+logger = get_logger('database.fridge')
+
+
+# Righe massime per singolo INSERT multi-riga (resta ben sotto max_allowed_packet)
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# Coda di scrittura asincrona delle misurazioni
+WRITE_QUEUE_MAX_SIZE = 10000     # Misurazioni massime in attesa
+WRITE_BATCH_MAX_SIZE = Config.DB_WRITE_BATCH_SIZE          # Misurazioni per INSERT del flusher
+WRITE_FLUSH_INTERVAL = Config.DB_WRITE_FLUSH_INTERVAL      # Attesa massima (s) per riempire un batch
+# Thread per insert_measurement_async: lascia almeno una connessione del pool alle letture
+WRITE_EXECUTOR_WORKERS = max(1, DatabaseConfig.POOL_SIZE - 1)
+
+# Righe per blocco nella lettura a streaming dello storico (fetchmany)
+HISTORY_FETCH_BATCH_SIZE = 1024
+
+# Prodotti trovati per nome tenuti in memoria (la YOLO ripete un vocabolario ristretto)
+PRODUCT_CACHE_SIZE = 512
+# Parole più corte di innodb_ft_min_token_size non sono indicizzate dal FULLTEXT
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+# Finestre massime interrogabili: oltre la retention dei trigger di pulizia
+# (cleanup_old_measurements / cleanup_old_alerts) non ci sono righe
+MEASUREMENTS_RETENTION_HOURS = 48
+ALERTS_RETENTION_HOURS = 7 * 24
+
+# Indici richiesti dalle query calde: tabella -> (nome indice da creare, colonne iniziali).
+# Su Measurements l'indice è coprente: storico e statistiche leggono solo l'indice
+# (EXPLAIN: "Using index") senza accedere alle righe della tabella
+_REQUIRED_TIME_INDEXES = {
+    'Measurements': ('idx_meas_covering', ('fridge_ID', 'timestamp', 'temperature', 'power')),
+    'Alerts': ('idx_fridge_ts', ('fridge_ID', 'timestamp')),
+}
+
+# SQL degli INSERT a riga singola: stringhe costanti, usate anche come chiave
+# della cache dei cursori preparati (variante NOW() se timestamp non fornito)
+_SQL_INSERT_MEASUREMENT_NOW = (
+    "INSERT INTO Measurements (fridge_ID, timestamp, temperature, power) "
+    "VALUES (%s, NOW(), %s, %s)"
+)
+_SQL_INSERT_MEASUREMENT_TS = (
+    "INSERT INTO Measurements (fridge_ID, timestamp, temperature, power) "
+    "VALUES (%s, %s, %s, %s)"
+)
+_SQL_INSERT_MEASUREMENT_MANY = (
+    "INSERT INTO Measurements (fridge_ID, timestamp, temperature, power) "
+    "VALUES (%s, COALESCE(%s, NOW()), %s, %s)"
+)
+_SQL_INSERT_ALERT_NOW = (
+    "INSERT INTO Alerts (fridge_ID, timestamp, category, message) "
+    "VALUES (%s, NOW(), %s, %s)"
+)
+_SQL_INSERT_ALERT_TS = (
+    "INSERT INTO Alerts (fridge_ID, timestamp, category, message) "
+    "VALUES (%s, %s, %s, %s)"
+)
+_SQL_INSERT_ALERT_MANY = (
+    "INSERT INTO Alerts (fridge_ID, timestamp, category, message) "
+    "VALUES (%s, COALESCE(%s, NOW()), %s, %s)"
+)
+# Evento porta inserito solo se diverso dall'ultimo evento porta del frigo:
+# il confronto è sul database, quindi vale per tutti i worker del server
+_SQL_INSERT_DOOR_EVENT = (
+    "INSERT INTO Alerts (fridge_ID, timestamp, category, message) "
+    "SELECT %s, NOW(), %s, %s FROM DUAL "
+    "WHERE COALESCE(("
+    "SELECT category FROM Alerts "
+    "WHERE fridge_ID = %s AND category IN ('door_open', 'door_closed') "
+    "ORDER BY timestamp DESC, ID DESC LIMIT 1"
+    "), '') <> %s"
+)
+# Risultato di insert_door_event per un evento uguale all'ultimo registrato
+DOOR_EVENT_DUPLICATE = 0
+# Caricamento da CSV "timestamp,temperature,power" (righe terminate da \n)
+_SQL_LOAD_MEASUREMENTS = (
+    "LOAD DATA LOCAL INFILE %s INTO TABLE Measurements "
+    "FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n' "
+    "(timestamp, temperature, power) SET fridge_ID = %s"
+)
+_SQL_INSERT_MOVEMENT_NOW = (
+    "INSERT INTO ProductsMovements (fridge_ID, product_ID, quantity, timestamp) "
+    "VALUES (%s, %s, %s, NOW())"
+)
+_SQL_INSERT_MOVEMENT_TS = (
+    "INSERT INTO ProductsMovements (fridge_ID, product_ID, quantity, timestamp) "
+    "VALUES (%s, %s, %s, %s)"
+)
+
+
+# Statistiche temperatura/potenza: ore complete dal rollup Measurements_Hourly,
+# frazione d'ora iniziale da Measurements.
+# Parametri: (fridge_id, hours, fridge_id, hours, hours)
+_SQL_MEASUREMENT_STATS = """
+    SELECT 
+        COALESCE(SUM(cnt), 0) as count,
+        CAST(COALESCE(SUM(sum_t) / SUM(cnt), 0) AS DOUBLE) as avg_temperature,
+        CAST(COALESCE(MIN(min_t), 0) AS DOUBLE) as min_temperature,
+        CAST(COALESCE(MAX(max_t), 0) AS DOUBLE) as max_temperature,
+        CAST(COALESCE(SUM(sum_p) / SUM(cnt), 0) AS DOUBLE) as avg_power,
+        CAST(COALESCE(MIN(min_p), 0) AS DOUBLE) as min_power,
+        CAST(COALESCE(MAX(max_p), 0) AS DOUBLE) as max_power
+    FROM (
+        SELECT sample_count AS cnt, sum_t, min_t, max_t, sum_p, min_p, max_p
+        FROM Measurements_Hourly
+        WHERE fridge_ID = %s
+          AND hour_bucket >= DATE_FORMAT(NOW() - INTERVAL %s HOUR + INTERVAL 1 HOUR,
+                                         '%%Y-%%m-%%d %%H:00:00')
+        UNION ALL
+        SELECT COUNT(*), SUM(temperature), MIN(temperature), MAX(temperature),
+               SUM(power), MIN(power), MAX(power)
+        FROM Measurements
+        WHERE fridge_ID = %s
+          AND timestamp >= NOW() - INTERVAL %s HOUR
+          AND timestamp < DATE_FORMAT(NOW() - INTERVAL %s HOUR + INTERVAL 1 HOUR,
+                                      '%%Y-%%m-%%d %%H:00:00')
+    ) AS buckets
+"""
+
+
+# Letture su cursore preparato: testo SQL costante, il server lo prepara
+# una volta per connessione (cache dei cursori in DatabaseConnection)
+_SQL_RECENT_ALERTS_BY_CATEGORY = """
+    SELECT ID, timestamp, category, message
+    FROM Alerts
+    WHERE fridge_ID = %s
+      AND category = %s
+      AND timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY timestamp DESC
+"""
+_SQL_RECENT_ALERTS = """
+    SELECT ID, timestamp, category, message
+    FROM Alerts
+    WHERE fridge_ID = %s
+      AND timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY timestamp DESC
+"""
+# Placeholder IN (...) espansi a runtime: un prepared statement per numero di categorie
+_SQL_ALERTS_BY_CATEGORIES = """
+    SELECT category, ID, timestamp, message
+    FROM Alerts
+    WHERE fridge_ID = %s
+      AND category IN ({placeholders})
+      AND timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY timestamp DESC
+"""
+_SQL_CRITICAL_ALERTS = """
+    SELECT ID, timestamp, category, message
+    FROM Alerts
+    WHERE fridge_ID = %s
+      AND category IN ('critic_temp', 'critic_power', 'door_left_open', 'sensor_offline', 'low_temp')
+      AND timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY timestamp DESC
+"""
+_SQL_CURRENT_PRODUCTS = """
+    SELECT 
+        fridge_product_ID as fridge_product_id,
+        product_ID as product_id,
+        name,
+        brand,
+        category,
+        quantity,
+        added_in
+    FROM CurrentProducts
+    WHERE fridge_ID = %s
+    ORDER BY added_in DESC
+"""
+_SQL_LATEST_MEASUREMENT = """
+    SELECT timestamp, temperature, power
+    FROM Measurements
+    WHERE fridge_ID = %s
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+_SQL_MEASUREMENTS_HISTORY = """
+    SELECT timestamp, temperature, power
+    FROM Measurements
+    WHERE fridge_ID = %s
+      AND timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY timestamp ASC
+"""
+_SQL_PRODUCT_MOVEMENTS = """
+    SELECT 
+        pm.ID,
+        pm.timestamp,
+        pm.quantity,
+        p.name,
+        p.brand,
+        p.category
+    FROM ProductsMovements pm
+    JOIN Products p ON pm.product_ID = p.ID
+    WHERE pm.fridge_ID = %s
+      AND pm.timestamp >= NOW() - INTERVAL %s HOUR
+    ORDER BY pm.timestamp DESC
+"""
+_SQL_PRODUCT_BY_EXACT_NAME = """
+    SELECT ID, name, brand, category
+    FROM Products
+    WHERE name = %s
+    LIMIT 1
+"""
+_SQL_PRODUCT_BY_NAME_FULLTEXT = """
+    SELECT ID, name, brand, category
+    FROM Products
+    WHERE MATCH(name) AGAINST(%s IN BOOLEAN MODE)
+    ORDER BY MATCH(name) AGAINST(%s IN BOOLEAN MODE) DESC, CHAR_LENGTH(name)
+    LIMIT 1
+"""
+_SQL_PRODUCT_BY_NAME = """
+    SELECT ID, name, brand, category
+    FROM Products
+    WHERE name LIKE %s
+    LIMIT 1
+"""
+
+
+def _window_hours(hours: int, retention_hours: Optional[int] = None) -> int:
+    """
+    Normalizza la finestra temporale di una lettura: intero tra 1 e la retention.
+    Richieste oltre la retention restituiscono le stesse righe, così condividono
+    anche la stessa entry della cache TTL.
+    """
+    hours = max(1, int(hours))
+    return hours if retention_hours is None else min(hours, retention_hours)
+
+
+def _stats_from_row(row: Optional[tuple]) -> Dict[str, Dict]:
+    """
+    Converte la riga di _SQL_MEASUREMENT_STATS nel dict di statistiche (zeri se vuota).
+    La query restituisce già DOUBLE senza NULL: nessuna conversione per campo.
+    """
+    if not row:
+        row = (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    
+    count, avg_t, min_t, max_t, avg_p, min_p, max_p = row
+    count = int(count)
+    return {
+        'temperature': {'count': count, 'average': avg_t, 'min': min_t, 'max': max_t},
+        'power': {'count': count, 'average': avg_p, 'min': min_p, 'max': max_p}
+    }
+
+
+def _fulltext_terms(name: str) -> str:
+    """
+    Converte un nome nei termini BOOLEAN MODE "+parola* +parola*": tutte le
+    parole obbligatorie, anche come prefisso. Le parole sotto la lunghezza
+    minima indicizzata sono omesse (con il "+" nessuna riga corrisponderebbe).
+    """
+    words = re.findall(r"\w+", name.lower())
+    return " ".join(f"+{word}*" for word in words if len(word) >= FULLTEXT_MIN_TOKEN_SIZE)
+
+
+def _escape_like(value: str) -> str:
+    """Protegge i caratteri jolly di LIKE (%, _) e il carattere di escape."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class FridgeHandle:
+    """
+    Vista di FridgeDatabase legata a un singolo frigo: i metodi più usati sono
+    functools.partial con fridge_id già applicato, costruiti una sola volta.
+    Utile per produttori a lunga vita dedicati a un frigo (es. un loop di ingest).
+    """
+    
+    # Metodi di FridgeDatabase esposti con fridge_id pre-applicato
+    BOUND_METHODS = (
+        'insert_measurement',
+        'insert_measurements_bulk',
+        'insert_measurement_async',
+        'enqueue_measurement',
+        'insert_alert',
+        'insert_alerts',
+        'insert_door_event',
+        'get_measurement_statistics',
+        'get_recent_alerts',
+        'get_latest_measurement',
+    )
+    
+    def __init__(self, db: 'FridgeDatabase', fridge_id: int):
+        self.fridge_id = fridge_id
+        for name in self.BOUND_METHODS:
+            setattr(self, name, functools.partial(getattr(db, name), fridge_id))
 
 
 class FridgeDatabase(DatabaseConnection):
@@ -25,6 +322,101 @@ class FridgeDatabase(DatabaseConnection):
             use_pool: Se True usa connection pooling (consigliato)
         """
         super().__init__(use_pool)
+        
+        # Scritture asincrone: coda limitata + thread flusher avviato al primo uso
+        self._write_queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_MAX_SIZE)
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+        self._flusher_stop = threading.Event()
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Versione dati per frigo: incrementata ad ogni scrittura di questo
+        # processo, fa parte della chiave della cache TTL delle letture
+        self._data_versions: Dict[int, int] = {}
+        
+        # Handle per frigo (metodi con fridge_id pre-applicato), creati al primo uso
+        self._handles: Dict[int, FridgeHandle] = {}
+        
+        # Cache LRU nome normalizzato -> prodotto (solo risultati trovati)
+        self._product_cache: OrderedDict = OrderedDict()
+        self._product_cache_lock = threading.Lock()
+    
+    def ensure_schema(self) -> bool:
+        """
+        Verifica che Measurements e Alerts abbiano un indice che inizi con
+        (fridge_ID, timestamp): tutte le query calde filtrano per frigo e
+        intervallo temporale, senza indice sarebbero scansioni complete.
+        Su Measurements l'indice deve coprire anche temperature e power:
+        il vecchio (fridge_ID, timestamp) viene sostituito, non affiancato.
+        Verifica anche l'indice FULLTEXT su Products.name (ricerca prodotti).
+        Crea gli indici mancanti. Esegue DDL: chiamata solo da migrate.py.
+        
+        Returns:
+            bool: True se gli indici sono presenti (o creati)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                for table, (index_name, required) in _REQUIRED_TIME_INDEXES.items():
+                    cursor.execute(f"SHOW INDEX FROM {table}")
+                    columns_by_index: Dict[str, List[Tuple[int, str]]] = {}
+                    non_unique = set()
+                    for row in cursor.fetchall():
+                        columns_by_index.setdefault(row['Key_name'], []).append(
+                            (row['Seq_in_index'], row['Column_name']))
+                        if row['Non_unique']:
+                            non_unique.add(row['Key_name'])
+                    
+                    has_index = any(
+                        tuple(name for _, name in sorted(columns)[:len(required)]) == required
+                        for columns in columns_by_index.values()
+                    )
+                    # Gli indici non unici che sono un prefisso (almeno frigo + tempo)
+                    # dell'indice richiesto sono ridondanti: rimossi nello stesso ALTER
+                    # che crea il nuovo, così l'INSERT non mantiene due indici e la FK
+                    # su fridge_ID resta sempre coperta (anche su database già migrati)
+                    redundant = [
+                        name for name, columns in columns_by_index.items()
+                        if name in non_unique and 2 <= len(columns) < len(required)
+                        and tuple(col for _, col in sorted(columns)) == required[:len(columns)]
+                    ]
+                    clauses = [f"DROP INDEX {name}" for name in redundant]
+                    if not has_index:
+                        clauses.append(f"ADD INDEX {index_name} ({', '.join(required)})")
+                    if clauses:
+                        cursor.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+                        logger.info(f"Updated indexes on {table}: {', '.join(clauses)}")
+                
+                cursor.execute("SHOW INDEX FROM Products WHERE Index_type = 'FULLTEXT' AND Column_name = 'name'")
+                if not cursor.fetchall():
+                    cursor.execute("CREATE FULLTEXT INDEX ft_name ON Products (name)")
+                    logger.info("Created FULLTEXT index ft_name on Products")
+                cursor.close()
+                return True
+        except Error as e:
+            logger.error(f"Error checking schema indexes: {e}")
+            return False
+    
+    def for_fridge(self, fridge_id: int) -> FridgeHandle:
+        """
+        Ritorna l'handle del frigo (creato una volta e riusato).
+        
+        Example:
+            fridge = db.for_fridge(3)
+            fridge.insert_measurement(4.5, 120.0)
+        """
+        handle = self._handles.get(fridge_id)
+        if handle is None:
+            handle = self._handles.setdefault(fridge_id, FridgeHandle(self, fridge_id))
+        return handle
+    
+    def get_data_version(self, fridge_id: int) -> int:
+        """Versione corrente dei dati del frigo (per invalidare la cache letture)."""
+        return self._data_versions.get(fridge_id, 0)
+    
+    def _bump_data_version(self, fridge_id: int):
+        """Segnala una scrittura sul frigo: le letture in cache diventano obsolete."""
+        self._data_versions[fridge_id] = self._data_versions.get(fridge_id, 0) + 1
     
     # ========================================
     # MEASUREMENTS (temperature + power insieme)
@@ -46,33 +438,26 @@ class FridgeDatabase(DatabaseConnection):
         """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
+                # Cursore preparato riusato sulla connessione (niente parse ad ogni insert)
                 if timestamp is None:
-                    query = """
-                        INSERT INTO Measurements (fridge_ID, timestamp, temperature, power)
-                        VALUES (%s, NOW(), %s, %s)
-                    """
-                    cursor.execute(query, (fridge_id, temperature, power))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_MEASUREMENT_NOW,
+                                                   (fridge_id, temperature, power))
                 else:
-                    query = """
-                        INSERT INTO Measurements (fridge_ID, timestamp, temperature, power)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (fridge_id, timestamp, temperature, power))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_MEASUREMENT_TS,
+                                                   (fridge_id, timestamp, temperature, power))
                 
                 measurement_id = cursor.lastrowid
-                conn.commit()
-                cursor.close()
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
                 return measurement_id
         except Error as e:
             # Gestisci errori trigger validazione
             if e.sqlstate == '45000':
-                print(f"[FridgeDatabase] Validation error: {e.msg}")
+                logger.warning(f"Validation error: {e.msg}")
                 # Temperatura/potenza fuori range - errore sensore
                 return None
             else:
-                print(f"[FridgeDatabase] Database error: {e}")
+                logger.error(f"Database error: {e}")
                 return None
     
     def insert_measurements_batch(self, fridge_id: int, temperatures: List[float], 
@@ -90,55 +475,327 @@ class FridgeDatabase(DatabaseConnection):
             List[int]: Lista ID misurazioni inserite, None se errore
         """
         if len(temperatures) != len(powers):
-            print(f"[FridgeDatabase] Temperatures and powers length mismatch")
+            logger.warning("Temperatures and powers length mismatch")
             return None
         
         if timestamps and len(timestamps) != len(temperatures):
-            print(f"[FridgeDatabase] Timestamps length mismatch")
+            logger.warning("Timestamps length mismatch")
             return None
         
+        if timestamps is None:
+            timestamps = [None] * len(temperatures)
+        
+        return self.insert_measurements_bulk(fridge_id, list(zip(temperatures, powers, timestamps)))
+    
+    def insert_measurements_bulk(self, fridge_id: int,
+                                 rows: List[Tuple[float, float, Optional[datetime]]]) -> Optional[List[int]]:
+        """
+        Inserisce misurazioni con INSERT multi-riga (VALUES (...),(...),...):
+        un solo round-trip per blocco di righe e un solo commit per tutto il batch.
+        
+        Args:
+            fridge_id: ID del frigo
+            rows: Lista di tuple (temperatura, potenza, timestamp); timestamp None = NOW()
+        
+        Returns:
+            List[int]: Lista ID misurazioni inserite, None se errore
+        """
+        if not rows:
+            return []
+        
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
+                cursor = self.shared_cursor(conn)
                 measurement_ids = []
                 
-                # Prepara batch insert
-                if timestamps is None:
-                    query = """
-                        INSERT INTO Measurements (fridge_ID, timestamp, temperature, power)
-                        VALUES (%s, NOW(), %s, %s)
-                    """
-                    values = [(fridge_id, temp, pwr) for temp, pwr in zip(temperatures, powers)]
-                else:
-                    query = """
-                        INSERT INTO Measurements (fridge_ID, timestamp, temperature, power)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    values = [(fridge_id, ts, temp, pwr) for ts, temp, pwr in zip(timestamps, temperatures, powers)]
+                # Più blocchi = più statement: tutto o niente in una sola transazione
+                if len(rows) > BULK_INSERT_CHUNK_SIZE:
+                    self.begin(conn)
                 
-                # Esegui batch insert
-                cursor.executemany(query, values)
+                for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+                    chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+                    
+                    # VALUES riscritto lato client: una tupla di placeholder per riga
+                    query = (
+                        "INSERT INTO Measurements (fridge_ID, timestamp, temperature, power) VALUES "
+                        + ",".join(["(%s, COALESCE(%s, NOW()), %s, %s)"] * len(chunk))
+                    )
+                    params = []
+                    for temp, pwr, ts in chunk:
+                        params.extend((fridge_id, ts, temp, pwr))
+                    
+                    try:
+                        cursor.execute(query, params)
+                    except Error:
+                        self.discard_shared_cursor(conn)
+                        raise
+                    
+                    # lastrowid di un INSERT multi-riga è l'ID della prima riga
+                    first_id = cursor.lastrowid
+                    measurement_ids.extend(range(first_id, first_id + cursor.rowcount))
                 
-                # Recupera gli ID inseriti (lastrowid per batch è l'ID del primo record)
-                first_id = cursor.lastrowid
-                count = cursor.rowcount
-                measurement_ids = list(range(first_id, first_id + count))
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
                 
-                conn.commit()
-                cursor.close()
-                
-                print(f"[FridgeDatabase] Batch inserted {count} measurements for fridge {fridge_id}")
+                logger.info("Batch inserted %d measurements for fridge %s", len(measurement_ids), fridge_id)
                 return measurement_ids
                 
         except Error as e:
             # Gestisci errori trigger validazione
             if e.sqlstate == '45000':
-                print(f"[FridgeDatabase] Validation error in batch: {e.msg}")
+                logger.warning(f"Validation error in batch: {e.msg}")
                 return None
             else:
-                print(f"[FridgeDatabase] Database error in batch: {e}")
+                logger.error(f"Database error in batch: {e}")
                 return None
     
+    def insert_measurements_executemany(self, fridge_id: int,
+                                        rows: List[Tuple[float, float, Optional[datetime]]]) -> bool:
+        """
+        Variante di insert_measurements_bulk basata su cursor.executemany
+        (il connector riscrive gli INSERT in multi-riga). Un solo commit.
+        
+        Args:
+            fridge_id: ID del frigo
+            rows: Lista di tuple (temperatura, potenza, timestamp); timestamp None = NOW()
+        
+        Returns:
+            bool: True se inserimento riuscito
+        """
+        if not rows:
+            return True
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = self.shared_cursor(conn)
+                try:
+                    cursor.executemany(_SQL_INSERT_MEASUREMENT_MANY, [(fridge_id, ts, temp, pwr) for temp, pwr, ts in rows])
+                except Error:
+                    self.discard_shared_cursor(conn)
+                    raise
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
+                return True
+        except Error as e:
+            logger.error(f"Database error in executemany batch: {e}")
+            return False
+    
+    def bulk_load_measurements(self, fridge_id: int, csv_path: str) -> Optional[int]:
+        """
+        Carica misurazioni da file CSV con LOAD DATA LOCAL INFILE: per grandi
+        recuperi di storico (es. buffer locale accumulato durante un'interruzione
+        di rete) è molto più veloce degli INSERT multi-riga.
+        Il file ha righe "timestamp,temperature,power" senza intestazione,
+        terminate da \n (csv.writer(f, lineterminator='\n')).
+        
+        Usa una connessione dedicata fuori dal pool, con LOCAL INFILE consentito
+        solo per la cartella del file: le connessioni normali restano senza.
+        Richiede local_infile abilitato sul server MySQL.
+        
+        Args:
+            fridge_id: ID del frigo
+            csv_path: Percorso del file CSV
+        
+        Returns:
+            int: Numero di righe caricate, None se errore
+        """
+        path = os.path.abspath(csv_path)
+        config = DatabaseConfig.get_config()
+        config.update(allow_local_infile=False,
+                      allow_local_infile_in_path=os.path.dirname(path))
+        
+        conn = None
+        try:
+            conn = mysql.connector.connect(**config)
+            cursor = conn.cursor()
+            cursor.execute(_SQL_LOAD_MEASUREMENTS, (path, fridge_id))
+            loaded = cursor.rowcount
+            cursor.close()
+            # Con autocommit LOAD DATA è già confermato
+            if conn.in_transaction:
+                conn.commit()
+        except Error as e:
+            logger.error(f"Error bulk loading measurements from {path}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Error:
+                    pass
+        
+        self._bump_data_version(fridge_id)
+        logger.info("Bulk loaded %d measurements for fridge %s", loaded, fridge_id)
+        return loaded
+    
+    # ========================================
+    # SCRITTURE ASINCRONE (coda + flusher)
+    # ========================================
+    
+    def enqueue_measurement(self, fridge_id: int, temperature: float, power: float,
+                            timestamp: Optional[datetime] = None) -> bool:
+        """
+        Accoda una misurazione senza attendere il database.
+        Un thread flusher la scrive in blocco insieme alle altre in attesa
+        (un INSERT multi-riga e un commit per batch).
+        
+        Args:
+            fridge_id: ID del frigo
+            temperature: Temperatura in °C
+            power: Potenza in Watt
+            timestamp: Timestamp lettura (default: NOW() del database alla scrittura del batch)
+        
+        Returns:
+            bool: True se accodata, False se la coda è piena
+        """
+        self._ensure_flusher()
+        try:
+            # None passa fino all'INSERT: COALESCE(%s, NOW()) usa l'orologio del database
+            self._write_queue.put_nowait((fridge_id, temperature, power, timestamp))
+            return True
+        except queue.Full:
+            logger.warning("Write queue full, measurement dropped for fridge %s", fridge_id)
+            return False
+    
+    def flush(self):
+        """Attende che tutte le misurazioni accodate siano state scritte."""
+        if self._flusher is not None:
+            self._write_queue.join()
+    
+    def insert_measurement_async(self, fridge_id: int, temperature: float, power: float,
+                                 timestamp: Optional[datetime] = None) -> Future:
+        """
+        Come insert_measurement ma non blocca il chiamante: l'insert gira su un
+        executor di scrittura e più insert si sovrappongono su connessioni diverse
+        del pool. A differenza di enqueue_measurement il Future restituisce l'ID.
+        
+        Args:
+            fridge_id: ID del frigo
+            temperature: Temperatura in °C
+            power: Potenza in Watt
+            timestamp: Timestamp lettura (default: NOW() del database)
+        
+        Returns:
+            Future: Risolto con l'ID della misurazione (None se errore)
+        """
+        # Senza timestamp insert_measurement usa NOW() del database, come la variante sincrona
+        return self._get_write_executor().submit(
+            self.insert_measurement, fridge_id, temperature, power, timestamp)
+    
+    def _get_write_executor(self) -> ThreadPoolExecutor:
+        """Executor delle scritture asincrone, creato al primo uso."""
+        if self._write_executor is None:
+            with self._flusher_lock:
+                if self._write_executor is None:
+                    self._write_executor = ThreadPoolExecutor(max_workers=WRITE_EXECUTOR_WORKERS,
+                                                              thread_name_prefix="FridgeDatabaseWriter")
+                    atexit.register(self.shutdown)
+        return self._write_executor
+    
+    def shutdown(self):
+        """Scrive le misurazioni in coda/in volo e ferma flusher ed executor di scrittura."""
+        with self._flusher_lock:
+            flusher, self._flusher = self._flusher, None
+            executor, self._write_executor = self._write_executor, None
+        if flusher is not None:
+            self._flusher_stop.set()
+            flusher.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    def _ensure_flusher(self):
+        """Avvia il thread flusher se non è già attivo."""
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher_stop.clear()
+                self._flusher = threading.Thread(target=self._flusher_loop,
+                                                 name="FridgeDatabaseFlusher", daemon=True)
+                self._flusher.start()
+                atexit.register(self.shutdown)
+    
+    def _flusher_loop(self):
+        """
+        Svuota la coda a blocchi finché non viene richiesto lo stop (e la coda è vuota).
+        Un batch parte quando raggiunge WRITE_BATCH_MAX_SIZE misurazioni oppure
+        WRITE_FLUSH_INTERVAL secondi dopo la prima: con un flusso lento di campioni
+        molte misurazioni condividono un solo round-trip invece di uno ciascuna.
+        """
+        # Connessione dedicata per tutta la vita del flusher (niente checkout dal pool per batch)
+        with self.writer_connection():
+            while not (self._flusher_stop.is_set() and self._write_queue.empty()):
+                try:
+                    batch = [self._write_queue.get(timeout=WRITE_FLUSH_INTERVAL)]
+                except queue.Empty:
+                    continue
+            
+                deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+                while len(batch) < WRITE_BATCH_MAX_SIZE:
+                    # In chiusura non si attende: si scrive solo ciò che è già in coda
+                    remaining = 0 if self._flusher_stop.is_set() else deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            batch.append(self._write_queue.get(timeout=remaining))
+                        else:
+                            batch.append(self._write_queue.get_nowait())
+                    except queue.Empty:
+                        break
+            
+                try:
+                    self._write_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._write_queue.task_done()
+    
+    def _write_batch(self, batch: List[Tuple[int, float, float, datetime]]):
+        """Scrive un blocco di misurazioni raggruppandole per frigo."""
+        rows_by_fridge: Dict[int, List[Tuple[float, float, datetime]]] = {}
+        for fridge_id, temperature, power, timestamp in batch:
+            rows_by_fridge.setdefault(fridge_id, []).append((temperature, power, timestamp))
+        
+        for fridge_id, rows in rows_by_fridge.items():
+            if self.insert_measurements_bulk(fridge_id, rows) is None:
+                logger.error("Async write failed: %d measurements lost for fridge %s", len(rows), fridge_id)
+    
+    def _iter_rows(self, query: str, params: tuple, batch: int) -> Iterator[List[Dict]]:
+        """
+        Esegue una SELECT con cursore non bufferizzato e ne restituisce le righe
+        a blocchi: in memoria resta un solo blocco invece dell'intero result set
+        
+        Raises:
+            Error: Errori del database (la connessione resta occupata fino
+                   all'esaurimento o alla chiusura del generatore)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            try:
+                cursor.execute(query, params)
+                while rows := cursor.fetchmany(batch):
+                    yield rows
+            finally:
+                # Generatore chiuso a metà: scarta le righe non lette prima di
+                # restituire la connessione al pool
+                if conn.unread_result:
+                    conn.consume_results()
+                cursor.close()
+    
+    def iter_measurements(self, fridge_id: int, hours: int = 48,
+                          batch: int = HISTORY_FETCH_BATCH_SIZE) -> Iterator[List[Dict]]:
+        """
+        Itera lo storico misurazioni a blocchi, con cursore non bufferizzato
+        
+        Args:
+            fridge_id: ID del frigo
+            hours: Numero di ore di storico da recuperare
+            batch: Righe per blocco (fetchmany)
+        
+        Yields:
+            List[Dict]: Blocco di misurazioni con 'timestamp', 'temperature', 'power'
+        """
+        hours = _window_hours(hours, MEASUREMENTS_RETENTION_HOURS)
+        return self._iter_rows(_SQL_MEASUREMENTS_HISTORY, (fridge_id, hours), batch)
+    
     def get_measurements_history(self, fridge_id: int, hours: int = 48) -> List[Dict]:
         """
         Recupera storico misurazioni
@@ -150,23 +807,79 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             List[Dict]: Lista di misurazioni con 'timestamp', 'temperature', 'power'
         """
+        try:
+            return list(itertools.chain.from_iterable(self.iter_measurements(fridge_id, hours)))
+        except Error as e:
+            logger.error(f"Error fetching measurements: {e}")
+            return []
+    
+    def get_measurements_arrays(self, fridge_id: int,
+                                hours: int = 48) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Recupera storico misurazioni in formato colonnare (SoA): tre array NumPy
+        invece di un dict per riga, per grafici e statistiche vettorizzate
+        
+        Args:
+            fridge_id: ID del frigo
+            hours: Numero di ore di storico da recuperare
+        
+        Returns:
+            Tuple: (timestamp datetime64[s], temperature float32, power float32);
+                   valori NULL diventano NaN, array vuoti in caso di errore
+        """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
+                cursor = conn.cursor()
+                # CAST a FLOAT (4 byte): il driver decodifica float nativi invece di
+                # oggetti Decimal, che verrebbero comunque ridotti a float32
                 query = """
-                    SELECT timestamp, temperature, power
+                    SELECT timestamp, CAST(temperature AS FLOAT), CAST(power AS FLOAT)
                     FROM Measurements
                     WHERE fridge_ID = %s
                       AND timestamp >= NOW() - INTERVAL %s HOUR
                     ORDER BY timestamp ASC
                 """
-                cursor.execute(query, (fridge_id, hours))
-                results = cursor.fetchall()
+                cursor.execute(query, (fridge_id, _window_hours(hours, MEASUREMENTS_RETENTION_HOURS)))
+                rows = cursor.fetchall()
                 cursor.close()
-                return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching measurements: {e}")
-            return []
+            logger.error(f"Error fetching measurements: {e}")
+            rows = []
+        
+        n = len(rows)
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+        temperatures = np.fromiter((np.nan if row[1] is None else row[1] for row in rows),
+                                   dtype=np.float32, count=n)
+        powers = np.fromiter((np.nan if row[2] is None else row[2] for row in rows),
+                             dtype=np.float32, count=n)
+        return timestamps, temperatures, powers
+    
+    def get_measurement_statistics(self, fridge_id: int, hours: int = 48) -> Dict[str, Dict]:
+        """
+        Calcola statistiche di temperatura e consumo con una sola query.
+        Le ore complete vengono lette dal rollup Measurements_Hourly (una riga
+        per ora); solo la frazione d'ora iniziale del periodo scansiona Measurements.
+        
+        Args:
+            fridge_id: ID del frigo
+            hours: Numero di ore di storico
+        
+        Returns:
+            Dict: {'temperature': {count, average, min, max}, 'power': {count, average, min, max}}
+        """
+        # Niente limite di retention: le ore complete vengono dal rollup, che non viene ripulito
+        return self._measurement_statistics(fridge_id, _window_hours(hours))
+    
+    @ttl_cache(Config.DB_READ_CACHE_TTL_SECONDS, functools.partial(_stats_from_row, None),
+               "Error getting measurement stats")
+    def _measurement_statistics(self, fridge_id: int, hours: int) -> Dict[str, Dict]:
+        """Query statistiche con finestra già normalizzata (chiave della cache TTL)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_MEASUREMENT_STATS, (fridge_id, hours, fridge_id, hours, hours))
+            row = cursor.fetchone()
+            cursor.close()
+            return _stats_from_row(row)
     
     def get_temperature_statistics(self, fridge_id: int, hours: int = 48) -> Dict:
         """
@@ -179,34 +892,7 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             Dict: Statistiche (count, average, min, max)
         """
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                query = """
-                    SELECT 
-                        COUNT(*) as count,
-                        AVG(temperature) as average,
-                        MIN(temperature) as min_value,
-                        MAX(temperature) as max_value
-                    FROM Measurements
-                    WHERE fridge_ID = %s
-                      AND timestamp >= NOW() - INTERVAL %s HOUR
-                """
-                cursor.execute(query, (fridge_id, hours))
-                row = cursor.fetchone()
-                cursor.close()
-                
-                if row:
-                    return {
-                        'count': row[0] or 0,
-                        'average': float(row[1]) if row[1] else 0.0,
-                        'min': float(row[2]) if row[2] else 0.0,
-                        'max': float(row[3]) if row[3] else 0.0
-                    }
-                return {'count': 0, 'average': 0.0, 'min': 0.0, 'max': 0.0}
-        except Error as e:
-            print(f"[FridgeDatabase] Error getting temperature stats: {e}")
-            return {'count': 0, 'average': 0.0, 'min': 0.0, 'max': 0.0}
+        return self.get_measurement_statistics(fridge_id, hours)['temperature']
     
     def get_power_statistics(self, fridge_id: int, hours: int = 48) -> Dict:
         """
@@ -219,34 +905,7 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             Dict: Statistiche (count, average, min, max)
         """
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                query = """
-                    SELECT 
-                        COUNT(*) as count,
-                        AVG(power) as average,
-                        MIN(power) as min_value,
-                        MAX(power) as max_value
-                    FROM Measurements
-                    WHERE fridge_ID = %s
-                      AND timestamp >= NOW() - INTERVAL %s HOUR
-                """
-                cursor.execute(query, (fridge_id, hours))
-                row = cursor.fetchone()
-                cursor.close()
-                
-                if row:
-                    return {
-                        'count': row[0] or 0,
-                        'average': float(row[1]) if row[1] else 0.0,
-                        'min': float(row[2]) if row[2] else 0.0,
-                        'max': float(row[3]) if row[3] else 0.0
-                    }
-                return {'count': 0, 'average': 0.0, 'min': 0.0, 'max': 0.0}
-        except Error as e:
-            print(f"[FridgeDatabase] Error getting power stats: {e}")
-            return {'count': 0, 'average': 0.0, 'min': 0.0, 'max': 0.0}
+        return self.get_measurement_statistics(fridge_id, hours)['power']
     
     # ========================================
     # ALERTS
@@ -268,29 +927,55 @@ class FridgeDatabase(DatabaseConnection):
         """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
                 if timestamp is None:
-                    query = """
-                        INSERT INTO Alerts (fridge_ID, timestamp, category, message)
-                        VALUES (%s, NOW(), %s, %s)
-                    """
-                    cursor.execute(query, (fridge_id, category, message))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_ALERT_NOW,
+                                                   (fridge_id, category, message))
                 else:
-                    query = """
-                        INSERT INTO Alerts (fridge_ID, timestamp, category, message)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (fridge_id, timestamp, category, message))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_ALERT_TS,
+                                                   (fridge_id, timestamp, category, message))
                 
                 alert_id = cursor.lastrowid
-                conn.commit()
-                cursor.close()
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
                 return alert_id
         except Error as e:
-            print(f"[FridgeDatabase] Error inserting alert: {e}")
+            logger.error(f"Error inserting alert: {e}")
             return None
     
+    def insert_alerts(self, fridge_id: int,
+                      alerts: List[Tuple[str, str, Optional[datetime]]]) -> bool:
+        """
+        Inserisce una raffica di allarmi (porta, picchi di temperatura, ...)
+        con un solo executemany (riscritto dal connector in INSERT multi-riga,
+        un solo pacchetto) e un solo commit, invece di insert_alert in loop
+        
+        Args:
+            fridge_id: ID del frigo
+            alerts: Lista di tuple (categoria, messaggio, timestamp); timestamp None = NOW()
+        
+        Returns:
+            bool: True se inserimento riuscito
+        """
+        if not alerts:
+            return True
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = self.shared_cursor(conn)
+                try:
+                    cursor.executemany(_SQL_INSERT_ALERT_MANY,
+                                       [(fridge_id, ts, category, message) for category, message, ts in alerts])
+                except Error:
+                    self.discard_shared_cursor(conn)
+                    raise
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
+                return True
+        except Error as e:
+            logger.error(f"Error inserting alerts: {e}")
+            return False
+    
+    @ttl_cache(Config.DB_READ_CACHE_TTL_SECONDS, list, "Error fetching alerts")
     def get_recent_alerts(self, fridge_id: int, hours: int = 24, category: Optional[str] = None) -> List[Dict]:
         """
         Recupera allarmi recenti
@@ -303,37 +988,14 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             List[Dict]: Lista allarmi
         """
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                
-                if category:
-                    query = """
-                        SELECT ID, timestamp, category, message
-                        FROM Alerts
-                        WHERE fridge_ID = %s
-                          AND category = %s
-                          AND timestamp >= NOW() - INTERVAL %s HOUR
-                        ORDER BY timestamp DESC
-                    """
-                    cursor.execute(query, (fridge_id, category, hours))
-                else:
-                    query = """
-                        SELECT ID, timestamp, category, message
-                        FROM Alerts
-                        WHERE fridge_ID = %s
-                          AND timestamp >= NOW() - INTERVAL %s HOUR
-                        ORDER BY timestamp DESC
-                    """
-                    cursor.execute(query, (fridge_id, hours))
-                
-                results = cursor.fetchall()
-                cursor.close()
-                return results
-        except Error as e:
-            print(f"[FridgeDatabase] Error fetching alerts: {e}")
-            return []
+        hours = _window_hours(hours, ALERTS_RETENTION_HOURS)
+        with self.get_connection() as conn:
+            if category:
+                return self.fetch_prepared(conn, _SQL_RECENT_ALERTS_BY_CATEGORY, (fridge_id, category, hours))
+            else:
+                return self.fetch_prepared(conn, _SQL_RECENT_ALERTS, (fridge_id, hours))
     
+    @ttl_cache(Config.DB_READ_CACHE_TTL_SECONDS, list, "Error fetching critical alerts")
     def get_critical_alerts(self, fridge_id: int, hours: int = 24) -> List[Dict]:
         """
         Recupera alert critici (critic_temp, critic_power, door_left_open, sensor_offline, low_temp)
@@ -346,39 +1008,71 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             List[Dict]: Alert critici
         """
+        hours = _window_hours(hours, ALERTS_RETENTION_HOURS)
+        with self.get_connection() as conn:
+            return self.fetch_prepared(conn, _SQL_CRITICAL_ALERTS, (fridge_id, hours))
+    
+    def get_alerts_bulk(self, fridge_id: int, categories: List[str],
+                        hours: int = 24) -> Dict[str, List[Dict]]:
+        """
+        Recupera gli allarmi recenti di più categorie con una sola query
+        (un unico range scan su idx_category invece di una query per categoria)
+        
+        Args:
+            fridge_id: ID del frigo
+            categories: Categorie da recuperare
+            hours: Numero di ore di storico
+        
+        Returns:
+            Dict[str, List[Dict]]: Allarmi per categoria (lista vuota se nessuno)
+        """
+        categories = sorted(set(categories))
+        alerts: Dict[str, List[Dict]] = {category: [] for category in categories}
+        if not categories:
+            return alerts
+        
+        hours = _window_hours(hours, ALERTS_RETENTION_HOURS)
+        query = _SQL_ALERTS_BY_CATEGORIES.format(placeholders=', '.join(['%s'] * len(categories)))
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                query = """
-                    SELECT ID, timestamp, category, message
-                    FROM Alerts
-                    WHERE fridge_ID = %s
-                      AND category IN ('critic_temp', 'critic_power', 'door_left_open', 'sensor_offline', 'low_temp')
-                      AND timestamp >= NOW() - INTERVAL %s HOUR
-                    ORDER BY timestamp DESC
-                """
-                cursor.execute(query, (fridge_id, hours))
-                results = cursor.fetchall()
-                cursor.close()
-                return results
+                rows = self.fetch_prepared(conn, query, (fridge_id, *categories, hours))
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching critical alerts: {e}")
-            return []
+            logger.error(f"Error fetching alerts by category: {e}")
+            return alerts
+        
+        for row in rows:
+            alerts.setdefault(row['category'], []).append(row)
+        return alerts
     
     def insert_door_event(self, fridge_id: int, is_open: bool) -> Optional[int]:
         """
-        Inserisce evento porta (aperta/chiusa)
+        Inserisce evento porta (aperta/chiusa).
+        Se lo stato è uguale all'ultimo evento porta registrato per il frigo
+        (rimbalzi del sensore, invii ripetuti) l'INSERT non scrive nulla.
         
         Args:
             fridge_id: ID del frigo
             is_open: True = porta aperta, False = porta chiusa
         
         Returns:
-            int: ID alert inserito
+            int: ID alert inserito, DOOR_EVENT_DUPLICATE se evento duplicato, None se errore
         """
         category = 'door_open' if is_open else 'door_closed'
         message = 'Porta aperta' if is_open else 'Porta chiusa'
-        return self.insert_alert(fridge_id, category, message)
+        try:
+            with self.get_connection() as conn:
+                cursor = self.execute_prepared(conn, _SQL_INSERT_DOOR_EVENT,
+                                               (fridge_id, category, message, fridge_id, category))
+                if cursor.rowcount == 0:
+                    return DOOR_EVENT_DUPLICATE
+                
+                alert_id = cursor.lastrowid
+                self.commit(conn)
+                self.after_commit(self._bump_data_version, fridge_id)
+                return alert_id
+        except Error as e:
+            logger.error(f"Error inserting door event: {e}")
+            return None
     
     # ========================================
     # PRODUCTS & MOVEMENTS
@@ -401,38 +1095,33 @@ class FridgeDatabase(DatabaseConnection):
         """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
                 if timestamp is None:
-                    query = """
-                        INSERT INTO ProductsMovements (fridge_ID, product_ID, quantity, timestamp)
-                        VALUES (%s, %s, %s, NOW())
-                    """
-                    cursor.execute(query, (fridge_id, product_id, quantity))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_MOVEMENT_NOW,
+                                                   (fridge_id, product_id, quantity))
                 else:
-                    query = """
-                        INSERT INTO ProductsMovements (fridge_ID, product_ID, quantity, timestamp)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (fridge_id, product_id, quantity, timestamp))
+                    cursor = self.execute_prepared(conn, _SQL_INSERT_MOVEMENT_TS,
+                                                   (fridge_id, product_id, quantity, timestamp))
                 
                 movement_id = cursor.lastrowid
-                conn.commit()
-                cursor.close()
+                self.commit(conn)
+                # Invalida la cache dei prodotti correnti (ProductsFridge aggiornata dal trigger)
+                self.after_commit(self._bump_data_version, fridge_id)
                 return movement_id
         except Error as e:
             # Gestisci errore trigger quantità insufficiente
             if e.sqlstate == '45000':
-                print(f"[FridgeDatabase] Movement validation error: {e.msg}")
+                logger.warning(f"Movement validation error: {e.msg}")
                 # Probabilmente quantità insufficiente
                 return None
             else:
-                print(f"[FridgeDatabase] Database error: {e}")
+                logger.error(f"Database error: {e}")
                 return None
     
+    @ttl_cache(Config.DB_READ_CACHE_TTL_SECONDS, list, "Error fetching products")
     def get_current_products(self, fridge_id: int) -> List[Dict]:
         """
-        Recupera prodotti attualmente nel frigo (removed_in IS NULL)
+        Recupera prodotti attualmente nel frigo (tabella CurrentProducts,
+        mantenuta dal trigger sui movimenti: nessuna JOIN a runtime)
         
         Args:
             fridge_id: ID del frigo
@@ -440,31 +1129,8 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             List[Dict]: Lista prodotti con nome, brand, quantità
         """
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                query = """
-                    SELECT 
-                        pf.ID as fridge_product_id,
-                        p.ID as product_id,
-                        p.name,
-                        p.brand,
-                        p.category,
-                        pf.quantity,
-                        pf.added_in
-                    FROM ProductsFridge pf
-                    JOIN Products p ON pf.product_ID = p.ID
-                    WHERE pf.fridge_ID = %s
-                      AND pf.removed_in IS NULL
-                    ORDER BY pf.added_in DESC
-                """
-                cursor.execute(query, (fridge_id,))
-                results = cursor.fetchall()
-                cursor.close()
-                return results
-        except Error as e:
-            print(f"[FridgeDatabase] Error fetching products: {e}")
-            return []
+        with self.get_connection() as conn:
+            return self.fetch_prepared(conn, _SQL_CURRENT_PRODUCTS, (fridge_id,))
     
     def get_latest_measurement(self, fridge_id: int) -> Optional[Dict]:
         """
@@ -478,22 +1144,27 @@ class FridgeDatabase(DatabaseConnection):
         """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                query = """
-                    SELECT timestamp, temperature, power
-                    FROM Measurements
-                    WHERE fridge_ID = %s
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                """
-                cursor.execute(query, (fridge_id,))
-                result = cursor.fetchone()
-                cursor.close()
-                return result
+                rows = self.fetch_prepared(conn, _SQL_LATEST_MEASUREMENT, (fridge_id,))
+                return rows[0] if rows else None
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching latest measurement: {e}")
+            logger.error(f"Error fetching latest measurement: {e}")
             return None
     
+    def iter_product_movements(self, fridge_id: int, hours: int = 168,
+                               batch: int = HISTORY_FETCH_BATCH_SIZE) -> Iterator[List[Dict]]:
+        """
+        Itera lo storico movimenti prodotti a blocchi, con cursore non bufferizzato
+        
+        Args:
+            fridge_id: ID del frigo
+            hours: Numero di ore di storico (default: 168 = 7 giorni)
+            batch: Righe per blocco (fetchmany)
+        
+        Yields:
+            List[Dict]: Blocco di movimenti con dettagli prodotto
+        """
+        return self._iter_rows(_SQL_PRODUCT_MOVEMENTS, (fridge_id, hours), batch)
+    
     def get_product_movements_history(self, fridge_id: int, hours: int = 168) -> List[Dict]:
         """
         Recupera storico movimenti prodotti (ultima settimana default)
@@ -506,33 +1177,21 @@ class FridgeDatabase(DatabaseConnection):
             List[Dict]: Lista movimenti con dettagli prodotto
         """
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                query = """
-                    SELECT 
-                        pm.ID,
-                        pm.timestamp,
-                        pm.quantity,
-                        p.name,
-                        p.brand,
-                        p.category
-                    FROM ProductsMovements pm
-                    JOIN Products p ON pm.product_ID = p.ID
-                    WHERE pm.fridge_ID = %s
-                      AND pm.timestamp >= NOW() - INTERVAL %s HOUR
-                    ORDER BY pm.timestamp DESC
-                """
-                cursor.execute(query, (fridge_id, hours))
-                results = cursor.fetchall()
-                cursor.close()
-                return results
+            return list(itertools.chain.from_iterable(
+                self.iter_product_movements(fridge_id, hours)))
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching movements: {e}")
+            logger.error(f"Error fetching movements: {e}")
             return []
     
     def get_product_by_name(self, name: str) -> Optional[Dict]:
         """
-        Cerca prodotto per nome (per YOLO detection)
+        Cerca prodotto per nome (per YOLO detection).
+        Prima il nome esatto (seek su idx_product_name), poi l'indice FULLTEXT
+        in BOOLEAN MODE (tutte le parole, anche come prefisso: "+latte* +intero*");
+        il LIKE '%nome%' (scansione completa) resta come ripiego se il FULLTEXT
+        non trova nulla o l'indice non esiste. Solo le corrispondenze esatte
+        restano in una cache LRU: un risultato approssimato non deve nascondere
+        un prodotto con quel nome aggiunto in seguito.
         
         Args:
             name: Nome prodotto
@@ -540,22 +1199,38 @@ class FridgeDatabase(DatabaseConnection):
         Returns:
             Dict: Dati prodotto o None
         """
+        key = name.strip().lower()
+        with self._product_cache_lock:
+            product = self._product_cache.get(key)
+            if product is not None:
+                self._product_cache.move_to_end(key)
+                return product
+        
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                query = """
-                    SELECT ID, name, brand, category
-                    FROM Products
-                    WHERE name LIKE %s
-                    LIMIT 1
-                """
-                cursor.execute(query, (f"%{name}%",))
-                result = cursor.fetchone()
-                cursor.close()
-                return result
+                rows = self.fetch_prepared(conn, _SQL_PRODUCT_BY_EXACT_NAME, (name,))
+                if rows:
+                    product = rows[0]
+                    with self._product_cache_lock:
+                        self._product_cache[key] = product
+                        if len(self._product_cache) > PRODUCT_CACHE_SIZE:
+                            self._product_cache.popitem(last=False)
+                    return product
+                
+                terms = _fulltext_terms(name)
+                if terms:
+                    try:
+                        rows = self.fetch_prepared(conn, _SQL_PRODUCT_BY_NAME_FULLTEXT, (terms, terms))
+                    except Error as e:
+                        if e.errno != errorcode.ER_FT_MATCHING_KEY_NOT_FOUND:
+                            raise
+                if not rows:
+                    rows = self.fetch_prepared(conn, _SQL_PRODUCT_BY_NAME, (f"%{_escape_like(name.strip())}%",))
         except Error as e:
-            print(f"[FridgeDatabase] Error finding product: {e}")
+            logger.error(f"Error finding product: {e}")
             return None
+        
+        return rows[0] if rows else None
     
     # ========================================
     # ADVANCED ANALYTICS
@@ -605,7 +1280,7 @@ class FridgeDatabase(DatabaseConnection):
                 
                 return round(total_kwh, 3)
         except Error as e:
-            print(f"[FridgeDatabase] Error calculating energy consumption: {e}")
+            logger.error(f"Error calculating energy consumption: {e}")
             return 0.0
     
     def calculate_energy_cost(self, fridge_id: int, hours: int = 24, cost_per_kwh: float = 0.25) -> float:
@@ -679,7 +1354,7 @@ class FridgeDatabase(DatabaseConnection):
                 else:
                     return 'stable'
         except Error as e:
-            print(f"[FridgeDatabase] Error calculating temperature trend: {e}")
+            logger.error(f"Error calculating temperature trend: {e}")
             return 'stable'
     
     def get_door_open_statistics(self, fridge_id: int, hours: int = 24) -> Dict:
@@ -750,7 +1425,7 @@ class FridgeDatabase(DatabaseConnection):
                     'total_open_seconds': round(sum(openings), 2)
                 }
         except Error as e:
-            print(f"[FridgeDatabase] Error calculating door statistics: {e}")
+            logger.error(f"Error calculating door statistics: {e}")
             return {
                 'total_openings': 0,
                 'avg_open_seconds': 0.0,
@@ -803,7 +1478,7 @@ class FridgeDatabase(DatabaseConnection):
                 
                 return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching hourly averages: {e}")
+            logger.error(f"Error fetching hourly averages: {e}")
             return []
     
     def get_products_by_category_stats(self, fridge_id: int) -> List[Dict]:
@@ -840,7 +1515,7 @@ class FridgeDatabase(DatabaseConnection):
                 cursor.close()
                 return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching product category stats: {e}")
+            logger.error(f"Error fetching product category stats: {e}")
             return []
     
     def get_most_consumed_products(self, fridge_id: int, limit: int = 10, days: int = 30) -> List[Dict]:
@@ -885,7 +1560,7 @@ class FridgeDatabase(DatabaseConnection):
                 cursor.close()
                 return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching most consumed products: {e}")
+            logger.error(f"Error fetching most consumed products: {e}")
             return []
     
     def get_shopping_list(self, fridge_id: int, hours: int = 48) -> List[Dict]:
@@ -927,7 +1602,7 @@ class FridgeDatabase(DatabaseConnection):
                 cursor.close()
                 return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching shopping list: {e}")
+            logger.error(f"Error fetching shopping list: {e}")
             return []
     
     def get_alert_statistics(self, fridge_id: int, days: int = 7) -> List[Dict]:
@@ -964,5 +1639,5 @@ class FridgeDatabase(DatabaseConnection):
                 cursor.close()
                 return results
         except Error as e:
-            print(f"[FridgeDatabase] Error fetching alert statistics: {e}")
+            logger.error(f"Error fetching alert statistics: {e}")
             return []
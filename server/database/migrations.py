@@ -0,0 +1,238 @@
+"""
+Migrazioni schema database
+Portano un database già in uso allo schema di SmartFridge.sql (indici, tabelle
+derivate, trigger). Ogni passo è idempotente: si può rieseguire senza effetti.
+Eseguite a mano con `python migrate.py`, mai all'import del server.
+"""
+
+from mysql.connector import Error
+from .fridge_db import FridgeDatabase
+from utils.logger import get_logger
+
+logger = get_logger('database.migrations')
+
+
+# Rollup orario di Measurements (letto dalle statistiche su finestre lunghe)
+_SQL_CREATE_MEASUREMENTS_HOURLY = """
+CREATE TABLE IF NOT EXISTS Measurements_Hourly (
+    fridge_ID int UNSIGNED NOT NULL,
+    hour_bucket datetime NOT NULL COMMENT 'inizio ora',
+    sample_count int UNSIGNED NOT NULL DEFAULT '0',
+    sum_t decimal(12,1) NOT NULL DEFAULT '0.0',
+    min_t decimal(3,1) NOT NULL,
+    max_t decimal(3,1) NOT NULL,
+    sum_p decimal(14,2) NOT NULL DEFAULT '0.00',
+    min_p decimal(7,2) NOT NULL,
+    max_p decimal(7,2) NOT NULL,
+    PRIMARY KEY (fridge_ID, hour_bucket),
+    CONSTRAINT fk_measurements_hourly_fridge FOREIGN KEY (fridge_ID)
+        REFERENCES Fridges (ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+"""
+
+_SQL_CREATE_ROLLUP_TRIGGER = """
+CREATE TRIGGER rollup_hourly_measurements AFTER INSERT ON Measurements FOR EACH ROW BEGIN
+    INSERT INTO Measurements_Hourly (fridge_ID, hour_bucket, sample_count,
+                                     sum_t, min_t, max_t, sum_p, min_p, max_p)
+    VALUES (NEW.fridge_ID, DATE_FORMAT(NEW.timestamp, '%Y-%m-%d %H:00:00'), 1,
+            NEW.temperature, NEW.temperature, NEW.temperature,
+            NEW.power, NEW.power, NEW.power)
+    ON DUPLICATE KEY UPDATE
+        sample_count = sample_count + 1,
+        sum_t = sum_t + NEW.temperature,
+        min_t = LEAST(min_t, NEW.temperature),
+        max_t = GREATEST(max_t, NEW.temperature),
+        sum_p = sum_p + NEW.power,
+        min_p = LEAST(min_p, NEW.power),
+        max_p = GREATEST(max_p, NEW.power);
+END
+"""
+
+# Ricalcola i bucket dalle misurazioni presenti (sovrascrive, non somma):
+# rieseguibile, e corregge anche le righe perse tra DROP e CREATE del trigger
+_SQL_BACKFILL_MEASUREMENTS_HOURLY = """
+INSERT INTO Measurements_Hourly (fridge_ID, hour_bucket, sample_count,
+                                 sum_t, min_t, max_t, sum_p, min_p, max_p)
+SELECT * FROM (
+    SELECT fridge_ID, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00') AS hour_bucket,
+           COUNT(*) AS sample_count,
+           SUM(temperature) AS sum_t, MIN(temperature) AS min_t, MAX(temperature) AS max_t,
+           SUM(power) AS sum_p, MIN(power) AS min_p, MAX(power) AS max_p
+    FROM Measurements
+    GROUP BY fridge_ID, DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00')
+) AS m
+ON DUPLICATE KEY UPDATE
+    sample_count = m.sample_count,
+    sum_t = m.sum_t, min_t = m.min_t, max_t = m.max_t,
+    sum_p = m.sum_p, min_p = m.min_p, max_p = m.max_p
+"""
+
+
+def _migrate_measurements_hourly(db: FridgeDatabase) -> bool:
+    """
+    Crea Measurements_Hourly, (ri)crea il trigger che la aggiorna ad ogni
+    INSERT su Measurements e ricalcola il rollup dai dati esistenti.
+    Il trigger viene creato prima del ricalcolo: le misurazioni inserite nel
+    frattempo finiscono comunque nel rollup.
+
+    Returns:
+        bool: True se la migrazione è riuscita
+    """
+    try:
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_CREATE_MEASUREMENTS_HOURLY)
+            cursor.execute("DROP TRIGGER IF EXISTS rollup_hourly_measurements")
+            cursor.execute(_SQL_CREATE_ROLLUP_TRIGGER)
+            cursor.execute(_SQL_BACKFILL_MEASUREMENTS_HOURLY)
+            conn.commit()
+            cursor.close()
+        logger.info("Measurements_Hourly rollup ready")
+        return True
+    except Error as e:
+        logger.error(f"Error migrating Measurements_Hourly: {e}")
+        return False
+
+
+# Prodotti presenti per frigo, già uniti ai dati del prodotto (get_current_products)
+_SQL_CREATE_CURRENT_PRODUCTS = """
+CREATE TABLE IF NOT EXISTS CurrentProducts (
+    fridge_ID int UNSIGNED NOT NULL,
+    product_ID int UNSIGNED NOT NULL,
+    fridge_product_ID int UNSIGNED NOT NULL COMMENT 'ProductsFridge.ID',
+    name varchar(50) NOT NULL,
+    brand varchar(50) DEFAULT NULL,
+    category enum('meat','fish','dairy','vegetables','bread','other') NOT NULL DEFAULT 'other',
+    quantity int UNSIGNED NOT NULL,
+    added_in timestamp NULL DEFAULT NULL,
+    PRIMARY KEY (fridge_ID, product_ID),
+    KEY idx_fridge_added (fridge_ID, added_in DESC),
+    KEY fk_currentproducts_product (product_ID),
+    CONSTRAINT fk_currentproducts_fridge FOREIGN KEY (fridge_ID)
+        REFERENCES Fridges (ID) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT fk_currentproducts_product FOREIGN KEY (product_ID)
+        REFERENCES Products (ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+"""
+
+_SQL_CREATE_SYNC_CURRENT_PRODUCTS_TRIGGER = """
+CREATE TRIGGER sync_current_products AFTER UPDATE ON Products FOR EACH ROW BEGIN
+    UPDATE CurrentProducts
+    SET name = NEW.name, brand = NEW.brand, category = NEW.category
+    WHERE product_ID = NEW.ID;
+END
+"""
+
+_SQL_CREATE_UPDATE_PRODUCT_QUANTITY_TRIGGER = """
+CREATE TRIGGER update_product_quantity AFTER INSERT ON ProductsMovements FOR EACH ROW BEGIN
+    DECLARE v_id INT UNSIGNED;
+    DECLARE v_quantity INT UNSIGNED;
+    DECLARE v_added_in TIMESTAMP;
+    DECLARE v_removed_in TIMESTAMP;
+    INSERT INTO ProductsFridge (fridge_ID, product_ID, quantity, added_in)
+        VALUES (NEW.fridge_ID, NEW.product_ID, NEW.quantity, NEW.timestamp)
+        ON DUPLICATE KEY UPDATE
+            quantity = quantity + NEW.quantity,
+            removed_in = IF(quantity + NEW.quantity = 0, NEW.timestamp, NULL);
+    SELECT ID, quantity, added_in, removed_in
+        INTO v_id, v_quantity, v_added_in, v_removed_in
+        FROM ProductsFridge
+        WHERE fridge_ID = NEW.fridge_ID AND product_ID = NEW.product_ID;
+    IF v_removed_in IS NULL THEN
+        INSERT INTO CurrentProducts (fridge_ID, product_ID, fridge_product_ID, name, brand, category, quantity, added_in)
+            SELECT NEW.fridge_ID, p.ID, v_id, p.name, p.brand, p.category, v_quantity, v_added_in
+            FROM Products p
+            WHERE p.ID = NEW.product_ID
+        ON DUPLICATE KEY UPDATE
+            quantity = v_quantity,
+            added_in = v_added_in;
+    ELSE
+        DELETE FROM CurrentProducts
+        WHERE fridge_ID = NEW.fridge_ID AND product_ID = NEW.product_ID;
+    END IF;
+END
+"""
+
+# Riallinea CurrentProducts a ProductsFridge (sovrascrive e rimuove le righe
+# non più presenti): rieseguibile
+_SQL_BACKFILL_CURRENT_PRODUCTS = """
+INSERT INTO CurrentProducts (fridge_ID, product_ID, fridge_product_ID, name, brand, category, quantity, added_in)
+SELECT * FROM (
+    SELECT pf.fridge_ID, pf.product_ID, pf.ID AS fridge_product_ID,
+           p.name, p.brand, p.category, pf.quantity, pf.added_in
+    FROM ProductsFridge pf
+    JOIN Products p ON pf.product_ID = p.ID
+    WHERE pf.removed_in IS NULL
+) AS c
+ON DUPLICATE KEY UPDATE
+    fridge_product_ID = c.fridge_product_ID,
+    name = c.name, brand = c.brand, category = c.category,
+    quantity = c.quantity, added_in = c.added_in
+"""
+
+_SQL_PRUNE_CURRENT_PRODUCTS = """
+DELETE cp FROM CurrentProducts cp
+LEFT JOIN ProductsFridge pf
+    ON pf.fridge_ID = cp.fridge_ID AND pf.product_ID = cp.product_ID AND pf.removed_in IS NULL
+WHERE pf.ID IS NULL
+"""
+
+
+def _migrate_current_products(db: FridgeDatabase) -> bool:
+    """
+    Crea CurrentProducts, sostituisce i trigger che la mantengono
+    (sync_current_products su Products, update_product_quantity su
+    ProductsMovements) e la riallinea ai prodotti presenti.
+    I trigger sono sostituiti con le tabelle bloccate in scrittura: nessun
+    movimento viene inserito mentre update_product_quantity non esiste.
+
+    Returns:
+        bool: True se la migrazione è riuscita
+    """
+    try:
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_CREATE_CURRENT_PRODUCTS)
+
+            cursor.execute("LOCK TABLES Products WRITE, ProductsMovements WRITE")
+            try:
+                cursor.execute("DROP TRIGGER IF EXISTS sync_current_products")
+                cursor.execute(_SQL_CREATE_SYNC_CURRENT_PRODUCTS_TRIGGER)
+                cursor.execute("DROP TRIGGER IF EXISTS update_product_quantity")
+                cursor.execute(_SQL_CREATE_UPDATE_PRODUCT_QUANTITY_TRIGGER)
+            finally:
+                cursor.execute("UNLOCK TABLES")
+
+            cursor.execute(_SQL_BACKFILL_CURRENT_PRODUCTS)
+            cursor.execute(_SQL_PRUNE_CURRENT_PRODUCTS)
+            conn.commit()
+            cursor.close()
+        logger.info("CurrentProducts ready")
+        return True
+    except Error as e:
+        logger.error(f"Error migrating CurrentProducts: {e}")
+        return False
+
+
+def apply_migrations(db: FridgeDatabase) -> bool:
+    """
+    Applica tutte le migrazioni in ordine.
+
+    Args:
+        db: Istanza FridgeDatabase su cui eseguire il DDL
+
+    Returns:
+        bool: True se tutti i passi sono riusciti
+    """
+    # Indici richiesti dalle query calde
+    if not db.ensure_schema():
+        return False
+
+    if not _migrate_measurements_hourly(db):
+        return False
+
+    if not _migrate_current_products(db):
+        return False
+
+    logger.info("Schema up to date")
+    return True
@@ -74,7 +74,7 @@ class UserDatabase(DatabaseConnection):
                 """
                 cursor.execute(query, (user_id, position))
                 fridge_id = cursor.lastrowid
-                conn.commit()
+                self.commit(conn)
                 cursor.close()
                 
                 logger.info(f"Frigo {fridge_id} creato per user {user_id}, posizione: {position}")
@@ -185,7 +185,7 @@ class UserDatabase(DatabaseConnection):
                     WHERE ID = %s
                 """
                 cursor.execute(query, (position, fridge_id))
-                conn.commit()
+                self.commit(conn)
                 affected = cursor.rowcount
                 cursor.close()
                 
@@ -218,7 +218,7 @@ class UserDatabase(DatabaseConnection):
                 cursor = conn.cursor()
                 query = "DELETE FROM Fridges WHERE ID = %s"
                 cursor.execute(query, (fridge_id,))
-                conn.commit()
+                self.commit(conn)
                 affected = cursor.rowcount
                 cursor.close()
                 
@@ -284,7 +284,7 @@ class UserDatabase(DatabaseConnection):
                 """
                 cursor.execute(query, (email, password_hash))
                 user_id = cursor.lastrowid
-                conn.commit()
+                self.commit(conn)
                 cursor.close()
                 
                 logger.info(f"User {user_id} created with email: {email}")
@@ -363,7 +363,7 @@ class UserDatabase(DatabaseConnection):
                 cursor = conn.cursor()
                 query = "DELETE FROM Users WHERE ID = %s"
                 cursor.execute(query, (user_id,))
-                conn.commit()
+                self.commit(conn)
                 affected = cursor.rowcount
                 cursor.close()
                 
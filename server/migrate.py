@@ -0,0 +1,28 @@
+"""
+Smart Fridge Server - Migrazioni schema
+Applica indici, tabelle derivate e trigger al database configurato in .env.
+Da eseguire dopo ogni aggiornamento, prima di riavviare il server:
+
+    python migrate.py
+"""
+
+import sys
+from database import FridgeDatabase
+from database.migrations import apply_migrations
+from utils.logger import get_logger
+
+logger = get_logger('migrate')
+
+
+def main() -> int:
+    """Entry point: 0 se le migrazioni sono riuscite, 1 altrimenti."""
+    logger.info("Applying schema migrations...")
+    db = FridgeDatabase(use_pool=False)
+    if not apply_migrations(db):
+        logger.error("Schema migrations failed")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
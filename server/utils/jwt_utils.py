@@ -3,6 +3,9 @@ Utility per gestione JWT (generazione e verifica token)
 """
 
 import jwt
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from config import Config
@@ -10,6 +13,13 @@ from utils.logger import get_logger
 
 logger = get_logger('jwt')
 
+# Cache LRU token frigo -> payload già verificato. Il frigo invia lo stesso
+# token ad ogni richiesta: la firma si verifica una volta sola, ai colpi
+# successivi resta solo il controllo di scadenza
+FRIDGE_TOKEN_CACHE_SIZE = 1024
+_fridge_token_cache: OrderedDict = OrderedDict()
+_fridge_token_cache_lock = threading.Lock()
+
 
 def generate_user_token(user_id: int) -> str:
     """
@@ -88,6 +98,16 @@ def decode_fridge_token(token: str, verify_exp: bool = True) -> Optional[Dict]:
         if payload:
             fridge_id = payload['fridge_id']
     """
+    with _fridge_token_cache_lock:
+        payload = _fridge_token_cache.get(token)
+        if payload is not None:
+            if verify_exp and payload.get('exp', 0) <= time.time():
+                del _fridge_token_cache[token]
+                logger.warning("Fridge token expired")
+                return None
+            _fridge_token_cache.move_to_end(token)
+            return dict(payload)
+    
     try:
         options = {"verify_exp": verify_exp}
         payload = jwt.decode(
@@ -102,7 +122,12 @@ def decode_fridge_token(token: str, verify_exp: bool = True) -> Optional[Dict]:
             logger.error("Fridge token missing 'fridge_id' field")
             return None
         
-        return payload
+        with _fridge_token_cache_lock:
+            _fridge_token_cache[token] = payload
+            if len(_fridge_token_cache) > FRIDGE_TOKEN_CACHE_SIZE:
+                _fridge_token_cache.popitem(last=False)
+        
+        return dict(payload)
         
     except jwt.ExpiredSignatureError:
         logger.warning("Fridge token expired")
@@ -3,17 +3,38 @@ Logger centralizzato per Smart Fridge Server
 Formato identico al logger del Raspberry
 """
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from config import Config
 
 
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler che accoda il record così com'è: QueueHandler.prepare() formatterebbe
+    il messaggio sul thread chiamante (serve solo per code tra processi), qui la
+    formattazione avviene nel thread del QueueListener.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
 class ServerLogger:
-    """Logger centralizzato con rotazione file"""
+    """
+    Logger centralizzato con rotazione file.
+    I logger accodano i record (QueueHandler, nessuna write sul thread chiamante);
+    un QueueListener condiviso li formatta e li scrive su file e console in background.
+    Nei percorsi caldi usare argomenti lazy (logger.info("... %s", x)): il messaggio
+    viene costruito solo se il livello è abilitato, e comunque fuori dal thread chiamante.
+    """
     
     _loggers = {}
+    _queue_handler = None
+    _listener = None
     
     @classmethod
     def get_logger(cls, module_name: str) -> logging.Logger:
@@ -36,6 +57,17 @@ class ServerLogger:
             cls._loggers[module_name] = logger
             return logger
         
+        logger.addHandler(cls._get_queue_handler())
+        
+        cls._loggers[module_name] = logger
+        return logger
+    
+    @classmethod
+    def _get_queue_handler(cls) -> QueueHandler:
+        """Crea (al primo uso) la coda condivisa e avvia il listener che scrive su file/console."""
+        if cls._queue_handler is not None:
+            return cls._queue_handler
+        
         # Crea directory logs se non esiste
         log_dir = Path(Config.LOG_FILE).parent
         log_dir.mkdir(exist_ok=True)
@@ -62,11 +94,15 @@ class ServerLogger:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        log_queue = queue.SimpleQueue()
+        cls._listener = QueueListener(log_queue, file_handler, console_handler,
+                                      respect_handler_level=True)
+        cls._listener.start()
+        # Svuota la coda all'uscita del processo
+        atexit.register(cls._listener.stop)
         
-        cls._loggers[module_name] = logger
-        return logger
+        cls._queue_handler = _DeferredQueueHandler(log_queue)
+        return cls._queue_handler
 
 
 def get_logger(module_name: str) -> logging.Logger:
@@ -5,14 +5,14 @@ Mostra storico temporale con linea media tratteggiata.
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
 from PyQt6.QtCharts import QChart, QChartView, QLineSeries, QDateTimeAxis, QValueAxis, QAreaSeries
-from PyQt6.QtCore import Qt, QDateTime, QMargins
+from PyQt6.QtCore import Qt, QDateTime, QMargins, QPointF
 from PyQt6.QtGui import QPen, QColor, QFont, QPainter, QBrush
 from datetime import datetime, timedelta
 from typing import List, Optional
-from data.data_manager import DataPoint
-from config import (CHART_COLORS, CHART_X_AXIS_LABEL_INTERVAL, 
-                   CHART_ANIMATION_DURATION, HISTORY_HOURS,
-                   TEMPERATURE_THRESHOLDS, TEMPERATURE_ZONE_COLORS)
+import numpy as np
+from config import (CHART_X_AXIS_LABEL_INTERVAL, CHART_ANIMATION_DURATION, HISTORY_HOURS,
+                   TEMPERATURE_THRESHOLDS)
+from .theme import CHART_QCOLORS, ZONE_BRUSHES, NO_PEN, qcolor
 
 
 class ChartWidget(QWidget):
@@ -74,8 +74,8 @@ class ChartWidget(QWidget):
         self.chart.legend().hide()
         
         # Tema scuro
-        self.chart.setBackgroundBrush(QColor(CHART_COLORS['background']))
-        self.chart.setTitleBrush(QColor(CHART_COLORS['text']))
+        self.chart.setBackgroundBrush(CHART_QCOLORS['background'])
+        self.chart.setTitleBrush(CHART_QCOLORS['text'])
         
         # Crea zone temperatura colorate (se abilitate)
         if self.enable_temp_zones:
@@ -83,14 +83,14 @@ class ChartWidget(QWidget):
         
         # Serie dati principale
         self.data_series = QLineSeries()
-        pen = QPen(QColor(self.line_color))
+        pen = QPen(qcolor(self.line_color))
         pen.setWidth(2)
         self.data_series.setPen(pen)
         self.chart.addSeries(self.data_series)
         
         # Serie media (linea tratteggiata)
         self.average_series = QLineSeries()
-        avg_pen = QPen(QColor(self.average_line_color))
+        avg_pen = QPen(qcolor(self.average_line_color))
         avg_pen.setWidth(2)
         avg_pen.setStyle(Qt.PenStyle.DashLine)  # Linea tratteggiata
         self.average_series.setPen(avg_pen)
@@ -99,10 +99,10 @@ class ChartWidget(QWidget):
         # Asse X (tempo relativo)
         self.axis_x = QValueAxis()
         self.axis_x.setTitleText("Time Ago")
-        self.axis_x.setLabelsColor(QColor(CHART_COLORS['text']))
+        self.axis_x.setLabelsColor(CHART_QCOLORS['text'])
         self.axis_x.setLabelsVisible(True)
         self.axis_x.setLabelsAngle(-45)
-        self.axis_x.setGridLineColor(QColor(CHART_COLORS['grid']))
+        self.axis_x.setGridLineColor(CHART_QCOLORS['grid'])
         self.axis_x.setGridLineVisible(True)
         self.axis_x.setTickCount(7)
         self.axis_x.setReverse(True)  # Inverte l'asse: 0 a destra, valori crescenti a sinistra
@@ -115,9 +115,9 @@ class ChartWidget(QWidget):
         # Asse Y (valore)
         self.axis_y = QValueAxis()
         self.axis_y.setTitleText(self.unit)
-        self.axis_y.setLabelsColor(QColor(CHART_COLORS['text']))
+        self.axis_y.setLabelsColor(CHART_QCOLORS['text'])
         self.axis_y.setLabelsVisible(True)  # Assicura visibilità label
-        self.axis_y.setGridLineColor(QColor(CHART_COLORS['grid']))
+        self.axis_y.setGridLineColor(CHART_QCOLORS['grid'])
         self.axis_y.setGridLineVisible(True)
         self.axis_y.setTickCount(6)
         self.axis_y.setLabelsFont(axis_font)
@@ -171,10 +171,8 @@ class ChartWidget(QWidget):
         safe_upper.append(1, safe_max)
         
         safe_area = QAreaSeries(safe_upper, safe_lower)
-        safe_color = QColor(TEMPERATURE_ZONE_COLORS['safe'])
-        safe_color.setAlpha(TEMPERATURE_ZONE_COLORS['zone_opacity'])
-        safe_area.setBrush(QBrush(safe_color))
-        safe_area.setPen(QPen(Qt.PenStyle.NoPen))  # Senza bordo
+        safe_area.setBrush(ZONE_BRUSHES['safe'])
+        safe_area.setPen(NO_PEN)  # Senza bordo
         self.chart.addSeries(safe_area)
         self.zone_series.append((safe_area, safe_lower, safe_upper))
         
@@ -188,10 +186,8 @@ class ChartWidget(QWidget):
         warning_upper.append(1, warning_max)
         
         warning_area = QAreaSeries(warning_upper, warning_lower)
-        warning_color = QColor(TEMPERATURE_ZONE_COLORS['warning'])
-        warning_color.setAlpha(TEMPERATURE_ZONE_COLORS['zone_opacity'])
-        warning_area.setBrush(QBrush(warning_color))
-        warning_area.setPen(QPen(Qt.PenStyle.NoPen))
+        warning_area.setBrush(ZONE_BRUSHES['warning'])
+        warning_area.setPen(NO_PEN)
         self.chart.addSeries(warning_area)
         self.zone_series.append((warning_area, warning_lower, warning_upper))
         
@@ -205,10 +201,8 @@ class ChartWidget(QWidget):
         danger_upper.append(1, warning_max + 10)
         
         danger_area = QAreaSeries(danger_upper, danger_lower)
-        danger_color = QColor(TEMPERATURE_ZONE_COLORS['danger'])
-        danger_color.setAlpha(TEMPERATURE_ZONE_COLORS['zone_opacity'])
-        danger_area.setBrush(QBrush(danger_color))
-        danger_area.setPen(QPen(Qt.PenStyle.NoPen))
+        danger_area.setBrush(ZONE_BRUSHES['danger'])
+        danger_area.setPen(NO_PEN)
         self.chart.addSeries(danger_area)
         self.zone_series.append((danger_area, danger_lower, danger_upper))
         
@@ -244,33 +238,33 @@ class ChartWidget(QWidget):
         update_zone(1, safe_max, warning_max)  # Gialla: 6°C → 8°C
         update_zone(2, warning_max, max_y)     # Rossa: 8°C → max
     
-    def update_chart(self, data_points: List[DataPoint], average: float):
+    def update_chart(self, timestamps: np.ndarray, values: np.ndarray, average: float):
         """
         Aggiorna il grafico con nuovi dati.
         
         Args:
-            data_points: Lista di DataPoint da visualizzare
+            timestamps: Array int64 dei timestamp epoch-ms (ordinati cronologicamente)
+            values: Array dei valori corrispondenti
             average: Valore medio da mostrare come linea tratteggiata
         """
-        if not data_points:
+        if not len(values):
             print(f"[ChartWidget-{self.title}] No data points to display")
             return
         
         # Aggiorna label valore corrente
-        current_value = data_points[-1].value
+        current_value = float(values[-1])
         self.current_value_label.setText(f"{current_value:.1f} {self.unit}")
-        print(f"[ChartWidget-{self.title}] Updated with {len(data_points)} points, current: {current_value:.1f}{self.unit}")
+        print(f"[ChartWidget-{self.title}] Updated with {len(values)} points, current: {current_value:.1f}{self.unit}")
         
         # Clear serie esistenti
-        self.data_series.clear()
         self.average_series.clear()
         
-        # Usa il punto più recente come riferimento (tempo = 0)
-        most_recent_time = data_points[-1].timestamp
-        oldest_data_time = data_points[0].timestamp
+        # Usa il punto più recente come riferimento (tempo = 0):
+        # secondi trascorsi per ogni punto, calcolati in un colpo solo
+        seconds_ago = (timestamps[-1] - timestamps) / 1000.0
         
         # Calcola la differenza temporale totale in secondi
-        total_seconds = (most_recent_time - oldest_data_time).total_seconds()
+        total_seconds = float(seconds_ago[0])
         
         # Determina unità base in base al superamento delle soglie naturali
         if total_seconds >= 3600:  # >= 1 ora (3600s)
@@ -286,10 +280,9 @@ class ChartWidget(QWidget):
         
         print(f"[ChartWidget-{self.title}] Using {time_unit}, range: {max_value:.1f}{time_unit}")
         
-        # Aggiungi punti dati
-        for point in data_points:
-            time_ago = (most_recent_time - point.timestamp).total_seconds() / final_divisor
-            self.data_series.append(time_ago, point.value)
+        # Sostituisci tutti i punti con una sola chiamata (un solo repaint)
+        time_ago = seconds_ago / final_divisor
+        self.data_series.replace([QPointF(x, y) for x, y in zip(time_ago.tolist(), values.tolist())])
         
         # Imposta formato label asse X
         label_formats = {'s': '%.0fs', 'm': '%.1fm', 'h': '%.1fh'}
@@ -303,29 +296,27 @@ class ChartWidget(QWidget):
         self.axis_x.setRange(0, max_value)
         
         # Auto-scale asse Y con margine e intervallo minimo
-        if data_points:
-            values = [p.value for p in data_points]
-            min_val = min(values + [average])
-            max_val = max(values + [average])
-            range_val = max_val - min_val
-            
-            # Assicura un range minimo per evitare tick duplicati con 1 decimale
-            # Con 6 tick, ogni tick deve avere almeno 0.1 di differenza
-            # Quindi il range minimo è 6 * 0.1 = 0.6
-            min_range = 0.6
-            if range_val < min_range:
-                # Espandi il range centrandolo sul valore medio
-                center = (min_val + max_val) / 2
-                min_val = center - min_range / 2
-                max_val = center + min_range / 2
-            else:
-                # Aggiungi margine del 10%
-                margin = range_val * 0.1
-                min_val = min_val - margin
-                max_val = max_val + margin
-            
-            self.axis_y.setRange(min_val, max_val)
-            
-            # Aggiorna zone temperatura se abilitate
-            if self.enable_temp_zones:
-                self._update_temperature_zones(max_value, min_val, max_val)
\ No newline at end of file
+        min_val = min(float(values.min()), average)
+        max_val = max(float(values.max()), average)
+        range_val = max_val - min_val
+        
+        # Assicura un range minimo per evitare tick duplicati con 1 decimale
+        # Con 6 tick, ogni tick deve avere almeno 0.1 di differenza
+        # Quindi il range minimo è 6 * 0.1 = 0.6
+        min_range = 0.6
+        if range_val < min_range:
+            # Espandi il range centrandolo sul valore medio
+            center = (min_val + max_val) / 2
+            min_val = center - min_range / 2
+            max_val = center + min_range / 2
+        else:
+            # Aggiungi margine del 10%
+            margin = range_val * 0.1
+            min_val = min_val - margin
+            max_val = max_val + margin
+        
+        self.axis_y.setRange(min_val, max_val)
+        
+        # Aggiorna zone temperatura se abilitate
+        if self.enable_temp_zones:
+            self._update_temperature_zones(max_value, min_val, max_val)
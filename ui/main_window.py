@@ -5,15 +5,20 @@ Layout verticale:
 - Metà inferiore: 2 grafici stacked (temperatura e potenza)
 """
 
+import os
+from typing import Optional
 from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QSplitter
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QColor, QPalette
+from PyQt6.QtGui import QPalette
 from .ads_widget import AdsWidget
 from .chart_widget import ChartWidget
+from .theme import CHART_QCOLORS
 from sensors.shared_sensors import SharedTemperatureSensor as TemperatureSensor, SharedPowerSensor as PowerSensor
-from data import DataManager
+from data import DataManager, stop_network_worker
+from data.server_api import ServerAPI
 from config import (WINDOW_TITLE, ADS_HEIGHT_PERCENT, CHARTS_HEIGHT_PERCENT,
-                   POLLING_INTERVAL_MS, CHART_COLORS, HISTORY_HOURS)
+                   POLLING_INTERVAL_MS, CHART_COLORS, HISTORY_HOURS,
+                   HISTORY_CACHE_DIR, HISTORY_CACHE_MAX_AGE_SECONDS)
 
 
 class MainWindow(QMainWindow):
@@ -22,16 +27,22 @@ class MainWindow(QMainWindow):
     Gestisce layout, timer polling sensori, e aggiornamento UI.
     """
     
-    def __init__(self):
+    def __init__(self, server_api: Optional[ServerAPI] = None):
+        """
+        Args:
+            server_api: Client API condiviso (creato in app.py), passato ai DataManager
+        """
         super().__init__()
         
+        self.server_api = server_api
+        
         # Inizializza sensori
         self.temp_sensor = TemperatureSensor()
         self.power_sensor = PowerSensor()
         
         # Inizializza data managers (API disabilitata per ora)
-        self.temp_data_manager = DataManager('temperature', api_enabled=False)
-        self.power_data_manager = DataManager('power', api_enabled=False)
+        self.temp_data_manager = DataManager('temperature', api_enabled=False, server_api=server_api)
+        self.power_data_manager = DataManager('power', api_enabled=False, server_api=server_api)
         
         # Setup UI
         self._setup_ui()
@@ -114,13 +125,13 @@ class MainWindow(QMainWindow):
     def _set_dark_theme(self):
         """Applica tema scuro all'applicazione."""
         palette = QPalette()
-        palette.setColor(QPalette.ColorRole.Window, QColor(CHART_COLORS['background']))
-        palette.setColor(QPalette.ColorRole.WindowText, QColor(CHART_COLORS['text']))
-        palette.setColor(QPalette.ColorRole.Base, QColor(CHART_COLORS['background']))
-        palette.setColor(QPalette.ColorRole.AlternateBase, QColor(CHART_COLORS['grid']))
-        palette.setColor(QPalette.ColorRole.Text, QColor(CHART_COLORS['text']))
-        palette.setColor(QPalette.ColorRole.Button, QColor(CHART_COLORS['grid']))
-        palette.setColor(QPalette.ColorRole.ButtonText, QColor(CHART_COLORS['text']))
+        palette.setColor(QPalette.ColorRole.Window, CHART_QCOLORS['background'])
+        palette.setColor(QPalette.ColorRole.WindowText, CHART_QCOLORS['text'])
+        palette.setColor(QPalette.ColorRole.Base, CHART_QCOLORS['background'])
+        palette.setColor(QPalette.ColorRole.AlternateBase, CHART_QCOLORS['grid'])
+        palette.setColor(QPalette.ColorRole.Text, CHART_QCOLORS['text'])
+        palette.setColor(QPalette.ColorRole.Button, CHART_QCOLORS['grid'])
+        palette.setColor(QPalette.ColorRole.ButtonText, CHART_QCOLORS['text'])
         
         self.setPalette(palette)
     
@@ -138,15 +149,24 @@ class MainWindow(QMainWindow):
             print("[MainWindow] Warning: Some sensors failed to initialize")
     
     def _load_history(self):
-        """Carica lo storico dati dal server (se API abilitata)."""
+        """
+        Carica lo storico dati: dalla cache locale se recente,
+        altrimenti dal server (se API abilitata).
+        """
         print("[MainWindow] Loading historical data...")
         
-        self.temp_data_manager.load_history_from_server()
-        self.power_data_manager.load_history_from_server()
+        for manager in (self.temp_data_manager, self.power_data_manager):
+            if not manager.load_cache(self._cache_path(manager), HISTORY_CACHE_MAX_AGE_SECONDS):
+                manager.load_history_from_server()
         
         # Aggiorna grafici con dati storici (se disponibili)
         self._update_charts()
     
+    @staticmethod
+    def _cache_path(manager: DataManager) -> str:
+        """Path del file cache storico per un DataManager."""
+        return os.path.join(HISTORY_CACHE_DIR, f"{manager.sensor_type}_history.npz")
+    
     def _setup_polling_timer(self):
         """Configura timer per polling periodico dei sensori."""
         self.polling_timer = QTimer()
@@ -179,20 +199,20 @@ class MainWindow(QMainWindow):
     
     def _update_charts(self):
         """Aggiorna i grafici con i dati più recenti."""
-        # Ottieni dati ultime 48h
-        temp_points = self.temp_data_manager.get_data_points(hours=HISTORY_HOURS)
-        power_points = self.power_data_manager.get_data_points(hours=HISTORY_HOURS)
+        # Ottieni dati ultime 48h (array NumPy, passati direttamente ai grafici)
+        temp_ts, temp_values = self.temp_data_manager.get_series(hours=HISTORY_HOURS)
+        power_ts, power_values = self.power_data_manager.get_series(hours=HISTORY_HOURS)
         
         # Calcola medie
         temp_avg = self.temp_data_manager.get_average(hours=HISTORY_HOURS)
         power_avg = self.power_data_manager.get_average(hours=HISTORY_HOURS)
         
         # Aggiorna widget grafici
-        if temp_points:
-            self.temp_chart.update_chart(temp_points, temp_avg)
+        if len(temp_values):
+            self.temp_chart.update_chart(temp_ts, temp_values, temp_avg)
         
-        if power_points:
-            self.power_chart.update_chart(power_points, power_avg)
+        if len(power_values):
+            self.power_chart.update_chart(power_ts, power_values, power_avg)
     
     def showFullScreen(self):
         """Override per modalità fullscreen con messaggio."""
@@ -214,5 +234,12 @@ class MainWindow(QMainWindow):
         self.temp_sensor.cleanup()
         self.power_sensor.cleanup()
         
+        # Salva lo storico per un riavvio senza download dal server
+        for manager in (self.temp_data_manager, self.power_data_manager):
+            manager.save_cache(self._cache_path(manager))
+        
+        # Ferma il worker di rete (invii verso il server)
+        stop_network_worker()
+        
         print("[MainWindow] Cleanup complete")
         event.accept()
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Colori del tema già convertiti in oggetti Qt.
+Le stringhe hex di config.py vengono parsate una sola volta all'import;
+config.py resta senza dipendenze Qt perché è importato anche dal daemon.
+"""
+
+from functools import lru_cache
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QBrush, QColor, QPen
+from config import CHART_COLORS, TEMPERATURE_ZONE_COLORS
+
+
+@lru_cache(maxsize=None)
+def qcolor(hex_color: str) -> QColor:
+    """Ritorna il QColor per una stringa hex (parsato una volta e riusato)."""
+    return QColor(hex_color)
+
+
+# Colori grafici (chiavi come CHART_COLORS)
+CHART_QCOLORS = {name: qcolor(value) for name, value in CHART_COLORS.items()}
+
+
+def _zone_brush(name: str) -> QBrush:
+    """Brush semitrasparente per una zona temperatura."""
+    color = QColor(TEMPERATURE_ZONE_COLORS[name])
+    color.setAlpha(TEMPERATURE_ZONE_COLORS['zone_opacity'])
+    return QBrush(color)
+
+
+# Brush zone temperatura (con opacità già applicata)
+ZONE_BRUSHES = {name: _zone_brush(name) for name in ('safe', 'warning', 'danger')}
+
+# Pen senza bordo (aree delle zone)
+NO_PEN = QPen(Qt.PenStyle.NoPen)